@@ -0,0 +1,27 @@
+"""Add card template version and fingerprint columns to members table
+
+Revision ID: add_card_render_stamp
+Revises: add_jobs_table
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_card_render_stamp'
+down_revision = 'add_jobs_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing members start unstamped, so the first --stale run renders them all
+    op.add_column('members', sa.Column('card_template_version', sa.Integer(), nullable=True))
+    op.add_column('members', sa.Column('card_fingerprint', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    op.drop_column('members', 'card_fingerprint')
+    op.drop_column('members', 'card_template_version')
@@ -0,0 +1,70 @@
+"""Add email campaigns and email outbox tables
+
+Revision ID: add_email_outbox
+Revises: add_card_render_stamp
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_email_outbox'
+down_revision = 'add_card_render_stamp'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'email_campaigns',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=False),
+        sa.Column('body_html', sa.Text(), nullable=False),
+        sa.Column('body_text', sa.Text(), nullable=True),
+        sa.Column('filters', sa.Text(), nullable=False, server_default='{}'),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('last_member_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_recipients', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_email_campaigns_id'), 'email_campaigns', ['id'], unique=False)
+
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('campaign_id', sa.Integer(), nullable=True),
+        sa.Column('to_email', sa.String(length=255), nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=True),
+        sa.Column('body_html', sa.Text(), nullable=True),
+        sa.Column('body_text', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.ForeignKeyConstraint(['campaign_id'], ['email_campaigns.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('campaign_id', 'to_email', name='uq_email_outbox_campaign_to')
+    )
+    op.create_index(op.f('ix_email_outbox_id'), 'email_outbox', ['id'], unique=False)
+    op.create_index(op.f('ix_email_outbox_sent_at'), 'email_outbox', ['sent_at'], unique=False)
+    op.create_index('ix_email_outbox_status_id', 'email_outbox', ['status', 'id'], unique=False)
+    op.create_index('ix_email_outbox_campaign_status', 'email_outbox', ['campaign_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_email_outbox_campaign_status', table_name='email_outbox')
+    op.drop_index('ix_email_outbox_status_id', table_name='email_outbox')
+    op.drop_index(op.f('ix_email_outbox_sent_at'), table_name='email_outbox')
+    op.drop_index(op.f('ix_email_outbox_id'), table_name='email_outbox')
+    op.drop_table('email_outbox')
+    op.drop_index(op.f('ix_email_campaigns_id'), table_name='email_campaigns')
+    op.drop_table('email_campaigns')
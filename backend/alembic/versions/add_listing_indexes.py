@@ -0,0 +1,32 @@
+"""Add composite indexes for list ordering and keyset pagination
+
+Revision ID: add_listing_indexes
+Revises: add_member_search_indexes
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_listing_indexes'
+down_revision = 'add_member_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_members_created_at_id', 'members', ['created_at', 'id'], unique=False)
+    op.create_index('ix_complaints_created_at_id', 'complaints', ['created_at', 'id'], unique=False)
+    op.create_index('ix_donations_created_at_id', 'donations', ['created_at', 'id'], unique=False)
+    # Matches the gallery's mixed order: display_order ascending, newest first within it
+    op.create_index('ix_gallery_listing', 'gallery',
+                    ['is_active', 'display_order', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_gallery_listing', table_name='gallery')
+    op.drop_index('ix_donations_created_at_id', table_name='donations')
+    op.drop_index('ix_complaints_created_at_id', table_name='complaints')
+    op.drop_index('ix_members_created_at_id', table_name='members')
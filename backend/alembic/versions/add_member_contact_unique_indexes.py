@@ -0,0 +1,64 @@
+"""Normalise member phone numbers and emails and make them unique
+
+Revision ID: add_member_contact_unique
+Revises: add_outbox_template_context
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.utils.contact_normalization import normalize_email, normalize_phone
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_member_contact_unique'
+down_revision = 'add_outbox_template_context'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Members registered without an email get NULL, which the unique index allows repeatedly
+    with op.batch_alter_table('members') as batch_op:
+        batch_op.alter_column('email', existing_type=sa.String(length=255), nullable=True)
+
+    connection = op.get_bind()
+    members = sa.table('members', sa.column('id', sa.Integer), sa.column('phone', sa.String),
+                       sa.column('email', sa.String), sa.column('membership_id', sa.String))
+
+    # Backfill: E.164 phones, lowercased emails and NULL instead of ''
+    seen = {"phone": {}, "email": {}}
+    duplicates = []
+    for member_id, phone, email, membership_id in connection.execute(
+        sa.select(members.c.id, members.c.phone, members.c.email, members.c.membership_id).order_by(members.c.id)
+    ):
+        try:
+            new_phone = normalize_phone(phone)
+        except ValueError:
+            # Left as entered; it still has to be unique
+            new_phone = phone
+        new_email = normalize_email(email)
+        for field, value in (("phone", new_phone), ("email", new_email)):
+            if value is None:
+                continue
+            if value in seen[field]:
+                duplicates.append(f"{field} {value}: {seen[field][value]} and {membership_id}")
+            seen[field][value] = membership_id
+        if (new_phone, new_email) != (phone, email):
+            connection.execute(
+                members.update().where(members.c.id == member_id).values(phone=new_phone, email=new_email)
+            )
+
+    if duplicates:
+        raise RuntimeError(
+            "Members share a phone number or email; resolve these before upgrading:\n  " + "\n  ".join(duplicates)
+        )
+
+    op.create_index('ix_members_phone', 'members', ['phone'], unique=True)
+    op.create_index('ix_members_email', 'members', ['email'], unique=True)
+
+
+def downgrade():
+    # Normalised values are kept
+    op.drop_index('ix_members_email', table_name='members')
+    op.drop_index('ix_members_phone', table_name='members')
@@ -0,0 +1,26 @@
+"""Add full-text and trigram indexes for member search
+
+Revision ID: add_member_search_indexes
+Revises: encrypt_member_aadhar
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+from app.utils.member_search import create_member_search_index, drop_member_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_member_search_indexes'
+down_revision = 'encrypt_member_aadhar'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 table and sync triggers on SQLite, pg_trgm GIN indexes on PostgreSQL;
+    # existing members are indexed as part of the upgrade
+    create_member_search_index(op.get_bind())
+
+
+def downgrade():
+    drop_member_search_index(op.get_bind())
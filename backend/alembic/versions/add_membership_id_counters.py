@@ -0,0 +1,32 @@
+"""Add membership_id_counters table for the membership ID allocator
+
+Revision ID: add_membership_id_counters
+Revises: add_member_contact_unique
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_membership_id_counters'
+down_revision = 'add_member_contact_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows are created on the first allocation of each year, seeded from the
+    # highest membership ID already issued for that year
+    op.create_table(
+        'membership_id_counters',
+        sa.Column('year', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('next_value', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.PrimaryKeyConstraint('year')
+    )
+
+
+def downgrade():
+    op.drop_table('membership_id_counters')
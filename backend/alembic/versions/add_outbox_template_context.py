@@ -0,0 +1,26 @@
+"""Add template and context columns to email outbox table
+
+Revision ID: add_outbox_template_context
+Revises: add_email_outbox
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_outbox_template_context'
+down_revision = 'add_email_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('email_outbox', sa.Column('template', sa.String(length=50), nullable=True))
+    op.add_column('email_outbox', sa.Column('context', sa.Text(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('email_outbox', 'context')
+    op.drop_column('email_outbox', 'template')
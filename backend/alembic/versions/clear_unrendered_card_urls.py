@@ -0,0 +1,30 @@
+"""Clear ID card URLs stored for members whose card was never rendered
+
+Revision ID: clear_unrendered_card_urls
+Revises: add_listing_indexes
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'clear_unrendered_card_urls'
+down_revision = 'add_listing_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Lazy mode used to store the download URL at registration and import;
+    # it is now only stored once the card is rendered. Cards rendered before
+    # the render cache (/static/idcards/...) are left alone.
+    op.execute(
+        "UPDATE members SET id_card_url = NULL "
+        "WHERE card_fingerprint IS NULL AND id_card_url LIKE '/api/membership/idcard/%'"
+    )
+
+
+def downgrade():
+    # The URLs are derived from the member's fields and are stored again on first download
+    pass
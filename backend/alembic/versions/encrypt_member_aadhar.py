@@ -0,0 +1,77 @@
+"""Store member Aadhar numbers encrypted with a blind index
+
+Revision ID: encrypt_member_aadhar
+Revises: add_idempotency_keys
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.utils.aadhar import aadhar_blind_index, decrypt_aadhar, encrypt_aadhar
+
+
+# revision identifiers, used by Alembic.
+revision = 'encrypt_member_aadhar'
+down_revision = 'add_idempotency_keys'
+branch_labels = None
+depends_on = None
+
+# Members rewritten per UPDATE batch
+BATCH_SIZE = 1000
+
+
+def _backfill(source_column: str, target_columns: list, convert) -> None:
+    """
+    Set target_columns from convert(source value) for every member, walking
+    the table in id order BATCH_SIZE rows at a time with one executemany each
+    """
+    connection = op.get_bind()
+    members = sa.table('members', sa.column('id', sa.Integer),
+                       *[sa.column(column, sa.Text) for column in [source_column, *target_columns]])
+    statement = (
+        members.update()
+        .where(members.c.id == sa.bindparam('member_id'))
+        .values({column: sa.bindparam(f'new_{column}') for column in target_columns})
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(members.c.id, members.c[source_column])
+            .where(members.c.id > last_id)
+            .order_by(members.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(statement, [
+            {'member_id': member_id, **{f'new_{column}': value for column, value in zip(target_columns, convert(source))}}
+            for member_id, source in rows
+        ])
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    op.add_column('members', sa.Column('aadhar_encrypted', sa.Text(), nullable=True))
+    op.add_column('members', sa.Column('aadhar_hash', sa.String(length=64), nullable=True))
+
+    _backfill('aadhar', ['aadhar_encrypted', 'aadhar_hash'],
+              lambda aadhar: (encrypt_aadhar(aadhar), aadhar_blind_index(aadhar)))
+
+    # Dropping the column also drops its unique constraint
+    with op.batch_alter_table('members') as batch_op:
+        batch_op.alter_column('aadhar_encrypted', existing_type=sa.Text(), nullable=False)
+        batch_op.alter_column('aadhar_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.drop_column('aadhar')
+    op.create_index('ix_members_aadhar_hash', 'members', ['aadhar_hash'], unique=True)
+
+
+def downgrade():
+    op.add_column('members', sa.Column('aadhar', sa.String(length=12), nullable=True))
+    _backfill('aadhar_encrypted', ['aadhar'], lambda token: (decrypt_aadhar(token),))
+
+    op.drop_index('ix_members_aadhar_hash', table_name='members')
+    with op.batch_alter_table('members') as batch_op:
+        batch_op.alter_column('aadhar', existing_type=sa.String(length=12), nullable=False)
+        batch_op.create_unique_constraint('uq_members_aadhar', ['aadhar'])
+        batch_op.drop_column('aadhar_hash')
+        batch_op.drop_column('aadhar_encrypted')
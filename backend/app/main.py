@@ -1,10 +1,15 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from app.routes import membership, donations, complaints, gallery
+from fastapi.responses import FileResponse, PlainTextResponse
+from app.routes import membership, donations, complaints, gallery, email_campaigns, admin
 from app.database import engine
-from app.models import member, donation, complaint, gallery as gallery_model, admin_user
+from app.utils.email_service import email_service
+from app.utils.email_templates import load_email_templates
+from app.utils.admission_control import AdmissionControlMiddleware, admission_metrics
+from app.utils.member_search import ensure_member_search_index
+from app.utils.print_pack import shutdown_render_pool
+from app.models import member, donation, complaint, gallery as gallery_model, admin_user, job, email_campaign, outbox_email, membership_id_counter, idempotency_key
 import os
 
 # Create all tables
@@ -13,6 +18,14 @@ donation.Base.metadata.create_all(bind=engine)
 complaint.Base.metadata.create_all(bind=engine)
 gallery_model.Base.metadata.create_all(bind=engine)
 admin_user.Base.metadata.create_all(bind=engine)
+job.Base.metadata.create_all(bind=engine)
+email_campaign.Base.metadata.create_all(bind=engine)
+outbox_email.Base.metadata.create_all(bind=engine)
+membership_id_counter.Base.metadata.create_all(bind=engine)
+idempotency_key.Base.metadata.create_all(bind=engine)
+
+# Full-text search over members, kept in sync by the database
+ensure_member_search_index(engine)
 
 app = FastAPI(
     title="Mala Mahanadu Membership API",
@@ -20,6 +33,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Shed load on the expensive endpoints; added before CORS so rejections still carry CORS headers
+app.add_middleware(AdmissionControlMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -39,8 +55,6 @@ app.add_middleware(
 
 # Mount static files with CORS
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import Response
-from fastapi import Request
 
 class CORSSStaticFiles(StaticFiles):
     async def __call__(self, scope: dict, receive: dict, send: dict) -> None:
@@ -71,6 +85,20 @@ app.include_router(membership.router, prefix="/api/membership", tags=["membershi
 app.include_router(donations.router)
 app.include_router(complaints.router)
 app.include_router(gallery.router, prefix="/api/gallery", tags=["gallery"])
+app.include_router(email_campaigns.router)
+app.include_router(admin.router)
+
+@app.on_event("startup")
+async def compile_email_templates():
+    load_email_templates()
+
+@app.on_event("shutdown")
+async def close_smtp_connections():
+    email_service.smtp_pool.close()
+
+@app.on_event("shutdown")
+async def stop_print_pack_renderers():
+    shutdown_render_pool()
 
 @app.get("/")
 async def root():
@@ -80,6 +108,11 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    """Admission control counters for this process in the Prometheus text format"""
+    return PlainTextResponse(admission_metrics(), media_type="text/plain; version=0.0.4")
+
 # SPA fallback - serve index.html for all non-API routes
 @app.get("/{path:path}")
 async def spa_fallback(path: str):
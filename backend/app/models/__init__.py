@@ -3,6 +3,11 @@ from .donation import Donation
 from .complaint import Complaint
 from .gallery import Gallery
 from .admin_user import AdminUser
+from .job import Job
+from .email_campaign import EmailCampaign
+from .outbox_email import OutboxEmail
+from .membership_id_counter import MembershipIdCounter
+from .idempotency_key import IdempotencyKey
 from app.database import Base
 
-__all__ = ['Member', 'Donation', 'Complaint', 'Gallery', 'AdminUser', 'Base']
+__all__ = ['Member', 'Donation', 'Complaint', 'Gallery', 'AdminUser', 'Job', 'EmailCampaign', 'OutboxEmail', 'MembershipIdCounter', 'IdempotencyKey', 'Base']
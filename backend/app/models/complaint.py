@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -20,3 +20,8 @@ class Complaint(Base):
     reference_id = Column(String(50), unique=True, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
+
+    __table_args__ = (
+        # Newest-first listing and its keyset pagination
+        Index("ix_complaints_created_at_id", "created_at", "id"),
+    )
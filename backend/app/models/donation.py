@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -17,3 +17,8 @@ class Donation(Base):
     status = Column(String(20), default='pending')  # pending, verified, acknowledged
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
+
+    __table_args__ = (
+        # Newest-first listing and its keyset pagination
+        Index("ix_donations_created_at_id", "created_at", "id"),
+    )
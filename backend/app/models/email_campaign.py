@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import func
+from app.database import Base
+
+class EmailCampaign(Base):
+    __tablename__ = "email_campaigns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False)
+    # Jinja templates rendered per recipient with name and membership_id
+    subject = Column(String(255), nullable=False)
+    body_html = Column(Text, nullable=False)
+    body_text = Column(Text, nullable=True)
+    filters = Column(Text, nullable=False, default="{}")  # JSON encoded state, district and status filters
+    status = Column(String(20), default="queued", nullable=False)  # queued, expanding, sending, done
+    last_member_id = Column(Integer, default=0, nullable=False)  # expansion cursor, so it can resume
+    total_recipients = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, onupdate=func.now())
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "subject": self.subject,
+            "status": self.status,
+            "total_recipients": self.total_recipients,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, BigInteger, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -40,3 +40,6 @@ class Gallery(Base):
             "created_by": self.created_by,
             "updated_by": self.updated_by
         }
+
+# The public listing (active items by display order, newest first) and its keyset pagination
+Index("ix_gallery_listing", Gallery.is_active, Gallery.display_order, Gallery.created_at.desc(), Gallery.id.desc())
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class IdempotencyKey(Base):
+    """A client-supplied Idempotency-Key and the response it produced, kept until expires_at"""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    endpoint = Column(String(100), nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of the request's form fields
+    status = Column(String(20), default="pending", nullable=False)  # pending, done
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)  # JSON encoded response to replay
+    locked_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("endpoint", "key", name="uq_idempotency_keys_endpoint_key"),
+    )
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(50), nullable=False)
+    reference = Column(String(100), nullable=True, index=True)  # e.g. membership_id the job works on
+    payload = Column(Text, nullable=False, default="{}")  # JSON encoded handler arguments
+    status = Column(String(20), default="queued", nullable=False)  # queued, running, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    result = Column(Text, nullable=True)  # JSON encoded handler return value
+    error = Column(Text, nullable=True)
+    run_after = Column(DateTime, nullable=True)
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_jobs_status_id", "status", "id"),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "job_type": self.job_type,
+            "reference": self.reference,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
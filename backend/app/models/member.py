@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from sqlalchemy.sql import func
 from app.database import Base
+from app.utils.photo_processing import photo_variant_url
+from app.utils.aadhar import aadhar_columns, decrypt_aadhar
 
 class Member(Base):
     __tablename__ = "members"
@@ -12,9 +14,14 @@ class Member(Base):
     gender = Column(String(10), nullable=False)
     dob = Column(String(20), nullable=False)
     caste = Column(String(100), nullable=False)
-    aadhar = Column(String(12), unique=True, nullable=False)
-    phone = Column(String(20), nullable=False)
-    email = Column(String(255), nullable=True)
+    # The Aadhar number is stored encrypted; aadhar_hash is its keyed blind
+    # index, used for duplicate checks and exact lookups
+    aadhar_encrypted = Column(Text, nullable=False)
+    aadhar_hash = Column(String(64), unique=True, index=True, nullable=False)
+    # Stored normalised (E.164 phone, lowercased email, NULL when no email)
+    # so the unique indexes catch duplicates however they were typed
+    phone = Column(String(20), unique=True, index=True, nullable=False)
+    email = Column(String(255), unique=True, index=True, nullable=True)
     state = Column(String(100), nullable=False)
     district = Column(String(100), nullable=False)
     mandal = Column(String(100), nullable=False)
@@ -23,5 +30,33 @@ class Member(Base):
     status = Column(String(20), default="pending", nullable=False)
     photo_url = Column(String(500), nullable=True)
     id_card_url = Column(String(500), nullable=True)
+    # Template version and input fingerprint of the last rendered card
+    card_template_version = Column(Integer, nullable=True)
+    card_fingerprint = Column(String(64), nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
+
+    __table_args__ = (
+        # Newest-first listing and its keyset pagination
+        Index("ix_members_created_at_id", "created_at", "id"),
+    )
+
+    @property
+    def aadhar(self):
+        """The decrypted Aadhar number"""
+        return decrypt_aadhar(self.aadhar_encrypted) if self.aadhar_encrypted else None
+
+    @aadhar.setter
+    def aadhar(self, value):
+        for column, column_value in aadhar_columns(value).items():
+            setattr(self, column, column_value)
+
+    @property
+    def photo_thumbnail_url(self):
+        """Small square WebP of the photo for member lists"""
+        return photo_variant_url(self.photo_url, "sm")
+
+    @property
+    def photo_medium_url(self):
+        """Medium square WebP of the photo for member detail views"""
+        return photo_variant_url(self.photo_url, "md")
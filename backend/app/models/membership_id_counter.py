@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class MembershipIdCounter(Base):
+    """Next unallocated MMN-YYYY-NNNNNN sequence number for each year"""
+    __tablename__ = "membership_id_counters"
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    next_value = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class OutboxEmail(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("email_campaigns.id"), nullable=True)
+    to_email = Column(String(255), nullable=False)
+    # Either literal content, a named email template, or (for campaign
+    # emails) nothing, in which case the campaign's templates are used
+    subject = Column(String(255), nullable=True)
+    body_html = Column(Text, nullable=True)
+    body_text = Column(Text, nullable=True)
+    template = Column(String(50), nullable=True)
+    context = Column(Text, nullable=True)  # JSON encoded template variables
+    status = Column(String(20), default="queued", nullable=False)  # queued, sending, sent, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    sent_at = Column(DateTime, nullable=True, index=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_id", "status", "id"),
+        Index("ix_email_outbox_campaign_status", "campaign_id", "status"),
+        # A resumed campaign expansion cannot queue a member twice
+        UniqueConstraint("campaign_id", "to_email", name="uq_email_outbox_campaign_to"),
+    )
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models.admin_user import AdminUser
+from app.utils.admin_auth import authenticate_admin, create_admin_token, require_admin
+from app.utils.dashboard_stats import dashboard_overview
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+class AdminLogin(BaseModel):
+    username: str
+    password: str
+
+class AdminToken(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+
+@router.post("/login", response_model=AdminToken)
+async def admin_login(login: AdminLogin, db: Session = Depends(get_db)):
+    """Exchange admin credentials for a bearer token for the admin-only endpoints"""
+    admin = authenticate_admin(db, login.username, login.password)
+    if admin is None:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    return AdminToken(access_token=create_admin_token(admin))
+
+@router.get("/overview")
+async def get_admin_overview(admin: AdminUser = Depends(require_admin)):
+    """
+    Member, complaint, donation and gallery stats for the admin dashboard in
+    one response: one aggregate query per table, run concurrently
+    """
+    return await dashboard_overview()
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
 from app.models.complaint import Complaint
+from app.models.admin_user import AdminUser
+from app.utils.admin_auth import require_admin
 from app.schemas.complaint import ComplaintCreate, ComplaintResponse, ComplaintUpdate
+from app.utils.file_handler import stream_upload_file, UploadTooLarge
+from app.utils.pagination import paginate, InvalidCursor
+from app.utils.sparse_fields import SparseFields, sparse_json_response
+from app.utils.exports import EXPORT_FORMATS, export_response
+from app.utils.dashboard_stats import complaint_stats
 import uuid
 import os
 from datetime import datetime
@@ -13,6 +20,10 @@ router = APIRouter(prefix="/api/complaints", tags=["complaints"])
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR = "uploads/complaints"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+MAX_ATTACHMENT_SIZE = int(os.getenv("MAX_COMPLAINT_ATTACHMENT_BYTES", str(10 * 1024 * 1024)))  # 10MB
+# Complaint list order, served by ix_complaints_created_at_id
+COMPLAINT_LIST_ORDER = [(Complaint.created_at, "desc"), (Complaint.id, "desc")]
+COMPLAINT_FIELDS = SparseFields(Complaint, ComplaintResponse)
 
 @router.post("/", response_model=ComplaintResponse)
 async def create_complaint(
@@ -37,14 +48,14 @@ async def create_complaint(
         
         if file:
             # Generate unique filename
-            file_extension = os.path.splitext(file.filename)[1]
-            unique_filename = f"{reference_id}_{file.filename}"
-            file_path = os.path.join(UPLOAD_DIR, unique_filename)
+            unique_filename = f"{reference_id}_{os.path.basename(file.filename)}"
             
             # Save file
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
+            try:
+                upload = await stream_upload_file(file, UPLOAD_DIR, unique_filename, max_bytes=MAX_ATTACHMENT_SIZE)
+            except UploadTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            file_path = upload.path
             
             file_name = file.filename
             file_type = file.content_type
@@ -69,19 +80,29 @@ async def create_complaint(
         db.refresh(complaint)
         
         return complaint
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/", response_model=List[ComplaintResponse])
 def get_complaints(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     status: Optional[str] = None,
     complaint_type: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(Complaint)
+    """fields (e.g. fields=reference_id,subject,status) returns only those fields"""
+    try:
+        field_names = COMPLAINT_FIELDS.parse(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = db.query(*COMPLAINT_FIELDS.columns(field_names)) if field_names else db.query(Complaint)
     
     if status:
         query = query.filter(Complaint.status == status)
@@ -89,9 +110,45 @@ def get_complaints(
     if complaint_type:
         query = query.filter(Complaint.complaint_type == complaint_type)
     
-    complaints = query.order_by(Complaint.created_at.desc()).offset(skip).limit(limit).all()
+    # The next page's cursor is returned in the X-Next-Cursor header
+    try:
+        complaints, next_cursor = paginate(query, Complaint, COMPLAINT_LIST_ORDER, limit, skip=skip, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if field_names:
+        return sparse_json_response(COMPLAINT_FIELDS.serialize(complaints, field_names), next_cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return complaints
 
+@router.get("/export")
+def export_complaints(
+    format: str = "csv",
+    status: Optional[str] = None,
+    complaint_type: Optional[str] = None,
+    fields: Optional[str] = None,
+    gzip: bool = False,
+    accept_encoding: Optional[str] = Header(None),
+    admin: AdminUser = Depends(require_admin)
+):
+    """Download every complaint matching the list filters as CSV, NDJSON or XLSX"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    try:
+        field_names = COMPLAINT_FIELDS.parse(fields) or COMPLAINT_FIELDS.allowed
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filters = []
+    if status:
+        filters.append(Complaint.status == status)
+    if complaint_type:
+        filters.append(Complaint.complaint_type == complaint_type)
+    
+    filename = f"complaints_{datetime.now().strftime('%Y%m%d')}"
+    return export_response(format, Complaint, COMPLAINT_FIELDS, field_names, filters, filename,
+                           gzip=gzip, accept_encoding=accept_encoding)
+
 @router.get("/{complaint_id}", response_model=ComplaintResponse)
 def get_complaint(complaint_id: int, db: Session = Depends(get_db)):
     complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
@@ -133,19 +190,7 @@ def delete_complaint(complaint_id: int, db: Session = Depends(get_db)):
 
 @router.get("/stats/summary")
 def get_complaint_stats(db: Session = Depends(get_db)):
-    total_complaints = db.query(Complaint).count()
-    pending_complaints = db.query(Complaint).filter(Complaint.status == 'pending').count()
-    in_progress_complaints = db.query(Complaint).filter(Complaint.status == 'in_progress').count()
-    resolved_complaints = db.query(Complaint).filter(Complaint.status == 'resolved').count()
-    closed_complaints = db.query(Complaint).filter(Complaint.status == 'closed').count()
-    
-    return {
-        "total_complaints": total_complaints,
-        "pending_complaints": pending_complaints,
-        "in_progress_complaints": in_progress_complaints,
-        "resolved_complaints": resolved_complaints,
-        "closed_complaints": closed_complaints
-    }
+    return complaint_stats(db)
 
 @router.get("/types/list")
 def get_complaint_types(db: Session = Depends(get_db)):
@@ -1,15 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import List, Optional
 from app.database import get_db
 from app.models.donation import Donation
+from app.models.admin_user import AdminUser
+from app.utils.admin_auth import require_admin
 from app.schemas.donation import DonationCreate, DonationResponse, DonationUpdate
+from app.utils.pagination import paginate, InvalidCursor
+from app.utils.sparse_fields import SparseFields, sparse_json_response
+from app.utils.exports import EXPORT_FORMATS, export_response
+from app.utils.dashboard_stats import donation_stats
 import uuid
 from datetime import datetime
 
 router = APIRouter(prefix="/api/donations", tags=["donations"])
 
+# Donation list order, served by ix_donations_created_at_id
+DONATION_LIST_ORDER = [(Donation.created_at, "desc"), (Donation.id, "desc")]
+DONATION_FIELDS = SparseFields(Donation, DonationResponse)
+
 @router.post("/", response_model=DonationResponse)
 async def create_donation(
     name: str = Form(...),
@@ -45,19 +54,57 @@ async def create_donation(
 
 @router.get("/", response_model=List[DonationResponse])
 def get_donations(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     status: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(Donation)
+    """fields (e.g. fields=name,amount,status,donation_date) returns only those fields"""
+    try:
+        field_names = DONATION_FIELDS.parse(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = db.query(*DONATION_FIELDS.columns(field_names)) if field_names else db.query(Donation)
     
     if status:
         query = query.filter(Donation.status == status)
     
-    donations = query.offset(skip).limit(limit).all()
+    # The next page's cursor is returned in the X-Next-Cursor header
+    try:
+        donations, next_cursor = paginate(query, Donation, DONATION_LIST_ORDER, limit, skip=skip, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if field_names:
+        return sparse_json_response(DONATION_FIELDS.serialize(donations, field_names), next_cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return donations
 
+@router.get("/export")
+def export_donations(
+    format: str = "csv",
+    status: Optional[str] = None,
+    fields: Optional[str] = None,
+    gzip: bool = False,
+    accept_encoding: Optional[str] = Header(None),
+    admin: AdminUser = Depends(require_admin)
+):
+    """Download every donation matching the list filters as CSV, NDJSON or XLSX"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    try:
+        field_names = DONATION_FIELDS.parse(fields) or DONATION_FIELDS.allowed
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filters = [Donation.status == status] if status else []
+    filename = f"donations_{datetime.now().strftime('%Y%m%d')}"
+    return export_response(format, Donation, DONATION_FIELDS, field_names, filters, filename,
+                           gzip=gzip, accept_encoding=accept_encoding)
+
 @router.get("/{donation_id}", response_model=DonationResponse)
 def get_donation(donation_id: int, db: Session = Depends(get_db)):
     donation = db.query(Donation).filter(Donation.id == donation_id).first()
@@ -95,19 +142,4 @@ def delete_donation(donation_id: int, db: Session = Depends(get_db)):
 
 @router.get("/stats/summary")
 def get_donation_stats(db: Session = Depends(get_db)):
-    total_donations = db.query(Donation).count()
-    pending_donations = db.query(Donation).filter(Donation.status == 'pending').count()
-    verified_donations = db.query(Donation).filter(Donation.status == 'verified').count()
-    acknowledged_donations = db.query(Donation).filter(Donation.status == 'acknowledged').count()
-    
-    total_amount = db.query(Donation).filter(Donation.status == 'verified').with_entities(
-        func.sum(Donation.amount)
-    ).scalar() or 0
-    
-    return {
-        "total_donations": total_donations,
-        "pending_donations": pending_donations,
-        "verified_donations": verified_donations,
-        "acknowledged_donations": acknowledged_donations,
-        "total_amount_raised": total_amount
-    }
+    return donation_stats(db)
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+from pydantic import BaseModel
+from app.database import get_db
+from app.models.email_campaign import EmailCampaign
+from app.models.admin_user import AdminUser
+from app.utils.admin_auth import require_admin
+from app.utils.email_outbox import outbox_status_counts
+from app.utils.email_templates import compile_campaign_template
+from jinja2 import TemplateSyntaxError
+from app.utils.job_queue import enqueue_job
+import json
+
+router = APIRouter(prefix="/api/email-campaigns", tags=["email"])
+
+class EmailCampaignCreate(BaseModel):
+    name: str
+    subject: str
+    body_html: str
+    body_text: Optional[str] = None
+    # Member filters; members without an email address are always skipped
+    state: Optional[str] = None
+    district: Optional[str] = None
+    status: Optional[str] = None
+
+@router.post("/")
+async def create_campaign(
+    campaign_data: EmailCampaignCreate,
+    db: Session = Depends(get_db),
+    admin: AdminUser = Depends(require_admin)
+):
+    """
+    Create a campaign; the worker queues its recipients and sends within the
+    rate limit. Subject and bodies may use {{ name }} and {{ membership_id }}.
+    """
+    try:
+        compile_campaign_template(campaign_data.subject, html=False)
+        compile_campaign_template(campaign_data.body_html)
+        if campaign_data.body_text:
+            compile_campaign_template(campaign_data.body_text, html=False)
+    except TemplateSyntaxError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid template: {e}")
+    
+    filters = {
+        "state": campaign_data.state,
+        "district": campaign_data.district,
+        "status": campaign_data.status
+    }
+    campaign = EmailCampaign(
+        name=campaign_data.name,
+        subject=campaign_data.subject,
+        body_html=campaign_data.body_html,
+        body_text=campaign_data.body_text,
+        filters=json.dumps({key: value for key, value in filters.items() if value}),
+        status="queued"
+    )
+    db.add(campaign)
+    db.flush()
+    enqueue_job(db, "expand_email_campaign", {"campaign_id": campaign.id}, reference=f"campaign:{campaign.id}")
+    db.commit()
+    db.refresh(campaign)
+    
+    return campaign.to_dict()
+
+@router.get("/")
+async def list_campaigns(
+    skip: int = 0,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    admin: AdminUser = Depends(require_admin)
+):
+    campaigns = db.query(EmailCampaign).order_by(EmailCampaign.id.desc()).offset(skip).limit(limit).all()
+    return [campaign.to_dict() for campaign in campaigns]
+
+@router.get("/outbox/stats")
+async def get_outbox_stats(db: Session = Depends(get_db), admin: AdminUser = Depends(require_admin)):
+    """Number of outbox emails queued, sending, sent and failed"""
+    return outbox_status_counts(db)
+
+@router.get("/{campaign_id}")
+async def get_campaign(campaign_id: int, db: Session = Depends(get_db), admin: AdminUser = Depends(require_admin)):
+    """A campaign with the delivery status of its emails"""
+    campaign = db.query(EmailCampaign).filter(EmailCampaign.id == campaign_id).first()
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    
+    return {
+        **campaign.to_dict(),
+        "filters": json.loads(campaign.filters or "{}"),
+        "emails": outbox_status_counts(db, campaign_id)
+    }
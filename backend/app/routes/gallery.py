@@ -2,14 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, s
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import os
-import uuid
-import shutil
 from datetime import datetime
 
 from app.database import get_db
 from app.models.gallery import Gallery
 from app.schemas.gallery import GalleryCreate, GalleryUpdate, GalleryResponse, GalleryList, GalleryStats
-from app.utils.file_handler import save_upload_file, delete_file, get_file_size
+from app.utils.file_handler import save_upload_file, delete_file, get_file_size, stream_upload_file, UploadTooLarge
+from app.utils.pagination import paginate, InvalidCursor
+from app.utils.dashboard_stats import gallery_stats
 
 router = APIRouter()
 
@@ -18,6 +18,9 @@ ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/jpg", "image/png", "image/gif", "ima
 ALLOWED_VIDEO_TYPES = ["video/mp4", "video/avi", "video/mov", "video/wmv", "video/flv", "video/quicktime"]
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
+# Gallery order, served by ix_gallery_listing
+GALLERY_LIST_ORDER = [(Gallery.display_order, "asc"), (Gallery.created_at, "desc"), (Gallery.id, "desc")]
+
 UPLOAD_DIR = "uploads/gallery"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
@@ -25,11 +28,12 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 async def get_gallery_items(
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
     type_filter: Optional[str] = None,
     active_only: bool = True,
     db: Session = Depends(get_db)
 ):
-    """Get all gallery items with pagination and filtering"""
+    """Get all gallery items with pagination and filtering; pass next_cursor back as cursor for the next page"""
     query = db.query(Gallery)
     
     if active_only:
@@ -39,36 +43,24 @@ async def get_gallery_items(
         query = query.filter(Gallery.type == type_filter)
     
     total = query.count()
-    items = query.order_by(Gallery.display_order.asc(), Gallery.created_at.desc()).offset(skip).limit(limit).all()
+    try:
+        items, next_cursor = paginate(query, Gallery, GALLERY_LIST_ORDER, limit, skip=skip, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return GalleryList(
         items=[GalleryResponse.from_orm(item) for item in items],
         total=total,
         page=skip // limit + 1,
         per_page=limit,
-        total_pages=(total + limit - 1) // limit
+        total_pages=(total + limit - 1) // limit,
+        next_cursor=next_cursor
     )
 
 @router.get("/stats", response_model=GalleryStats)
 async def get_gallery_stats(db: Session = Depends(get_db)):
     """Get gallery statistics"""
-    total_items = db.query(Gallery).count()
-    total_images = db.query(Gallery).filter(Gallery.type == "image").count()
-    total_videos = db.query(Gallery).filter(Gallery.type == "video").count()
-    active_items = db.query(Gallery).filter(Gallery.is_active == True).count()
-    
-    # Items created in last 30 days
-    from datetime import timedelta
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    new_items_last_30_days = db.query(Gallery).filter(Gallery.created_at >= thirty_days_ago).count()
-    
-    return GalleryStats(
-        total_items=total_items,
-        total_images=total_images,
-        total_videos=total_videos,
-        active_items=active_items,
-        new_items_last_30_days=new_items_last_30_days
-    )
+    return GalleryStats(**gallery_stats(db))
 
 @router.get("/{item_id}", response_model=GalleryResponse)
 async def get_gallery_item(item_id: int, db: Session = Depends(get_db)):
@@ -125,26 +117,14 @@ async def upload_gallery_item(
                 detail=f"Invalid video file type. Content-Type received: {file.content_type}. Allowed types: {', '.join(ALLOWED_VIDEO_TYPES)}"
             )
     
-    # Check file size
-    file_content = await file.read()
-    if len(file_content) > MAX_FILE_SIZE:
+    # Save file, checking its size as it is copied
+    try:
+        upload = await stream_upload_file(file, UPLOAD_DIR, max_bytes=MAX_FILE_SIZE)
+    except UploadTooLarge as e:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File size exceeds maximum limit of {MAX_FILE_SIZE // (1024*1024)}MB"
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
         )
-    
-    # Reset file pointer
-    await file.seek(0)
-    
-    # Generate unique filename
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    
-    # Save file
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -157,8 +137,8 @@ async def upload_gallery_item(
         caption=caption,
         type=type,
         file_name=file.filename,
-        file_path=f"/static/gallery/{unique_filename}",
-        file_size=len(file_content),
+        file_path=f"/static/gallery/{upload.filename}",
+        file_size=upload.size,
         mime_type=file.content_type,
         alt_text=alt_text,
         display_order=display_order,
@@ -172,8 +152,7 @@ async def upload_gallery_item(
         return GalleryResponse.from_orm(gallery_item)
     except Exception as e:
         # Clean up uploaded file if database insert fails
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        delete_file(upload.path)
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,24 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
 from typing import Optional
 from app.database import get_db
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from app.models.member import Member
-from app.utils.idcard_generator import generate_id_card
-from app.utils.email_service import send_membership_email
+from app.utils.idcard_generator import IDCARDS_DIR
+from app.utils.idcard_cache import (
+    IDCARD_RENDER_MODE, parse_card_filename, member_card_fields,
+    ensure_card_rendered, cached_card_path, lazy_card_url, record_card_render
+)
+from app.utils.job_queue import enqueue_job
+from app.utils.email_outbox import queue_welcome_email
+from app.utils.idcard_batch import enqueue_card_renders
+from app.utils.print_pack import PRINT_PACK_WORKERS, shared_render_pool, stream_print_pack
+from app.utils.admin_auth import optional_admin, require_admin
+from app.utils.photo_processing import process_member_photo, delete_member_photo, photo_variant_url, PhotoRejected, MAX_PHOTO_BYTES
+from app.utils.file_handler import stream_upload_file, delete_file, UploadTooLarge
+from app.utils.contact_normalization import normalize_email, normalize_phone
+from app.utils.membership_ids import allocate_membership_id
+from app.utils.member_import import import_members_file, ImportFileError
+from app.utils.aadhar import aadhar_blind_index, decrypt_aadhar, mask_aadhar, normalize_aadhar
+from app.utils.member_search import apply_member_search, member_search_filter
+from app.utils.pagination import paginate, InvalidCursor
+from app.utils.sparse_fields import SparseFields, sparse_json_response
+from app.utils.exports import EXPORT_FORMATS, export_response
+from app.utils.dashboard_stats import member_stats
+from app.utils.idempotency import claim_idempotency_key, complete_idempotency_key, release_idempotency_key
+from fastapi.concurrency import run_in_threadpool
+from app.models.job import Job
+from app.models.admin_user import AdminUser
 import os
+import tempfile
 import uuid
-from pydantic import BaseModel, EmailStr
-from datetime import datetime, timedelta
+from pydantic import BaseModel
+from datetime import datetime
 
 # Pydantic models for request/response
 class MembershipRegisterResponse(BaseModel):
     success: bool
     membership_id: Optional[str] = None
     id_card_url: Optional[str] = None
+    card_status: Optional[str] = None
+    card_job_id: Optional[int] = None
     message: str
 
+class CardStatusResponse(BaseModel):
+    membership_id: str
+    status: str  # ready, queued, running, failed, missing, awaiting_approval, on_demand
+    id_card_url: Optional[str] = None
+    job_id: Optional[int] = None
+    error: Optional[str] = None
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: list[str]
+
+class MemberImportResponse(BaseModel):
+    dry_run: bool
+    total_rows: int
+    valid: int  # rows that passed every check; with dry_run nothing is imported
+    imported: int
+    failed: int
+    membership_id_ranges: list[tuple[str, str]]
+    errors: list[ImportRowError]
+
+class BulkStatusUpdate(BaseModel):
+    member_ids: list[int]
+    status: str
+
 class MembershipResponse(BaseModel):
     id: int
     membership_id: str
@@ -29,7 +80,7 @@ class MembershipResponse(BaseModel):
     caste: str
     aadhar: str
     phone: str
-    email: str
+    email: Optional[str] = None
     state: str
     district: str
     mandal: str
@@ -37,31 +88,77 @@ class MembershipResponse(BaseModel):
     address: str
     status: str
     photo_url: Optional[str] = None
+    photo_thumbnail_url: Optional[str] = None
+    photo_medium_url: Optional[str] = None
     id_card_url: Optional[str] = None
     created_at: datetime
 
     class Config:
         from_attributes = True
 
+MEMBER_PHOTO_VARIANT_FIELDS = {
+    "photo_thumbnail_url": (["photo_url"], lambda row: photo_variant_url(row.photo_url, "sm")),
+    "photo_medium_url": (["photo_url"], lambda row: photo_variant_url(row.photo_url, "md")),
+}
+# Member fields for fields=, with those computed from other columns. Aadhar
+# numbers are masked to their last four digits except for admins
+MEMBER_FIELDS = SparseFields(Member, MembershipResponse, derived={
+    "aadhar": (["aadhar_encrypted"], lambda row: mask_aadhar(decrypt_aadhar(row.aadhar_encrypted))),
+    **MEMBER_PHOTO_VARIANT_FIELDS,
+})
+MEMBER_ADMIN_FIELDS = SparseFields(Member, MembershipResponse, derived={
+    "aadhar": (["aadhar_encrypted"], lambda row: decrypt_aadhar(row.aadhar_encrypted)),
+    **MEMBER_PHOTO_VARIANT_FIELDS,
+})
+# Fields a member export can contain; Aadhar numbers are never exported
+MEMBER_EXPORT = SparseFields(Member, MembershipResponse, derived=MEMBER_PHOTO_VARIANT_FIELDS, exclude=("aadhar",))
+# Exported unless fields= says otherwise
+MEMBER_EXPORT_FIELDS = [
+    name for name in MEMBER_EXPORT.allowed if name not in MEMBER_PHOTO_VARIANT_FIELDS
+]
+
+def member_response(member: Member, admin: Optional[AdminUser]) -> MembershipResponse:
+    """A member as the API returns it, the Aadhar number masked unless an admin asks"""
+    response = MembershipResponse.model_validate(member)
+    if admin is None:
+        response.aadhar = mask_aadhar(response.aadhar)
+    return response
+
 router = APIRouter()
 
-def generate_membership_id(db: Session) -> str:
-    """Generate unique membership ID in format MMN-YYYY-XXXXXX"""
-    year = datetime.now().year
-    
-    # Get the current count for this year
-    last_member = db.query(Member).filter(
-        Member.membership_id.like(f"MMN-{year}-%")
-    ).order_by(Member.membership_id.desc()).first()
-    
-    if last_member:
-        # Extract the last sequence number and increment
-        last_sequence = int(last_member.membership_id.split('-')[-1])
-        count = last_sequence + 1
-    else:
-        count = 1
-    
-    return f"MMN-{year}-{count:06d}"
+MAX_IMPORT_BYTES = int(os.getenv("MAX_IMPORT_BYTES", str(50 * 1024 * 1024)))
+# Member list order, served by ix_members_created_at_id
+MEMBER_LIST_ORDER = [(Member.created_at, "desc"), (Member.id, "desc")]
+
+DUPLICATE_MEMBER_MESSAGES = {
+    "email": "Email already exists. Please try with a different email address.",
+    "phone": "Phone number already exists. Please try with a different phone number.",
+    "aadhar": "Aadhar card number already exists. Please try with a different Aadhar number.",
+}
+
+def find_duplicate_member_field(db: Session, email: Optional[str], phone: str, aadhar: str) -> Optional[str]:
+    """The first of email, phone and Aadhar that is already registered, found in one indexed query"""
+    aadhar_hash = aadhar_blind_index(aadhar)
+    clauses = [Member.phone == phone, Member.aadhar_hash == aadhar_hash]
+    if email:
+        clauses.append(Member.email == email)
+    # Each field is unique, so at most three members can match
+    rows = db.execute(select(Member.email, Member.phone, Member.aadhar_hash).where(or_(*clauses)).limit(3)).all()
+    for field, column, value in (("email", "email", email), ("phone", "phone", phone), ("aadhar", "aadhar_hash", aadhar_hash)):
+        if value and any(getattr(row, column) == value for row in rows):
+            return field
+    return None
+
+def duplicate_member_field_from_error(error: IntegrityError) -> Optional[str]:
+    """The unique member field an insert violated, from the database's error message"""
+    message = str(error.orig)
+    if "unique" not in message.lower() and "duplicate" not in message.lower():
+        return None
+    for field in DUPLICATE_MEMBER_MESSAGES:
+        # SQLite names the column, PostgreSQL the constraint or index and the key
+        if any(pattern in message for pattern in (f"members.{field}", f"ix_members_{field}", f"members_{field}_key", f"({field})")):
+            return field
+    return None
 
 @router.post("/register", response_model=MembershipRegisterResponse)
 async def register_member(
@@ -79,63 +176,110 @@ async def register_member(
     mandal: str = Form(...),
     village: str = Form(...),
     fullAddress: str = Form(...),
-    photo: Optional[UploadFile] = File(None)
+    photo: Optional[UploadFile] = File(None),
+    idempotency_key: Optional[str] = Header(None)
 ):
+    """
+    Register a member. Clients on unreliable connections should send an
+    Idempotency-Key header that stays the same across retries of one form
+    submission: a retry after a successful registration gets the original
+    response back without registering or rendering anything again.
+    """
+    fields = dict(
+        fullName=fullName, fatherName=fatherName, gender=gender, dob=dob, caste=caste, aadhar=aadhar,
+        phone=phone, email=email, state=state, district=district, mandal=mandal, village=village,
+        fullAddress=fullAddress
+    )
+    if not idempotency_key:
+        return await create_member(db, photo=photo, **fields)
+    
+    record, replay = claim_idempotency_key(db, "membership.register", idempotency_key, fields)
+    if replay is not None:
+        print(f"Replaying registration for Idempotency-Key {idempotency_key}")
+        return replay
+    try:
+        response = await create_member(db, photo=photo, **fields)
+    except BaseException:
+        release_idempotency_key(db, record)
+        raise
+    # Only successes are replayed; after a failure the client may fix the form and retry
+    if response.success:
+        complete_idempotency_key(db, record, response.model_dump())
+    else:
+        release_idempotency_key(db, record)
+    return response
+
+async def create_member(
+    db: Session,
+    fullName: str,
+    fatherName: str,
+    gender: str,
+    dob: str,
+    caste: str,
+    aadhar: str,
+    phone: str,
+    email: str,
+    state: str,
+    district: str,
+    mandal: str,
+    village: str,
+    fullAddress: str,
+    photo: Optional[UploadFile] = None
+) -> MembershipRegisterResponse:
+    # Photo files written for this registration, removed unless the member is committed
+    stored_photo_url = None
     try:
         print(f"Registration attempt for email: {email}, phone: {phone}")
-        print(f"Form data received: fullName={fullName}, fatherName={fatherName}, gender={gender}, dob={dob}, caste={caste}, aadhar={aadhar}, phone={phone}, email={email}, state={state}, district={district}, mandal={mandal}, village={village}, fullAddress={fullAddress}")
+        print(f"Form data received: fullName={fullName}, fatherName={fatherName}, gender={gender}, dob={dob}, caste={caste}, aadhar={mask_aadhar(aadhar)}, phone={phone}, email={email}, state={state}, district={district}, mandal={mandal}, village={village}, fullAddress={fullAddress}")
         print(f"Photo received: {photo is not None}")
         
-        # Check if email already exists (only if email is provided)
-        if email:
-            existing_member = db.query(Member).filter(Member.email == email).first()
-            if existing_member:
-                print(f"Email already exists: {email}")
-                return MembershipRegisterResponse(
-                    success=False,
-                    message="Email already exists. Please try with a different email address."
-                )
-        
-        # Check if phone already exists
-        existing_phone = db.query(Member).filter(Member.phone == phone).first()
-        if existing_phone:
-            print(f"Phone already exists: {phone}")
+        try:
+            phone = normalize_phone(phone)
+        except ValueError:
             return MembershipRegisterResponse(
                 success=False,
-                message="Phone number already exists. Please try with a different phone number."
+                message="Please enter a valid phone number."
             )
+        email = normalize_email(email)
+        aadhar = normalize_aadhar(aadhar)
         
-        # Check if Aadhar already exists
-        existing_aadhar = db.query(Member).filter(Member.aadhar == aadhar.replace(" ", "")).first()
-        if existing_aadhar:
-            print(f"Aadhar already exists: {aadhar}")
+        # Check email, phone and Aadhar against the unique indexes in one query
+        duplicate_field = find_duplicate_member_field(db, email, phone, aadhar)
+        if duplicate_field:
+            print(f"{duplicate_field} already exists: {email}, {phone}")
             return MembershipRegisterResponse(
                 success=False,
-                message="Aadhar card number already exists. Please try with a different Aadhar number."
+                message=DUPLICATE_MEMBER_MESSAGES[duplicate_field]
             )
         
         print("Validations passed, proceeding with registration")
         
-        # Generate membership ID
-        membership_id = generate_membership_id(db)
-        
-        # Save photo if uploaded
+        # Save photo if uploaded, normalised and with its derived variants
         photo_url = None
         if photo:
-            # Create photos directory if it doesn't exist
-            photos_dir = "app/static/photos"
-            os.makedirs(photos_dir, exist_ok=True)
-            
-            # Generate unique filename
-            photo_filename = f"{membership_id}_{uuid.uuid4().hex[:8]}.jpg"
-            photo_path = os.path.join(photos_dir, photo_filename)
-            
-            # Save photo
-            with open(photo_path, "wb") as buffer:
-                content = await photo.read()
-                buffer.write(content)
-            
-            photo_url = f"/static/photos/{photo_filename}"
+            try:
+                upload = await stream_upload_file(photo, tempfile.gettempdir(), max_bytes=MAX_PHOTO_BYTES)
+            except UploadTooLarge as e:
+                print(f"Photo rejected: {e}")
+                return MembershipRegisterResponse(
+                    success=False,
+                    message=f"The uploaded photo is too large. Please upload a photo under {e.max_bytes // (1024 * 1024)}MB."
+                )
+            try:
+                photo_url = stored_photo_url = await run_in_threadpool(
+                    process_member_photo, upload.path, uuid.uuid4().hex
+                )
+            except PhotoRejected as e:
+                print(f"Photo rejected: {e}")
+                return MembershipRegisterResponse(
+                    success=False,
+                    message="The uploaded photo could not be processed. Please upload a JPEG or PNG image."
+                )
+            finally:
+                delete_file(upload.path)
+        
+        # Only accepted registrations take a membership ID
+        membership_id = await run_in_threadpool(allocate_membership_id)
         
         # Create new member
         new_member = Member(
@@ -145,7 +289,7 @@ async def register_member(
             gender=gender,
             dob=dob,
             caste=caste,
-            aadhar=aadhar.replace(" ", ""),
+            aadhar=aadhar,
             phone=phone,
             email=email,
             state=state,
@@ -157,68 +301,53 @@ async def register_member(
             photo_url=photo_url
         )
         
-        # Final validation check before committing
-        final_email_check = db.query(Member).filter(Member.email == email).first()
-        final_phone_check = db.query(Member).filter(Member.phone == phone).first()
-        
-        if final_email_check or final_phone_check:
-            print(f"Duplicate detected at final check: email={final_email_check is not None}, phone={final_phone_check is not None}")
+        # A registration racing this one is caught by the unique indexes
+        db.add(new_member)
+        try:
+            db.flush()
+        except IntegrityError as e:
             db.rollback()
+            delete_member_photo(stored_photo_url)
+            duplicate_field = duplicate_member_field_from_error(e)
+            print(f"Duplicate detected on insert: {duplicate_field}")
             return MembershipRegisterResponse(
                 success=False,
-                message="Duplicate entry detected. Please try with different email/phone."
+                message=DUPLICATE_MEMBER_MESSAGES.get(
+                    duplicate_field, "Duplicate entry detected. Please try with different email/phone."
+                )
             )
         
-        db.add(new_member)
+        # Cards are rendered on first download in lazy mode; in eager mode a
+        # background job renders it and in approval mode nothing is rendered
+        # until the member is approved. Jobs are committed atomically with the member.
+        # id_card_url is only stored once a card has been rendered
+        card_job = None
+        card_url = None
+        if IDCARD_RENDER_MODE == "eager":
+            card_job = enqueue_job(db, "render_id_card", {"member_id": new_member.id}, reference=membership_id)
+        elif IDCARD_RENDER_MODE == "lazy":
+            card_url = lazy_card_url(new_member)
+        if email:
+            queue_welcome_email(db, email, fullName, membership_id)
         db.commit()
-        db.refresh(new_member)
+        stored_photo_url = None
         
         print(f"Successfully registered member: {membership_id}")
         
-        # Generate ID card with photo if available
-        photo_path = None
-        if photo_url:
-            # Convert URL to absolute file path
-            if photo_url.startswith("/static/photos/"):
-                photo_path = photo_url.replace("/static/", "app/static/")
-            else:
-                # Handle other photo URL formats
-                photo_path = photo_url
-        
-        id_card_path = generate_id_card(
-            membership_id=membership_id,
-            name=fullName,
-            village=village,
-            district=district,
-            phone=phone,
-            state=state,
-            photo_path=photo_path
-        )
-        
-        # Update member with ID card URL
-        new_member.id_card_url = f"/static/idcards/{os.path.basename(id_card_path)}?t={datetime.now().timestamp()}"
-        db.commit()
-        
-        # Send welcome email (optional)
-        try:
-            await send_membership_email(
-                email=email,
-                name=fullName,
-                membership_id=membership_id
-            )
-        except Exception as email_error:
-            print(f"Email sending failed: {email_error}")
-            # Continue even if email fails
-        
         return MembershipRegisterResponse(
             success=True,
             membership_id=membership_id,
-            id_card_url=new_member.id_card_url,
+            id_card_url=card_url,
+            card_status=card_job.status if card_job else (
+                "awaiting_approval" if IDCARD_RENDER_MODE == "approval" else "on_demand"
+            ),
+            card_job_id=card_job.id if card_job else None,
             message="Membership registered successfully"
         )
         
     except Exception as e:
         db.rollback()
+        delete_member_photo(stored_photo_url)
         print(f"Registration error: {str(e)}")
         return MembershipRegisterResponse(
             success=False,
@@ -226,9 +355,29 @@ async def register_member(
         )
 
 @router.get("/idcard/{filename}")
-async def get_id_card(filename: str):
-    """Serve ID card with proper MIME type"""
-    id_card_path = f"app/static/idcards/{filename}"
+async def get_id_card(filename: str, db: Session = Depends(get_db)):
+    """Serve a member's ID card, rendering it on demand when the cached card is missing or stale"""
+    parsed = parse_card_filename(filename)
+    member = None
+    if parsed:
+        member = db.query(Member).filter(Member.membership_id == parsed[0]).first()
+    
+    if member and IDCARD_RENDER_MODE == "approval" and member.status != "approved":
+        raise HTTPException(status_code=403, detail="ID card is available after membership approval")
+    
+    if member:
+        membership_id, extension = parsed
+        try:
+            fingerprint = await ensure_card_rendered(member_card_fields(member), formats=(extension,))
+        except Exception as e:
+            print(f"Error rendering ID card: {e}")
+            raise HTTPException(status_code=500, detail="Failed to render ID card")
+        id_card_path = cached_card_path(membership_id, fingerprint, extension)
+        if record_card_render(member, fingerprint):
+            db.commit()
+    else:
+        # Cards rendered before the render cache existed
+        id_card_path = os.path.join(IDCARDS_DIR, os.path.basename(filename))
     
     if not os.path.exists(id_card_path):
         raise HTTPException(status_code=404, detail="ID card not found")
@@ -247,68 +396,210 @@ async def get_id_card(filename: str):
         filename=filename
     )
 
+@router.post("/import", response_model=MemberImportResponse)
+async def import_members(
+    file: UploadFile = File(...),
+    dry_run: bool = Form(False)
+):
+    """
+    Import members collected offline from a CSV or XLSX file with one row
+    per member. Rows are checked and inserted in batches; the response
+    lists every rejected row with its problems. With dry_run nothing is
+    written.
+    """
+    try:
+        upload = await stream_upload_file(file, tempfile.gettempdir(), max_bytes=MAX_IMPORT_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        report = await run_in_threadpool(import_members_file, upload.path, file.filename, dry_run)
+    except ImportFileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        delete_file(upload.path)
+    print(f"Member import {file.filename}: {report['valid']} valid, {report['imported']} imported, {report['failed']} rejected")
+    return report
+
+@router.get("/print-pack")
+async def get_print_pack(
+    district: Optional[str] = None,
+    mandal: Optional[str] = None,
+    status: Optional[str] = None,
+    layout: str = "sheets",
+    card_format: str = "png",
+    admin: AdminUser = Depends(require_admin)
+):
+    """
+    Stream a print pack of member ID cards as they are produced: imposed A4
+    PDF sheets (10 cards per page with crop marks) or a ZIP of card files.
+    Admin only; missing cards are rendered in the shared render pool.
+    """
+    if layout not in ("sheets", "zip"):
+        raise HTTPException(status_code=400, detail="layout must be 'sheets' or 'zip'")
+    if card_format not in ("png", "pdf", "both"):
+        raise HTTPException(status_code=400, detail="card_format must be 'png', 'pdf' or 'both'")
+    
+    name = "_".join(part.replace(" ", "-") for part in (district, mandal, status) if part) or "all"
+    if layout == "sheets":
+        media_type, filename = "application/pdf", f"print_pack_{name}.pdf"
+    else:
+        media_type, filename = "application/zip", f"print_pack_{name}.zip"
+    
+    return StreamingResponse(
+        stream_print_pack(layout=layout, card_format=card_format, district=district, mandal=mandal, status=status,
+                          workers=PRINT_PACK_WORKERS, pool=shared_render_pool()),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/export")
+async def export_members(
+    format: str = "csv",
+    search: Optional[str] = None,
+    state: Optional[str] = None,
+    aadhar: Optional[str] = None,
+    fields: Optional[str] = None,
+    gzip: bool = False,
+    accept_encoding: Optional[str] = Header(None),
+    admin: AdminUser = Depends(require_admin)
+):
+    """
+    Download every member matching the list filters as CSV, NDJSON or XLSX,
+    streamed in id order a batch at a time. gzip=true compresses CSV and
+    NDJSON for clients that accept it. Admin only; Aadhar numbers are left out.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    try:
+        field_names = MEMBER_EXPORT.parse(fields) or MEMBER_EXPORT_FIELDS
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filters = []
+    if aadhar:
+        filters.append(Member.aadhar_hash == aadhar_blind_index(aadhar))
+    if state:
+        filters.append(Member.state == state)
+    if search and search.strip():
+        filters.append(member_search_filter(search))
+    
+    filename = f"members_{datetime.now().strftime('%Y%m%d')}"
+    return export_response(format, Member, MEMBER_EXPORT, field_names, filters, filename,
+                           gzip=gzip, accept_encoding=accept_encoding)
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: int, db: Session = Depends(get_db)):
+    """Status of a background job such as an ID card render"""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job.to_dict()
+
+@router.get("/{membership_id}/card-status", response_model=CardStatusResponse)
+async def get_card_status(membership_id: str, db: Session = Depends(get_db)):
+    """Poll whether a member's ID card is ready after registration"""
+    member = db.query(Member).filter(Member.membership_id == membership_id).first()
+    if not member:
+        raise HTTPException(status_code=404, detail="Member not found")
+    
+    job = db.query(Job).filter(
+        Job.reference == membership_id,
+        Job.job_type == "render_id_card"
+    ).order_by(Job.id.desc()).first()
+    
+    # id_card_url is only stored once a card is rendered (cards from before the
+    # render cache have no fingerprint but their files exist)
+    id_card_url = member.id_card_url
+    if id_card_url and (job is None or job.status == "done"):
+        status = "ready"
+    elif job is not None:
+        status = job.status
+    elif IDCARD_RENDER_MODE == "approval":
+        # Approved members are rendered by a batched render_id_cards job
+        status = "queued" if member.status == "approved" else "awaiting_approval"
+    elif IDCARD_RENDER_MODE == "lazy":
+        # Rendered by the first download of the URL
+        status = "on_demand"
+        id_card_url = lazy_card_url(member)
+    else:
+        status = "missing"
+    
+    return CardStatusResponse(
+        membership_id=membership_id,
+        status=status,
+        id_card_url=id_card_url,
+        job_id=job.id if job else None,
+        error=job.error if job and job.status == "failed" else None
+    )
+
 @router.get("/{membership_id}", response_model=MembershipResponse)
-async def get_member(membership_id: str, db: Session = Depends(get_db)):
+async def get_member(
+    membership_id: str,
+    db: Session = Depends(get_db),
+    admin: Optional[AdminUser] = Depends(optional_admin)
+):
     member = db.query(Member).filter(Member.membership_id == membership_id).first()
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
     
-    return member
+    return member_response(member, admin)
 
 @router.get("/", response_model=list[MembershipResponse])
 async def get_all_members(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
     state: Optional[str] = None,
-    db: Session = Depends(get_db)
+    aadhar: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+    admin: Optional[AdminUser] = Depends(optional_admin)
 ):
-    query = db.query(Member)
+    """
+    Newest members first. Pass the X-Next-Cursor response header back as
+    cursor for the next page; skip still works but gets slower with depth.
+    Search results are ordered by relevance and paged with skip only.
+    fields (e.g. fields=membership_id,name,phone,status) returns only those
+    fields, reading only their columns. Aadhar numbers are masked unless the
+    request carries an admin token.
+    """
+    member_fields = MEMBER_ADMIN_FIELDS if admin else MEMBER_FIELDS
+    try:
+        field_names = member_fields.parse(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = db.query(*member_fields.columns(field_names)) if field_names else db.query(Member)
     
-    if search:
-        query = query.filter(
-            Member.name.ilike(f"%{search}%") |
-            Member.phone.ilike(f"%{search}%") |
-            Member.email.ilike(f"%{search}%") |
-            Member.membership_id.ilike(f"%{search}%") |
-            Member.aadhar.ilike(f"%{search}%")
-        )
+    # Aadhar numbers are encrypted, so they can only be matched in full, through the blind index
+    if aadhar:
+        query = query.filter(Member.aadhar_hash == aadhar_blind_index(aadhar))
     
     if state:
         query = query.filter(Member.state == state)
     
-    members = query.offset(skip).limit(limit).all()
-    return members
+    # Searched through the full-text index and identifier prefixes, best matches first
+    if search and search.strip():
+        if cursor:
+            raise HTTPException(status_code=400, detail="Search results are paged with skip, not cursor")
+        members, next_cursor = apply_member_search(query, search).offset(skip).limit(limit).all(), None
+    else:
+        try:
+            members, next_cursor = paginate(query, Member, MEMBER_LIST_ORDER, limit, skip=skip, cursor=cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    if field_names:
+        return sparse_json_response(member_fields.serialize(members, field_names), next_cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [member_response(member, admin) for member in members]
 
 @router.get("/stats/summary")
 async def get_member_stats(db: Session = Depends(get_db)):
-    total_members = db.query(Member).count()
-    pending_members = db.query(Member).filter(Member.status == 'pending').count()
-    approved_members = db.query(Member).filter(Member.status == 'approved').count()
-    rejected_members = db.query(Member).filter(Member.status == 'rejected').count()
-    
-    # Get members from last 30 days
-    new_members_this_month = db.query(Member).filter(
-        Member.created_at >= datetime.now() - timedelta(days=30)
-    ).count()
-    
-    # Get active members (approved)
-    active_members = approved_members
-    
-    # Get ID cards generated count
-    id_cards_generated = db.query(Member).filter(
-        Member.id_card_url.isnot(None)
-    ).count()
-    
-    return {
-        "total_members": total_members,
-        "pending_members": pending_members,
-        "approved_members": approved_members,
-        "rejected_members": rejected_members,
-        "new_members_this_month": new_members_this_month,
-        "active_members": active_members,
-        "id_cards_generated": id_cards_generated
-    }
+    return member_stats(db)
 
 @router.post("/{member_id}/regenerate-idcard")
 async def regenerate_id_card(member_id: int, db: Session = Depends(get_db)):
@@ -318,28 +609,11 @@ async def regenerate_id_card(member_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Member not found")
     
     try:
-        # Generate new ID card with updated format
-        photo_path = None
-        if member.photo_url:
-            # Convert URL to absolute file path
-            if member.photo_url.startswith("/static/photos/"):
-                photo_path = member.photo_url.replace("/static/", "app/static/")
-            else:
-                # Handle other photo URL formats
-                photo_path = member.photo_url
-        
-        id_card_path = generate_id_card(
-            membership_id=member.membership_id,
-            name=member.name,
-            village=member.village,
-            district=member.district,
-            phone=member.phone,
-            state=member.state,
-            photo_path=photo_path
-        )
+        # Re-render the ID card with the current format, off the event loop
+        fingerprint = await ensure_card_rendered(member_card_fields(member), force=True)
         
         # Update member with new ID card URL
-        member.id_card_url = f"/static/idcards/{os.path.basename(id_card_path)}?t={datetime.now().timestamp()}"
+        record_card_render(member, fingerprint)
         db.commit()
         
         return {
@@ -352,6 +626,31 @@ async def regenerate_id_card(member_id: int, db: Session = Depends(get_db)):
         print(f"Error regenerating ID card: {e}")
         raise HTTPException(status_code=500, detail="Failed to regenerate ID card")
 
+@router.patch("/status")
+async def update_members_status(update_request: BulkStatusUpdate, db: Session = Depends(get_db)):
+    """Set the status of many members at once; approvals queue their card renders in batches"""
+    if update_request.status not in ['pending', 'approved', 'rejected']:
+        raise HTTPException(status_code=400, detail="Invalid status")
+    
+    member_ids = set(update_request.member_ids)
+    card_jobs = []
+    if IDCARD_RENDER_MODE == "approval" and update_request.status == "approved":
+        newly_approved = db.scalars(
+            select(Member.id).where(Member.id.in_(member_ids), Member.status != "approved")
+        ).all()
+        card_jobs = enqueue_card_renders(db, newly_approved)
+    
+    updated = db.execute(
+        update(Member).where(Member.id.in_(member_ids)).values(status=update_request.status)
+    ).rowcount
+    db.commit()
+    
+    return {
+        "message": f"{updated} members updated to {update_request.status}",
+        "updated": updated,
+        "card_job_ids": [job.id for job in card_jobs]
+    }
+
 @router.patch("/{member_id}/status")
 async def update_member_status(
     member_id: int,
@@ -365,6 +664,10 @@ async def update_member_status(
     if status not in ['pending', 'approved', 'rejected']:
         raise HTTPException(status_code=400, detail="Invalid status")
     
+    # In approval mode the card is first rendered when the member is approved
+    if IDCARD_RENDER_MODE == "approval" and status == "approved" and member.status != "approved":
+        enqueue_card_renders(db, [member.id])
+    
     member.status = status
     db.commit()
     
@@ -43,6 +43,7 @@ class GalleryList(BaseModel):
     page: int
     per_page: int
     total_pages: int
+    next_cursor: Optional[str] = None
 
 class GalleryStats(BaseModel):
     total_items: int
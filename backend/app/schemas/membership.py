@@ -27,13 +27,15 @@ class MembershipResponse(BaseModel):
     caste: str
     aadhar: str
     phone: str
-    email: str
+    email: Optional[str] = None
     state: str
     district: str
     mandal: str
     village: str
     address: str
     photo_url: Optional[str] = None
+    photo_thumbnail_url: Optional[str] = None
+    photo_medium_url: Optional[str] = None
     id_card_url: Optional[str] = None
     created_at: datetime
 
@@ -44,4 +46,6 @@ class MembershipRegisterResponse(BaseModel):
     success: bool
     membership_id: Optional[str] = None
     id_card_url: Optional[str] = None
+    card_status: Optional[str] = None
+    card_job_id: Optional[int] = None
     message: str
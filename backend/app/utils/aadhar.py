@@ -0,0 +1,69 @@
+from cryptography.fernet import Fernet, MultiFernet
+from functools import lru_cache
+import base64
+import hashlib
+import hmac
+import os
+import re
+
+# Comma separated Fernet keys; the first encrypts, all of them decrypt, so a
+# new key can be put in front and the old one dropped once rows are re-encrypted
+AADHAR_ENCRYPTION_KEYS = os.getenv("AADHAR_ENCRYPTION_KEYS", "")
+# Secret for the blind index; changing it requires recomputing every aadhar_hash
+AADHAR_INDEX_KEY = os.getenv("AADHAR_INDEX_KEY", "")
+
+# Development and test setups can opt in to a fixed, public key instead;
+# without the opt-in a missing key stops the process at startup
+AADHAR_ALLOW_DEV_KEY = os.getenv("AADHAR_ALLOW_DEV_KEY", "").lower() in ("1", "true")
+
+_encryption_keys = [key.strip() for key in AADHAR_ENCRYPTION_KEYS.split(",") if key.strip()]
+_missing_keys = [name for name, value in (
+    ("AADHAR_ENCRYPTION_KEYS", _encryption_keys), ("AADHAR_INDEX_KEY", AADHAR_INDEX_KEY.strip())
+) if not value]
+if _missing_keys and not AADHAR_ALLOW_DEV_KEY:
+    raise RuntimeError(
+        f"{' and '.join(_missing_keys)} must be set to store Aadhar numbers "
+        "(set AADHAR_ALLOW_DEV_KEY=1 to use the development key locally)"
+    )
+
+_DEVELOPMENT_SECRET = b"mala-mahanadu-development-only"
+
+def _development_key(purpose: bytes) -> bytes:
+    print(f"Warning: using the development {purpose.decode()} key for Aadhar numbers; set it in production")
+    return hashlib.sha256(_DEVELOPMENT_SECRET + purpose).digest()
+
+@lru_cache(maxsize=None)
+def _fernet() -> MultiFernet:
+    keys = _encryption_keys or [base64.urlsafe_b64encode(_development_key(b"encryption"))]
+    return MultiFernet([Fernet(key) for key in keys])
+
+@lru_cache(maxsize=None)
+def _index_key() -> bytes:
+    return AADHAR_INDEX_KEY.encode() if AADHAR_INDEX_KEY.strip() else _development_key(b"index")
+
+def normalize_aadhar(aadhar: str) -> str:
+    """The Aadhar number's digits, without the spaces or hyphens it is often written with"""
+    return re.sub(r"[\s\-]", "", aadhar or "")
+
+def aadhar_blind_index(aadhar: str) -> str:
+    """
+    Keyed HMAC of the normalised number. Equal numbers give equal hashes, so
+    it can be indexed and searched for exactly, but without the key it
+    cannot be reversed by trying all 10^12 numbers.
+    """
+    return hmac.new(_index_key(), normalize_aadhar(aadhar).encode(), hashlib.sha256).hexdigest()
+
+def encrypt_aadhar(aadhar: str) -> str:
+    return _fernet().encrypt(normalize_aadhar(aadhar).encode()).decode()
+
+def decrypt_aadhar(token: str) -> str:
+    return _fernet().decrypt(token.encode()).decode()
+
+def aadhar_columns(aadhar: str) -> dict:
+    """Member column values storing an Aadhar number, for bulk inserts and updates"""
+    return {"aadhar_encrypted": encrypt_aadhar(aadhar), "aadhar_hash": aadhar_blind_index(aadhar)}
+
+def mask_aadhar(aadhar: str) -> str:
+    """XXXX XXXX 1234, for logs and reports"""
+    digits = normalize_aadhar(aadhar)
+    return f"XXXX XXXX {digits[-4:]}" if len(digits) >= 4 else "XXXX"
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models.admin_user import AdminUser
+import bcrypt
+import os
+
+# Signs admin access tokens; without it no admin token is issued or accepted
+ADMIN_TOKEN_SECRET = os.getenv("ADMIN_TOKEN_SECRET")
+ADMIN_TOKEN_TTL_MINUTES = int(os.getenv("ADMIN_TOKEN_TTL_MINUTES", "480"))
+ADMIN_TOKEN_ALGORITHM = "HS256"
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+def _token_secret() -> str:
+    if not ADMIN_TOKEN_SECRET:
+        raise HTTPException(status_code=503, detail="Admin authentication is not configured")
+    return ADMIN_TOKEN_SECRET
+
+def hash_admin_password(password: str) -> str:
+    # bcrypt only uses the first 72 bytes of a password
+    return bcrypt.hashpw(password.encode()[:72], bcrypt.gensalt()).decode()
+
+def verify_admin_password(password: str, password_hash: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode()[:72], password_hash.encode())
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+def authenticate_admin(db: Session, username: str, password: str) -> Optional[AdminUser]:
+    """The active admin with these credentials, or None"""
+    admin = db.query(AdminUser).filter(AdminUser.username == username, AdminUser.is_active == True).first()
+    if admin is None or not verify_admin_password(password, admin.password_hash):
+        return None
+    return admin
+
+def create_admin_token(admin: AdminUser) -> str:
+    """A signed bearer token for admin, valid for ADMIN_TOKEN_TTL_MINUTES"""
+    expires = datetime.utcnow() + timedelta(minutes=ADMIN_TOKEN_TTL_MINUTES)
+    return jwt.encode({"sub": admin.username, "exp": expires}, _token_secret(), algorithm=ADMIN_TOKEN_ALGORITHM)
+
+def require_admin(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: Session = Depends(get_db)
+) -> AdminUser:
+    """Dependency for admin-only routes: the admin named by a valid bearer token, else 401"""
+    secret = _token_secret()
+    unauthorized = HTTPException(
+        status_code=401, detail="Admin authentication required", headers={"WWW-Authenticate": "Bearer"}
+    )
+    if credentials is None:
+        raise unauthorized
+    try:
+        username = jwt.decode(credentials.credentials, secret, algorithms=[ADMIN_TOKEN_ALGORITHM]).get("sub")
+    except JWTError:
+        raise unauthorized
+    admin = db.query(AdminUser).filter(AdminUser.username == username, AdminUser.is_active == True).first()
+    if admin is None:
+        raise unauthorized
+    return admin
+
+def optional_admin(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: Session = Depends(get_db)
+) -> Optional[AdminUser]:
+    """Dependency for public routes that show admins more: the admin of a valid bearer token, else None"""
+    if credentials is None or not ADMIN_TOKEN_SECRET:
+        return None
+    try:
+        return require_admin(credentials, db)
+    except HTTPException:
+        return None
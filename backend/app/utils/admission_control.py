@@ -0,0 +1,229 @@
+from collections import OrderedDict
+from typing import Optional
+import asyncio
+import ipaddress
+import json
+import math
+import os
+import re
+import time
+
+# Set to "off" to let every request straight through
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "on").lower()
+# Per-route overrides as JSON, e.g. {"register": {"rate_per_minute": 20, "max_concurrent": 16}}
+ADMISSION_LIMITS = os.getenv("ADMISSION_LIMITS", "")
+# Whether the client address is taken from the proxy's X-Real-IP (or the last
+# X-Forwarded-For hop, the one the proxy appended): "auto" trusts them only on
+# connections from loopback or private addresses, where the bundled nginx
+# connects from; "true" always, "false" never
+ADMISSION_TRUST_FORWARDED_FOR = os.getenv("ADMISSION_TRUST_FORWARDED_FOR", "auto").lower()
+# Clients whose token buckets are kept per route; the least recently seen are forgotten first
+MAX_TRACKED_CLIENTS = 10_000
+
+# name -> limits for the expensive endpoints. Per client: rate_per_minute
+# sustained with bursts of burst. Per process: max_concurrent requests run at
+# once, up to max_queue more wait at most queue_timeout seconds for a slot.
+DEFAULT_ADMISSION_RULES = {
+    "register": {
+        "method": "POST", "path": r"/api/membership/register",
+        "rate_per_minute": 10, "burst": 5, "max_concurrent": 8, "max_queue": 32, "queue_timeout": 5.0,
+    },
+    "regenerate_idcard": {
+        "method": "POST", "path": r"/api/membership/\d+/regenerate-idcard",
+        "rate_per_minute": 30, "burst": 10, "max_concurrent": 4, "max_queue": 16, "queue_timeout": 10.0,
+    },
+    "print_pack": {
+        "method": "GET", "path": r"/api/membership/print-pack",
+        "rate_per_minute": 6, "burst": 2, "max_concurrent": 1, "max_queue": 2, "queue_timeout": 5.0,
+    },
+    "gallery_upload": {
+        "method": "POST", "path": r"/api/gallery/?",
+        "rate_per_minute": 20, "burst": 5, "max_concurrent": 2, "max_queue": 8, "queue_timeout": 10.0,
+    },
+}
+
+class TokenBuckets:
+    """A token bucket per client, refilled continuously at rate_per_minute up to burst"""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_clients: int = MAX_TRACKED_CLIENTS):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client -> (tokens, last refill)
+
+    def take(self, client: str) -> float:
+        """Take a token for client; returns 0 when allowed, else seconds until one is available"""
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return 0.0 if allowed else (1 - tokens) / self.rate
+
+class AdmissionRule:
+    """Limits and counters for one route"""
+
+    def __init__(self, name: str, method: str, path: str, rate_per_minute: float, burst: int,
+                 max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.method = method
+        self.pattern = re.compile(path + "$")
+        self.buckets = TokenBuckets(rate_per_minute, burst)
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.queued = 0
+        self.outcomes = {"admitted": 0, "rate_limited": 0, "overloaded": 0, "queue_timeout": 0}
+        self.queue_wait_seconds = 0.0
+        self.duration_seconds = 0.0
+
+    def matches(self, method: str, path: str) -> bool:
+        return method == self.method and self.pattern.match(path) is not None
+
+def load_admission_rules(overrides: str = ADMISSION_LIMITS) -> list:
+    """The default rules with any ADMISSION_LIMITS overrides applied"""
+    overrides = json.loads(overrides) if overrides else {}
+    return [
+        AdmissionRule(name, **{**settings, **overrides.get(name, {})})
+        for name, settings in DEFAULT_ADMISSION_RULES.items()
+    ]
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that sheds load on the expensive endpoints before any
+    work is done. A client over its rate gets 429; when a route's
+    concurrency limit is reached, requests wait in a short queue and get
+    503 if it is full or the wait times out. Both carry Retry-After. Limits
+    apply per process, so with N workers the totals are N times as large.
+    """
+
+    def __init__(self, app, rules: Optional[list] = None, enabled: bool = ADMISSION_CONTROL != "off"):
+        self.app = app
+        self.rules = load_admission_rules() if rules is None else rules
+        self.enabled = enabled
+        admission_controllers.append(self)
+
+    def _rule_for(self, scope) -> Optional[AdmissionRule]:
+        for rule in self.rules:
+            if rule.matches(scope["method"], scope["path"]):
+                return rule
+        return None
+
+    @staticmethod
+    def client_address(scope, trust_forwarded: str = ADMISSION_TRUST_FORWARDED_FOR) -> str:
+        client = scope.get("client")
+        peer = client[0] if client else "unknown"
+        if trust_forwarded == "auto":
+            try:
+                address = ipaddress.ip_address(peer)
+                trusted = address.is_loopback or address.is_private
+            except ValueError:
+                trusted = False
+        else:
+            trusted = trust_forwarded == "true"
+        if not trusted:
+            return peer
+
+        # Only the values the proxy sets count: clients can send either header,
+        # and nginx's $proxy_add_x_forwarded_for appends to what they sent
+        headers = dict(scope.get("headers", []))
+        real_ip = headers.get(b"x-real-ip", b"").decode("latin-1").strip()
+        if real_ip:
+            return real_ip
+        forwarded_for = headers.get(b"x-forwarded-for", b"").decode("latin-1")
+        return forwarded_for.split(",")[-1].strip() or peer
+
+    async def __call__(self, scope, receive, send):
+        rule = self._rule_for(scope) if self.enabled and scope["type"] == "http" else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = rule.buckets.take(self.client_address(scope))
+        if retry_after:
+            rule.outcomes["rate_limited"] += 1
+            await self._reject(send, 429, "Too many requests, please try again shortly", retry_after)
+            return
+
+        if not rule.slots.locked():
+            # A free slot is taken without suspending
+            await rule.slots.acquire()
+        elif rule.queued >= rule.max_queue:
+            # Refusing at once beyond a short queue keeps latency bounded for those admitted
+            rule.outcomes["overloaded"] += 1
+            await self._reject(send, 503, "Server is busy, please try again shortly", rule.queue_timeout)
+            return
+        else:
+            rule.queued += 1
+            queued_at = time.monotonic()
+            try:
+                await asyncio.wait_for(rule.slots.acquire(), rule.queue_timeout)
+            except asyncio.TimeoutError:
+                rule.outcomes["queue_timeout"] += 1
+                await self._reject(send, 503, "Server is busy, please try again shortly", rule.queue_timeout)
+                return
+            finally:
+                rule.queued -= 1
+                rule.queue_wait_seconds += time.monotonic() - queued_at
+
+        rule.outcomes["admitted"] += 1
+        rule.active += 1
+        started_at = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            rule.active -= 1
+            rule.duration_seconds += time.monotonic() - started_at
+            rule.slots.release()
+
+    @staticmethod
+    async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+# Every middleware instance, for the metrics endpoint
+admission_controllers = []
+
+def admission_metrics() -> str:
+    """Counters and gauges for every admission rule in the Prometheus text format"""
+    metrics = {
+        "admission_requests_total": ("counter", "Requests by admission outcome"),
+        "admission_in_flight": ("gauge", "Admitted requests currently running"),
+        "admission_queued": ("gauge", "Requests waiting for a slot"),
+        "admission_max_concurrent": ("gauge", "Configured concurrency limit"),
+        "admission_queue_wait_seconds_total": ("counter", "Time spent waiting for a slot"),
+        "admission_request_seconds_total": ("counter", "Time spent running admitted requests"),
+    }
+    samples = {name: [] for name in metrics}
+    for controller in admission_controllers:
+        for rule in controller.rules:
+            label = f'route="{rule.name}"'
+            for outcome, count in rule.outcomes.items():
+                samples["admission_requests_total"].append(f'{{{label},outcome="{outcome}"}} {count}')
+            samples["admission_in_flight"].append(f"{{{label}}} {rule.active}")
+            samples["admission_queued"].append(f"{{{label}}} {rule.queued}")
+            samples["admission_max_concurrent"].append(f"{{{label}}} {rule.max_concurrent}")
+            samples["admission_queue_wait_seconds_total"].append(f"{{{label}}} {rule.queue_wait_seconds:.6f}")
+            samples["admission_request_seconds_total"].append(f"{{{label}}} {rule.duration_seconds:.6f}")
+
+    lines = []
+    for name, (kind, description) in metrics.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{sample}" for sample in samples[name])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,37 @@
+from typing import Optional
+import os
+import re
+
+# Country code assumed for numbers entered without one
+DEFAULT_PHONE_COUNTRY_CODE = os.getenv("DEFAULT_PHONE_COUNTRY_CODE", "91")
+
+def normalize_phone(phone: str) -> str:
+    """
+    Normalise a phone number to E.164 (+<country code><number>) so the same
+    number always matches, however it was typed. Numbers without a country
+    code get DEFAULT_PHONE_COUNTRY_CODE. Raises ValueError for anything that
+    is not a plausible phone number.
+    """
+    phone = (phone or "").strip()
+    digits = re.sub(r"\D", "", phone)
+    national_length = 10 + len(DEFAULT_PHONE_COUNTRY_CODE)
+    if phone.startswith("00"):
+        # International dialling prefix instead of +
+        digits = digits[2:]
+    elif not phone.startswith("+"):
+        if len(digits) == 11 and digits.startswith("0"):
+            # National trunk prefix, e.g. 09876543210
+            digits = DEFAULT_PHONE_COUNTRY_CODE + digits[1:]
+        elif len(digits) == 10:
+            digits = DEFAULT_PHONE_COUNTRY_CODE + digits
+        elif not (len(digits) == national_length and digits.startswith(DEFAULT_PHONE_COUNTRY_CODE)):
+            raise ValueError(f"Invalid phone number: {phone!r}")
+
+    if not 8 <= len(digits) <= 15 or digits.startswith("0"):
+        raise ValueError(f"Invalid phone number: {phone!r}")
+    return f"+{digits}"
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Trimmed, lowercased email, or None when none was given"""
+    email = (email or "").strip().lower()
+    return email or None
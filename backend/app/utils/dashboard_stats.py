@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from app.database import SessionLocal
+from app.models.member import Member
+from app.models.complaint import Complaint
+from app.models.donation import Donation
+from app.models.gallery import Gallery
+import asyncio
+
+def count_where(condition):
+    """
+    COUNT of the rows matching condition, as one column of an aggregate
+    query, so several counts are taken in a single pass over the table.
+    COUNT(CASE ...) works on every database, unlike COUNT(*) FILTER.
+    """
+    return func.count(case((condition, 1)))
+
+def _aggregate(db: Session, model, **columns) -> dict:
+    """name -> value for aggregate columns of model, read in one query"""
+    row = db.execute(select(*[column.label(name) for name, column in columns.items()]).select_from(model)).one()
+    return dict(row._mapping)
+
+def member_stats(db: Session) -> dict:
+    stats = _aggregate(
+        db, Member,
+        total_members=func.count(),
+        pending_members=count_where(Member.status == "pending"),
+        approved_members=count_where(Member.status == "approved"),
+        rejected_members=count_where(Member.status == "rejected"),
+        new_members_this_month=count_where(Member.created_at >= datetime.now() - timedelta(days=30)),
+        # Cards whose render has been recorded, and cards rendered before the render cache
+        id_cards_generated=count_where(or_(Member.card_fingerprint.isnot(None), Member.id_card_url.isnot(None))),
+    )
+    id_cards_generated = stats.pop("id_cards_generated")
+    # Active members are the approved ones
+    return {**stats, "active_members": stats["approved_members"], "id_cards_generated": id_cards_generated}
+
+def complaint_stats(db: Session) -> dict:
+    return _aggregate(
+        db, Complaint,
+        total_complaints=func.count(),
+        pending_complaints=count_where(Complaint.status == "pending"),
+        in_progress_complaints=count_where(Complaint.status == "in_progress"),
+        resolved_complaints=count_where(Complaint.status == "resolved"),
+        closed_complaints=count_where(Complaint.status == "closed"),
+    )
+
+def donation_stats(db: Session) -> dict:
+    stats = _aggregate(
+        db, Donation,
+        total_donations=func.count(),
+        pending_donations=count_where(Donation.status == "pending"),
+        verified_donations=count_where(Donation.status == "verified"),
+        acknowledged_donations=count_where(Donation.status == "acknowledged"),
+        total_amount_raised=func.sum(case((Donation.status == "verified", Donation.amount))),
+    )
+    stats["total_amount_raised"] = stats["total_amount_raised"] or 0
+    return stats
+
+def gallery_stats(db: Session) -> dict:
+    return _aggregate(
+        db, Gallery,
+        total_items=func.count(),
+        total_images=count_where(Gallery.type == "image"),
+        total_videos=count_where(Gallery.type == "video"),
+        active_items=count_where(Gallery.is_active == True),
+        new_items_last_30_days=count_where(Gallery.created_at >= datetime.utcnow() - timedelta(days=30)),
+    )
+
+DASHBOARD_SECTIONS = {
+    "members": member_stats,
+    "complaints": complaint_stats,
+    "donations": donation_stats,
+    "gallery": gallery_stats,
+}
+
+def _in_own_session(stats) -> dict:
+    db = SessionLocal()
+    try:
+        return stats(db)
+    finally:
+        db.close()
+
+async def dashboard_overview() -> dict:
+    """Every section's stats, each table aggregated in one query, the queries run concurrently"""
+    results = await asyncio.gather(*[
+        run_in_threadpool(_in_own_session, stats) for stats in DASHBOARD_SECTIONS.values()
+    ])
+    return dict(zip(DASHBOARD_SECTIONS, results))
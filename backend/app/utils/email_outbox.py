@@ -0,0 +1,245 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.email_campaign import EmailCampaign
+from app.models.member import Member
+from app.models.outbox_email import OutboxEmail
+from app.utils.email_service import email_service
+from app.utils.email_templates import render_email, render_campaign_email
+import json
+import os
+import random
+import smtplib
+
+# Provider quota, shared by every worker process through the outbox table
+EMAIL_RATE_PER_MINUTE = int(os.getenv("EMAIL_RATE_PER_MINUTE", "30"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_RETRY_BASE_SECONDS", "60"))
+EMAIL_RETRY_MAX_SECONDS = 6 * 60 * 60
+# Emails claimed by a worker that has been silent this long are handed out again
+STALE_SENDING_SECONDS = 600
+# Members read per query when expanding a campaign into the outbox
+CAMPAIGN_EXPAND_BATCH_SIZE = 500
+
+def queue_email(db: Session, to_email: str, subject: str, body_html: str, body_text: Optional[str] = None) -> OutboxEmail:
+    """Add an email to the outbox; it is committed with the caller's other changes"""
+    email = OutboxEmail(to_email=to_email, subject=subject, body_html=body_html, body_text=body_text, status="queued")
+    db.add(email)
+    return email
+
+def queue_template_email(db: Session, to_email: str, template: str, **context) -> OutboxEmail:
+    """Add an email rendered from a named template at send time"""
+    email = OutboxEmail(to_email=to_email, template=template, context=json.dumps(context), status="queued")
+    db.add(email)
+    return email
+
+def queue_welcome_email(db: Session, to_email: str, name: str, membership_id: str) -> OutboxEmail:
+    return queue_template_email(db, to_email, "welcome", name=name, membership_id=membership_id)
+
+def render_outbox_email(email: OutboxEmail, campaign: Optional[EmailCampaign] = None) -> tuple:
+    """(subject, html, text) for an outbox email"""
+    context = json.loads(email.context or "{}")
+    if email.template:
+        return render_email(email.template, **context)
+    if campaign is not None and not email.body_html:
+        return render_campaign_email(campaign.subject, campaign.body_html, campaign.body_text, **context)
+    return email.subject, email.body_html, email.body_text
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter so retries from one outage are spread out"""
+    delay = min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+def is_permanent_failure(error: Exception) -> bool:
+    """5xx replies and refused recipients will fail the same way on every retry"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+def sending_allowance(db: Session) -> int:
+    """How many more emails may be sent in the current minute across all workers"""
+    window_start = datetime.utcnow() - timedelta(minutes=1)
+    used = db.scalar(
+        select(func.count()).select_from(OutboxEmail).where(
+            or_(
+                OutboxEmail.sent_at >= window_start,
+                (OutboxEmail.status == "sending") & (OutboxEmail.locked_at >= window_start),
+            )
+        )
+    )
+    return max(0, EMAIL_RATE_PER_MINUTE - used)
+
+def claim_outbox_batch(db: Session, worker_id: str, limit: int) -> list:
+    """Atomically move up to limit due emails to sending and return them"""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=STALE_SENDING_SECONDS)
+    candidates = db.scalars(
+        select(OutboxEmail.id)
+        .where(
+            or_(
+                (OutboxEmail.status == "queued")
+                & or_(OutboxEmail.next_attempt_at.is_(None), OutboxEmail.next_attempt_at <= now),
+                (OutboxEmail.status == "sending") & (OutboxEmail.locked_at < stale),
+            )
+        )
+        .order_by(OutboxEmail.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not candidates:
+        db.commit()
+        return []
+
+    # As for jobs, the status and lock checks make the claim safe without SKIP LOCKED
+    db.execute(
+        update(OutboxEmail)
+        .where(OutboxEmail.id.in_(candidates), OutboxEmail.status.in_(["queued", "sending"]),
+               or_(OutboxEmail.locked_at.is_(None), OutboxEmail.locked_at < stale))
+        .values(status="sending", locked_by=worker_id, locked_at=now, attempts=OutboxEmail.attempts + 1)
+    )
+    db.commit()
+    return db.scalars(
+        select(OutboxEmail)
+        .where(OutboxEmail.id.in_(candidates), OutboxEmail.locked_by == worker_id, OutboxEmail.locked_at == now)
+        .order_by(OutboxEmail.id)
+    ).all()
+
+def deliver_outbox_batch(worker_id: str) -> int:
+    """
+    Send one batch of due outbox emails over the pooled SMTP connections,
+    within the per-minute quota. Returns the number of emails attempted.
+    """
+    db = SessionLocal()
+    try:
+        allowance = sending_allowance(db)
+        if allowance <= 0:
+            return 0
+        emails = claim_outbox_batch(db, worker_id, min(EMAIL_BATCH_SIZE, allowance))
+
+        campaigns = {}
+        for email in emails:
+            # Campaign emails share the campaign's content instead of a copy per recipient
+            campaign = None
+            if email.campaign_id is not None:
+                if email.campaign_id not in campaigns:
+                    campaigns[email.campaign_id] = db.get(EmailCampaign, email.campaign_id)
+                campaign = campaigns[email.campaign_id]
+            try:
+                subject, body_html, body_text = render_outbox_email(email, campaign)
+                email_service.smtp_pool.send_message_sync(
+                    email_service.build_message(email.to_email, subject, body_html, body_text)
+                )
+                email.status = "sent"
+                email.sent_at = datetime.utcnow()
+                email.last_error = None
+            except Exception as e:
+                print(f"Email {email.id} to {email.to_email} failed: {e}")
+                email.last_error = str(e)
+                if email.attempts >= EMAIL_MAX_ATTEMPTS or is_permanent_failure(e):
+                    email.status = "failed"
+                else:
+                    email.status = "queued"
+                    email.next_attempt_at = datetime.utcnow() + retry_delay(email.attempts)
+            email.locked_by = None
+            email.locked_at = None
+            # Commit per email so a crash never re-sends the ones already delivered
+            db.commit()
+
+        for campaign in campaigns.values():
+            finish_campaign_if_sent(db, campaign)
+        return len(emails)
+    finally:
+        db.close()
+
+def campaign_member_filters(filters: dict) -> list:
+    """WHERE clauses selecting the members a campaign is sent to"""
+    clauses = [Member.email.isnot(None), Member.email != ""]
+    for field in ("state", "district", "status"):
+        if filters.get(field):
+            clauses.append(getattr(Member, field) == filters[field])
+    return clauses
+
+def _insert_ignoring_duplicates(db: Session, rows: list) -> int:
+    """Insert outbox rows, skipping recipients the campaign already has"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    if dialect_insert is not None:
+        statement = dialect_insert(OutboxEmail).on_conflict_do_nothing(
+            index_elements=["campaign_id", "to_email"]
+        ).returning(OutboxEmail.id)
+        return len(db.execute(statement, rows).all())
+
+    inserted = 0
+    for row in rows:
+        exists = db.scalar(select(OutboxEmail.id).where(
+            OutboxEmail.campaign_id == row["campaign_id"], OutboxEmail.to_email == row["to_email"]
+        ))
+        if not exists:
+            db.execute(insert(OutboxEmail), [row])
+            inserted += 1
+    return inserted
+
+def expand_campaign(db: Session, campaign: EmailCampaign) -> int:
+    """
+    Queue an outbox email for every member the campaign targets. Members are
+    read by keyset in batches and the cursor is committed with each batch,
+    so the table is never loaded at once and an interrupted expansion resumes.
+    """
+    clauses = campaign_member_filters(json.loads(campaign.filters or "{}"))
+    campaign.status = "expanding"
+    db.commit()
+
+    while True:
+        rows = db.execute(
+            select(Member.id, Member.email, Member.name, Member.membership_id)
+            .where(Member.id > campaign.last_member_id, *clauses)
+            .order_by(Member.id)
+            .limit(CAMPAIGN_EXPAND_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        # Campaign templates are rendered per recipient with these variables
+        recipients = {}
+        for _, email, name, membership_id in rows:
+            recipients.setdefault(email.strip().lower(), {"name": name, "membership_id": membership_id})
+        campaign.total_recipients += _insert_ignoring_duplicates(db, [
+            {"campaign_id": campaign.id, "to_email": email, "context": json.dumps(context),
+             "status": "queued", "attempts": 0}
+            for email, context in sorted(recipients.items())
+        ])
+        campaign.last_member_id = rows[-1][0]
+        db.commit()
+
+    campaign.status = "sending"
+    db.commit()
+    finish_campaign_if_sent(db, campaign)
+    return campaign.total_recipients
+
+def finish_campaign_if_sent(db: Session, campaign: EmailCampaign) -> None:
+    """Mark a fully expanded campaign done once none of its emails are pending"""
+    if campaign.status != "sending":
+        return
+    pending = db.scalar(
+        select(func.count()).select_from(OutboxEmail).where(
+            OutboxEmail.campaign_id == campaign.id, OutboxEmail.status.in_(["queued", "sending"])
+        )
+    )
+    if not pending:
+        campaign.status = "done"
+        db.commit()
+
+def outbox_status_counts(db: Session, campaign_id: Optional[int] = None) -> dict:
+    """Number of outbox emails in each status, overall or for one campaign"""
+    query = select(OutboxEmail.status, func.count()).group_by(OutboxEmail.status)
+    if campaign_id is not None:
+        query = query.where(OutboxEmail.campaign_id == campaign_id)
+    return dict(db.execute(query).all())
@@ -0,0 +1,82 @@
+from email.mime.base import MIMEBase
+from email import encoders
+from functools import lru_cache
+from html import unescape
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+from jinja2.sandbox import SandboxedEnvironment
+import os
+import re
+
+EMAIL_TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates", "email")
+
+# name -> subject; bodies are <name>.html and <name>.txt in EMAIL_TEMPLATES_DIR
+EMAIL_SUBJECTS = {
+    "welcome": "Welcome to Mala Mahanadu - Membership ID: {{ membership_id }}",
+}
+
+# Templates are compiled once per process and never re-checked on disk
+email_environment = Environment(
+    loader=FileSystemLoader(EMAIL_TEMPLATES_DIR),
+    autoescape=select_autoescape(["html"], default_for_string=False),
+    auto_reload=False,
+    keep_trailing_newline=True,
+)
+# Campaign subjects and bodies are written in the admin UI, so they run sandboxed
+campaign_html_environment = SandboxedEnvironment(autoescape=True)
+campaign_text_environment = SandboxedEnvironment(autoescape=False)
+
+@lru_cache(maxsize=None)
+def get_email_template(name: str) -> tuple:
+    """Compiled (subject, html, text) templates for a named email"""
+    return (
+        email_environment.from_string(EMAIL_SUBJECTS[name]),
+        email_environment.get_template(f"{name}.html"),
+        email_environment.get_template(f"{name}.txt"),
+    )
+
+def load_email_templates() -> None:
+    """Compile every email template up front, e.g. at startup"""
+    for name in EMAIL_SUBJECTS:
+        get_email_template(name)
+
+def render_email(template_name: str, **context) -> tuple:
+    """Render a named email to (subject, html, text)"""
+    subject, html, text = get_email_template(template_name)
+    return subject.render(**context), html.render(**context), text.render(**context)
+
+@lru_cache(maxsize=32)
+def compile_campaign_template(source: str, html: bool = True) -> Template:
+    """Compile a campaign subject or body once, however many recipients it has"""
+    environment = campaign_html_environment if html else campaign_text_environment
+    return environment.from_string(source)
+
+def html_to_text(html: str) -> str:
+    """Rough plain-text version of an HTML body for the text/plain alternative"""
+    text = re.sub(r"(?is)<(script|style)\b.*?</\1>", "", html)
+    text = re.sub(r"(?i)<br\s*/?>|</(p|div|h[1-6]|li|tr)>", "\n", text)
+    text = re.sub(r"<[^>]+>", "", text)
+    text = re.sub(r"[ \t]+", " ", unescape(text))
+    return re.sub(r"\n\s*\n+", "\n\n", text).strip() + "\n"
+
+def render_campaign_email(subject: str, body_html: str, body_text: str = None, **context) -> tuple:
+    """Render a campaign for one recipient to (subject, html, text)"""
+    html = compile_campaign_template(body_html).render(**context)
+    text = compile_campaign_template(body_text, html=False).render(**context) if body_text else html_to_text(html)
+    return compile_campaign_template(subject, html=False).render(**context), html, text
+
+@lru_cache(maxsize=64)
+def _attachment_part(path: str, mtime_ns: int, size: int, filename: str) -> MIMEBase:
+    with open(path, "rb") as attachment:
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(attachment.read())
+    encoders.encode_base64(part)
+    part.add_header('Content-Disposition', f'attachment; filename="{filename}"')
+    return part
+
+def attachment_part(path: str, filename: str) -> MIMEBase:
+    """
+    A base64-encoded MIME part for a file, built once per file version and
+    shared between messages; the part must not be modified
+    """
+    stat = os.stat(path)
+    return _attachment_part(path, stat.st_mtime_ns, stat.st_size, filename)
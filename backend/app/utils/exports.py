@@ -0,0 +1,180 @@
+from typing import Iterator, Optional
+from fastapi.responses import StreamingResponse
+from xml.sax.saxutils import escape
+from sqlalchemy import select
+from app.database import SessionLocal
+from app.utils.streaming import ChunkBuffer
+import csv
+import io
+import json
+import os
+import re
+import zipfile
+import zlib
+
+# Rows read per short-lived session while an export streams
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+def iter_export_batches(model, columns: list, filters: list, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[list]:
+    """
+    Rows of columns (which include model.id) matching filters, in id order,
+    batch_size at a time. Each batch is read in its own session, so the
+    connection goes back to the pool while the batch is sent to the client.
+    """
+    last_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            batch = db.execute(
+                select(*columns).where(*filters, model.id > last_id).order_by(model.id).limit(batch_size)
+            ).all()
+        finally:
+            db.close()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+FORMULA_PREFIXES = ("=", "+", "-", "@")
+PHONE_NUMBER = re.compile(r"\+?\d+")
+
+def _csv_value(value):
+    # A leading = + - @ would be run as a formula by spreadsheet programs; phone numbers are left alone
+    if value.__class__ is str and value[:1] in FORMULA_PREFIXES and not PHONE_NUMBER.fullmatch(value):
+        return "'" + value
+    return value
+
+def _stream_csv(names: list, batches: Iterator[list]) -> Iterator[bytes]:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    # The byte order mark makes Excel read the file as UTF-8 (Telugu names)
+    output.write("\ufeff")
+    writer.writerow(names)
+    for rows in batches:
+        writer.writerows([_csv_value(row[name]) for name in names] for row in rows)
+        yield output.getvalue().encode()
+        output.seek(0)
+        output.truncate()
+    yield output.getvalue().encode()
+
+def _stream_ndjson(names: list, batches: Iterator[list]) -> Iterator[bytes]:
+    for rows in batches:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode()
+
+# The fixed parts of a one-sheet workbook
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+# Characters XML 1.0 does not allow, even escaped
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _xlsx_cell(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c><v>{value}</v></c>"
+    # Everything else, phone and Aadhar numbers included, is kept as text
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_XML_INVALID.sub("", str(value)))}</t></is></c>'
+
+def _xlsx_row(values) -> str:
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+def _stream_xlsx(names: list, batches: Iterator[list]) -> Iterator[bytes]:
+    """
+    A one-sheet workbook written as the rows arrive: the worksheet XML is
+    deflated into the ZIP entry batch by batch, with inline strings so no
+    shared string table has to be built first
+    """
+    sink = ChunkBuffer()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield sink.drain()
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _xlsx_row(names).encode()
+            )
+            for rows in batches:
+                sheet.write("".join(_xlsx_row(row[name] for name in names) for row in rows).encode())
+                yield sink.drain()
+            sheet.write(b"</sheetData></worksheet>")
+        yield sink.drain()
+    yield sink.drain()
+
+def gzip_stream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Gzip a byte stream incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def stream_export(export_format: str, model, fields, names: list, filters: list,
+                  batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Stream model rows matching filters as export_format ("csv", "ndjson" or
+    "xlsx") with the columns names, read and serialised through fields (a
+    SparseFields) one batch at a time, so memory use does not grow with the
+    number of rows
+    """
+    batches = (
+        fields.serialize(rows, names)
+        for rows in iter_export_batches(model, fields.columns(names), filters, batch_size)
+    )
+    writer = {"csv": _stream_csv, "ndjson": _stream_ndjson, "xlsx": _stream_xlsx}[export_format]
+    return writer(names, batches)
+
+def export_response(export_format: str, model, fields, names: list, filters: list, filename: str,
+                    gzip: bool = False, accept_encoding: Optional[str] = None) -> StreamingResponse:
+    """
+    The export as a download. With gzip, and a client that accepts it, CSV
+    and NDJSON are sent with Content-Encoding: gzip; XLSX is already
+    compressed and is sent as-is.
+    """
+    media_type, extension = EXPORT_FORMATS[export_format]
+    chunks = stream_export(export_format, model, fields, names, filters)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{extension}"'}
+    if gzip and export_format != "xlsx":
+        headers["Vary"] = "Accept-Encoding"
+        if "gzip" in (accept_encoding or "").lower():
+            chunks = gzip_stream(chunks)
+            headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
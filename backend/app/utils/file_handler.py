@@ -1,7 +1,24 @@
 import os
 import uuid
 import shutil
-from typing import Optional
+import aiofiles
+import aiofiles.os
+from typing import NamedTuple, Optional
+
+# Bytes read from the upload and written to disk at a time
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds the endpoint's size limit"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File size exceeds maximum limit of {max_bytes // (1024 * 1024)}MB")
+        self.max_bytes = max_bytes
+
+class SavedUpload(NamedTuple):
+    filename: str
+    path: str
+    size: int
 
 def save_upload_file(upload_file, destination_dir: str, filename: Optional[str] = None) -> str:
     """Save an uploaded file to the specified directory"""
@@ -17,6 +34,44 @@ def save_upload_file(upload_file, destination_dir: str, filename: Optional[str]
     
     return filename
 
+async def stream_upload_file(upload_file, destination_dir: str, filename: Optional[str] = None,
+                             max_bytes: Optional[int] = None) -> SavedUpload:
+    """
+    Copy an upload to destination_dir in UPLOAD_CHUNK_SIZE chunks without
+    blocking the event loop. Only one chunk is held in memory however large
+    the file is. The file is written under a temporary name and renamed into
+    place once complete, so a partial or rejected upload never appears under
+    its final name. Raises UploadTooLarge as soon as more than max_bytes have
+    been received.
+    """
+    if filename is None:
+        file_extension = os.path.splitext(upload_file.filename or "")[1]
+        filename = f"{uuid.uuid4()}{file_extension}"
+    # The multipart parser already knows the size of a spooled upload
+    if max_bytes is not None and upload_file.size is not None and upload_file.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+
+    await aiofiles.os.makedirs(destination_dir, exist_ok=True)
+    file_path = os.path.join(destination_dir, filename)
+    temp_path = os.path.join(destination_dir, f".{filename}.{uuid.uuid4().hex[:8]}.part")
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                await buffer.write(chunk)
+        await aiofiles.os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            await aiofiles.os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    return SavedUpload(filename, file_path, size)
+
 def delete_file(file_path: str) -> bool:
     """Delete a file from the filesystem"""
     try:
@@ -0,0 +1,178 @@
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.models.member import Member
+from app.utils.idcard_generator import CARD_TEMPLATE_VERSION, card_fingerprint, resolve_photo_path
+from app.utils.idcard_cache import render_card_to_cache, card_download_url, cached_card_path
+from app.utils.job_queue import enqueue_job
+import os
+
+# Members per render_id_cards job, so a large approval is spread over workers
+RENDER_JOB_BATCH_SIZE = int(os.getenv("RENDER_JOB_BATCH_SIZE", "200"))
+
+# Columns needed to render a card; rows are plain tuples so they pickle cheaply
+CARD_COLUMNS = (
+    Member.id,
+    Member.membership_id,
+    Member.name,
+    Member.village,
+    Member.district,
+    Member.phone,
+    Member.state,
+    Member.photo_url,
+    Member.card_fingerprint,
+)
+
+def card_member_filters(district: Optional[str] = None, state: Optional[str] = None, since: Optional[datetime] = None,
+                        mandal: Optional[str] = None, status: Optional[str] = None) -> list:
+    """Build the WHERE clauses shared by the bulk card commands"""
+    filters = []
+    if district:
+        filters.append(Member.district == district)
+    if state:
+        filters.append(Member.state == state)
+    if mandal:
+        filters.append(Member.mandal == mandal)
+    if status:
+        filters.append(Member.status == status)
+    if since:
+        filters.append(Member.created_at >= since)
+    return filters
+
+def iter_card_batches(db: Session, batch_size: int = 200, after_id: int = 0, filters: Iterable = ()) -> Iterator[list]:
+    """
+    Stream members in id order, batch_size rows at a time, using keyset
+    pagination so each query is an index range scan regardless of depth
+    """
+    filters = list(filters)
+    last_id = after_id
+    while True:
+        rows = db.execute(
+            select(*CARD_COLUMNS)
+            .where(Member.id > last_id, *filters)
+            .order_by(Member.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield [tuple(row) for row in rows]
+        last_id = rows[-1][0]
+
+def card_fields_from_row(row: tuple) -> dict:
+    """generate_id_card arguments for a CARD_COLUMNS row"""
+    member_id, membership_id, name, village, district, phone, state, photo_url, rendered_fingerprint = row
+    return {
+        "membership_id": membership_id,
+        "name": name,
+        "village": village,
+        "district": district,
+        "phone": phone,
+        "state": state,
+        "photo_path": resolve_photo_path(photo_url),
+    }
+
+def stale_card_rows(batch: list) -> list:
+    """
+    The CARD_COLUMNS rows whose card needs rendering: never rendered,
+    rendered from other inputs or an older template (both change the
+    fingerprint), or whose cached file has since been removed
+    """
+    stale = []
+    for row in batch:
+        fingerprint = card_fingerprint(**card_fields_from_row(row))
+        if row[-1] != fingerprint or not os.path.exists(cached_card_path(row[1], fingerprint)):
+            stale.append(row)
+    return stale
+
+def render_member_card(row: tuple, force: bool = False) -> tuple:
+    """
+    Render one card from a CARD_COLUMNS row into the card cache. Runs in a
+    worker process and returns (member_id, id_card_url, fingerprint, error)
+    instead of raising.
+    """
+    member_id, membership_id = row[0], row[1]
+    try:
+        fields = card_fields_from_row(row)
+        fingerprint = card_fingerprint(**fields)
+        render_card_to_cache(fields, fingerprint, force=force)
+        return member_id, card_download_url(membership_id, fingerprint), fingerprint, None
+    except Exception as e:
+        return member_id, None, None, str(e)
+
+def render_card_batches(batches: Iterable[list], workers: Optional[int] = None, force: bool = False) -> Iterator[tuple]:
+    """
+    Render batches of CARD_COLUMNS rows in a process pool, yielding
+    (batch, results) in input order. The next batch is submitted before the
+    current one is collected so workers stay busy across batch boundaries,
+    while at most two batches are held in memory. Cards already in the cache
+    for the same fingerprint are reused unless force is set.
+    """
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        pending = None
+        for batch in batches:
+            futures = [pool.submit(render_member_card, row, force) for row in batch]
+            if pending is not None:
+                yield pending[0], [future.result() for future in pending[1]]
+            pending = (batch, futures)
+        if pending is not None:
+            yield pending[0], [future.result() for future in pending[1]]
+
+def iter_fresh_cards(batches: Iterable[list], formats: tuple = ("png",), workers: Optional[int] = None,
+                     mp_context=None, pool: Optional[Executor] = None) -> Iterator[tuple]:
+    """
+    Yield (row, fingerprint, error) for every CARD_COLUMNS row in input order
+    once its card is in the cache. Cards that are already cached and up to
+    date are reused; missing ones are rendered in a process pool, keeping a
+    bounded window of renders in flight ahead of the consumer. A pool that
+    is passed in (with its workers count) is used as-is and left running.
+    """
+    workers = workers or os.cpu_count()
+    window = deque()
+    with nullcontext(pool) if pool else ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+        def resolve(entry):
+            row, fingerprint, future = entry
+            if future is None:
+                return row, fingerprint, None
+            try:
+                future.result()
+                return row, fingerprint, None
+            except Exception as e:
+                return row, None, str(e)
+
+        for batch in batches:
+            for row in batch:
+                fields = card_fields_from_row(row)
+                fingerprint = card_fingerprint(**fields)
+                future = None
+                if not all(os.path.exists(cached_card_path(row[1], fingerprint, extension)) for extension in formats):
+                    future = pool.submit(render_card_to_cache, fields, fingerprint, False, tuple(formats))
+                window.append((row, fingerprint, future))
+                while len(window) > workers * 4:
+                    yield resolve(window.popleft())
+        while window:
+            yield resolve(window.popleft())
+
+def enqueue_card_renders(db: Session, member_ids: Iterable[int]) -> list:
+    """Queue render_id_cards jobs for the members, RENDER_JOB_BATCH_SIZE per job; the caller commits"""
+    member_ids = sorted(set(member_ids))
+    return [
+        enqueue_job(db, "render_id_cards", {"member_ids": member_ids[i:i + RENDER_JOB_BATCH_SIZE]})
+        for i in range(0, len(member_ids), RENDER_JOB_BATCH_SIZE)
+    ]
+
+def save_card_urls(db: Session, results: Iterable[tuple]) -> int:
+    """Record every successful render on its member in one executemany and commit"""
+    updates = [
+        {"id": member_id, "id_card_url": id_card_url,
+         "card_fingerprint": fingerprint, "card_template_version": CARD_TEMPLATE_VERSION}
+        for member_id, id_card_url, fingerprint, error in results
+        if id_card_url
+    ]
+    if updates:
+        db.execute(update(Member), updates)
+    db.commit()
+    return len(updates)
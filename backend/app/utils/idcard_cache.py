@@ -0,0 +1,126 @@
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from app.utils.idcard_generator import IDCARDS_DIR, CARD_TEMPLATE_VERSION, generate_id_card, card_fingerprint, resolve_photo_path
+import asyncio
+import os
+import re
+import shutil
+import tempfile
+
+# Rendered cards live in <cache>/<ID_stem>/<fingerprint[:16]>/<ID_stem>.png|.pdf
+IDCARD_CACHE_DIR = os.path.join(IDCARDS_DIR, "cache")
+
+# "eager" queues a render at registration, "lazy" renders on first download,
+# "approval" renders only once a member is approved
+IDCARD_RENDER_MODE = os.getenv("IDCARD_RENDER_MODE", "lazy")
+
+CARD_FILENAME_RE = re.compile(r"^ID_(MMN_\d{4}_\d+)\.(png|pdf)$")
+
+# (fingerprint, formats) -> task rendering it, so concurrent requests share one render
+_inflight_renders: dict = {}
+
+def card_file_stem(membership_id: str) -> str:
+    return f"ID_{membership_id.replace('-', '_')}"
+
+def parse_card_filename(filename: str) -> Optional[tuple]:
+    """Return (membership_id, extension) for ID_MMN_YYYY_NNNNNN.png|pdf, else None"""
+    match = CARD_FILENAME_RE.match(filename)
+    if not match:
+        return None
+    return match.group(1).replace("_", "-"), match.group(2)
+
+def member_card_fields(member) -> dict:
+    """The generate_id_card arguments for a Member (or any object with the same attributes)"""
+    return {
+        "membership_id": member.membership_id,
+        "name": member.name,
+        "village": member.village,
+        "district": member.district,
+        "phone": member.phone,
+        "state": member.state,
+        "photo_path": resolve_photo_path(member.photo_url),
+    }
+
+def cached_card_dir(membership_id: str, fingerprint: str) -> str:
+    return os.path.join(IDCARD_CACHE_DIR, card_file_stem(membership_id), fingerprint[:16])
+
+def cached_card_path(membership_id: str, fingerprint: str, extension: str = "png") -> str:
+    return os.path.join(cached_card_dir(membership_id, fingerprint), f"{card_file_stem(membership_id)}.{extension}")
+
+def card_download_url(membership_id: str, fingerprint: str) -> str:
+    """URL of the on-demand card endpoint; the version parameter busts browser caches"""
+    return f"/api/membership/idcard/{card_file_stem(membership_id)}.png?v={fingerprint[:16]}"
+
+def lazy_card_url(member) -> str:
+    """
+    Download URL of a member's card before it has been rendered; the first
+    download renders it and record_card_render then stores the URL
+    """
+    return card_download_url(member.membership_id, card_fingerprint(**member_card_fields(member)))
+
+def record_card_render(member, fingerprint: str) -> bool:
+    """
+    Point a Member at its rendered card and stamp the template version and
+    fingerprint it was rendered from. Returns whether anything changed; the
+    caller commits.
+    """
+    if member.card_fingerprint == fingerprint and member.card_template_version == CARD_TEMPLATE_VERSION:
+        return False
+    member.id_card_url = card_download_url(member.membership_id, fingerprint)
+    member.card_fingerprint = fingerprint
+    member.card_template_version = CARD_TEMPLATE_VERSION
+    return True
+
+def render_card_to_cache(fields: dict, fingerprint: Optional[str] = None, force: bool = False, formats: tuple = ("png", "pdf")) -> str:
+    """
+    Render the requested formats of a card into the cache unless a render
+    with the same fingerprint exists, and return its directory. Files are
+    rendered into a temporary directory and renamed into place, so readers
+    never see partial files.
+    """
+    fingerprint = fingerprint or card_fingerprint(**fields)
+    membership_id = fields["membership_id"]
+    final_dir = cached_card_dir(membership_id, fingerprint)
+    missing = [extension for extension in formats
+               if force or not os.path.exists(cached_card_path(membership_id, fingerprint, extension))]
+    if not missing:
+        return final_dir
+
+    member_dir = os.path.dirname(final_dir)
+    os.makedirs(final_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".render-", dir=member_dir)
+    try:
+        generate_id_card(**fields, output_dir=tmp_dir, formats=tuple(missing))
+        for extension in missing:
+            filename = f"{card_file_stem(membership_id)}.{extension}"
+            os.replace(os.path.join(tmp_dir, filename), os.path.join(final_dir, filename))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # Drop renders for older versions of this member's data
+    for entry in os.listdir(member_dir):
+        if entry != os.path.basename(final_dir) and not entry.startswith("."):
+            shutil.rmtree(os.path.join(member_dir, entry), ignore_errors=True)
+
+    return final_dir
+
+async def ensure_card_rendered(fields: dict, force: bool = False, formats: tuple = ("png", "pdf")) -> str:
+    """
+    Return the fingerprint of an up-to-date cached card, rendering the
+    requested formats in the threadpool on a miss. Concurrent callers for the
+    same card and formats await one render.
+    """
+    fingerprint = card_fingerprint(**fields)
+    membership_id = fields["membership_id"]
+    if not force and all(os.path.exists(cached_card_path(membership_id, fingerprint, extension)) for extension in formats):
+        return fingerprint
+
+    key = (fingerprint, tuple(formats))
+    task = _inflight_renders.get(key)
+    if task is None:
+        task = asyncio.ensure_future(run_in_threadpool(render_card_to_cache, fields, fingerprint, force, tuple(formats)))
+        _inflight_renders[key] = task
+        task.add_done_callback(lambda _: _inflight_renders.pop(key, None))
+    # Shield the shared render from cancellation when one client disconnects
+    await asyncio.shield(task)
+    return fingerprint
@@ -1,196 +1,405 @@
 from PIL import Image, ImageDraw, ImageFont
+from functools import lru_cache
+from io import BytesIO
+import hashlib
+import json
 import qrcode
 import os
 from datetime import datetime
+from app.utils.photo_processing import photo_variant_name
 
-def generate_id_card(membership_id: str, name: str, village: str, district: str, phone: str, state: str, photo_path: str = None) -> str:
+# ID Card dimensions (credit card size)
+CARD_WIDTH, CARD_HEIGHT = 1200, 750  # 4 x 2.5 inches at 300 DPI
+
+# Layout of the member-specific areas
+PHOTO_SIZE = 220
+PHOTO_X, PHOTO_Y = 60, 180
+DETAILS_X = PHOTO_X + PHOTO_SIZE + 60
+QR_SIZE = 120
+QR_X = CARD_WIDTH - QR_SIZE - 60
+QR_Y = CARD_HEIGHT - 180
+SIGNATURE_Y = CARD_HEIGHT - 100
+SIGNATURE_WIDTH = 200
+
+# A fixed mask skips qrcode's search over all eight patterns, which costs
+# more than the rest of the card put together; every mask scans fine.
+QR_MASK_PATTERN = 0
+
+IDCARDS_DIR = "app/static/idcards"
+
+# zlib level for card PNGs; optimize=True roughly doubled encode time for no real size saving
+PNG_COMPRESS_LEVEL = int(os.getenv("IDCARD_PNG_COMPRESS_LEVEL", "6"))
+
+# Bump whenever the card layout changes so cached and stored cards are re-rendered
+CARD_TEMPLATE_VERSION = 1
+
+def resolve_photo_path(photo_url: str = None):
+    """Convert a stored photo URL to the file path used for rendering"""
+    if not photo_url:
+        return None
+    if photo_url.startswith("/static/photos/"):
+        photo_path = photo_url.replace("/static/", "app/static/")
+        # Prefer the precomputed card-size crop when the upload has one
+        card_path = os.path.join(os.path.dirname(photo_path), photo_variant_name(os.path.basename(photo_path), "card"))
+        return card_path if os.path.exists(card_path) else photo_path
+    # Handle other photo URL formats
+    return photo_url
+
+def card_fingerprint(membership_id: str, name: str, village: str, district: str, phone: str, state: str, photo_path: str = None) -> str:
     """
-    Generate professional ID card with enhanced Mala Mahanadu branding
+    Hash of everything that is drawn on a card. Two renders with the same
+    fingerprint produce the same card, so it keys the render cache.
     """
-    # ID Card dimensions (credit card size)
-    width, height = 1200, 750  # 4 x 2.5 inches at 300 DPI
-    
-    # Create new image with gradient background
-    img = Image.new('RGB', (width, height), '#1a237e')
-    draw = ImageDraw.Draw(img)
-    
+    photo = None
+    if photo_path and os.path.exists(photo_path):
+        stat = os.stat(photo_path)
+        photo = [photo_path, stat.st_size, stat.st_mtime_ns]
+    fields = [CARD_TEMPLATE_VERSION, membership_id, name, village, district, phone, state, photo]
+    return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()
+
+@lru_cache(maxsize=1)
+def get_card_fonts() -> dict:
+    """Load the card fonts once per process"""
     # Try to load fonts, fallback to default if not available
     try:
-        title_font = ImageFont.truetype("arial.ttf", 52)
-        subtitle_font = ImageFont.truetype("arial.ttf", 36)
-        regular_font = ImageFont.truetype("arial.ttf", 28)
-        small_font = ImageFont.truetype("arial.ttf", 20)
-        tiny_font = ImageFont.truetype("arial.ttf", 16)
+        return {
+            "title": ImageFont.truetype("arial.ttf", 52),
+            "subtitle": ImageFont.truetype("arial.ttf", 36),
+            "regular": ImageFont.truetype("arial.ttf", 28),
+            "small": ImageFont.truetype("arial.ttf", 20),
+            "tiny": ImageFont.truetype("arial.ttf", 16),
+        }
     except:
-        title_font = ImageFont.load_default()
-        subtitle_font = ImageFont.load_default()
-        regular_font = ImageFont.load_default()
-        small_font = ImageFont.load_default()
-        tiny_font = ImageFont.load_default()
-    
+        default_font = ImageFont.load_default()
+        return {name: default_font for name in ("title", "subtitle", "regular", "small", "tiny")}
+
+@lru_cache(maxsize=1)
+def get_card_template() -> Image.Image:
+    """
+    Render the static layer shared by every card (header, border, frames, labels).
+    Callers must copy() the returned image before drawing on it.
+    """
+    width, height = CARD_WIDTH, CARD_HEIGHT
+    fonts = get_card_fonts()
+
+    # Create new image with gradient background
+    img = Image.new('RGB', (width, height), '#1a237e')
+    draw = ImageDraw.Draw(img)
+
     # Create gradient header background
     for i in range(150):
         color_value = 245 - (i * 0.5)
         color = f'#{int(color_value):02x}{int(color_value * 0.7):02x}18'
         draw.rectangle([0, i, width, i+1], fill=color)
-    
+
     # Add decorative border
     border_width = 8
-    draw.rectangle([border_width, border_width, width-border_width, height-border_width], 
+    draw.rectangle([border_width, border_width, width-border_width, height-border_width],
                    fill=None, outline='#FFD700', width=border_width)
-    
+
     # Add organization name and logo area
-    draw.text((width//2, 40), "MALA MAHANADU", font=title_font, fill='#1a237e', anchor='mm')
-    draw.text((width//2, 90), "OFFICIAL MEMBERSHIP CARD", font=subtitle_font, fill='#d32f2f', anchor='mm')
-    
+    draw.text((width//2, 40), "MALA MAHANADU", font=fonts["title"], fill='#1a237e', anchor='mm')
+    draw.text((width//2, 90), "OFFICIAL MEMBERSHIP CARD", font=fonts["subtitle"], fill='#d32f2f', anchor='mm')
+
     # Add tagline
-    draw.text((width//2, 130), "Empowering Community, Building Future", font=small_font, fill='#1a237e', anchor='mm')
-    
-    # Add photo placeholder or actual photo
-    photo_size = 220
-    photo_x, photo_y = 60, 180
-    
+    draw.text((width//2, 130), "Empowering Community, Building Future", font=fonts["small"], fill='#1a237e', anchor='mm')
+
     # Draw photo frame with shadow effect
     shadow_offset = 5
-    draw.rectangle([photo_x + shadow_offset, photo_y + shadow_offset, photo_x + photo_size + shadow_offset, photo_y + photo_size + shadow_offset], 
+    draw.rectangle([PHOTO_X + shadow_offset, PHOTO_Y + shadow_offset, PHOTO_X + PHOTO_SIZE + shadow_offset, PHOTO_Y + PHOTO_SIZE + shadow_offset],
                    fill='#666666', outline=None)
-    draw.rectangle([photo_x, photo_y, photo_x + photo_size, photo_y + photo_size], 
+    draw.rectangle([PHOTO_X, PHOTO_Y, PHOTO_X + PHOTO_SIZE, PHOTO_Y + PHOTO_SIZE],
                    fill='white', outline='#FFD700', width=4)
-    
-    if photo_path and os.path.exists(photo_path):
-        try:
-            photo = Image.open(photo_path)
-            # Crop to square and resize
-            min_dim = min(photo.size)
-            left = (photo.size[0] - min_dim) // 2
-            top = (photo.size[1] - min_dim) // 2
-            photo = photo.crop((left, top, left + min_dim, top + min_dim))
-            photo = photo.resize((photo_size, photo_size))
-            img.paste(photo, (photo_x, photo_y))
-        except Exception as e:
-            print(f"Error loading photo: {e}")
-            # Fallback to placeholder
-            draw.text((photo_x + photo_size//2, photo_y + photo_size//2), "PHOTO", 
-                     font=regular_font, fill='#1a237e', anchor='mm')
+
+    # Membership ID label
+    draw.text((DETAILS_X, PHOTO_Y + 10 + 50), "Membership ID:", font=fonts["small"], fill='#FFD700')
+
+    # Add QR code background and "Scan to Verify" text
+    draw.rectangle([QR_X - 5, QR_Y - 5, QR_X + QR_SIZE + 5, QR_Y + QR_SIZE + 5],
+                   fill='white', outline='#FFD700', width=2)
+    draw.text((QR_X + QR_SIZE//2, QR_Y + QR_SIZE + 15), "Scan to Verify",
+             font=fonts["tiny"], fill='#FFD700', anchor='mm')
+
+    # Signature line with shadow
+    draw.line([52, SIGNATURE_Y + 2, SIGNATURE_WIDTH + 52, SIGNATURE_Y + 2], fill='#666666', width=3)
+    draw.line([50, SIGNATURE_Y, SIGNATURE_WIDTH + 50, SIGNATURE_Y], fill='#FFD700', width=2)
+    draw.text((50 + SIGNATURE_WIDTH//2, SIGNATURE_Y + 15), "Authorized Signature",
+             font=fonts["tiny"], fill='white', anchor='mm')
+
+    # Add watermark
+    draw.text((width - 80, height - 40), "MALA MAHANADU",
+             font=fonts["tiny"], fill='#666666', anchor='mm')
+
+    return img
+
+def clear_card_template_cache() -> None:
+    """Drop the cached fonts and template, e.g. after changing the card design"""
+    get_card_template.cache_clear()
+    get_card_fonts.cache_clear()
+
+def make_qr_matrix(data: str) -> list:
+    """QR modules for data, including the quiet-zone border, as rows of booleans"""
+    qr = qrcode.QRCode(version=1, box_size=8, border=3, mask_pattern=QR_MASK_PATTERN)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+def make_qr_image(data: str) -> Image.Image:
+    """Render a white-on-navy QR code scaled to the card's QR area"""
+    # Build the bitmap from the module matrix in one go instead of letting
+    # qrcode draw every module as a separate rectangle
+    matrix = make_qr_matrix(data)
+    modules = len(matrix)
+    mask = Image.frombytes('L', (modules, modules), bytes(255 if cell else 0 for row in matrix for cell in row))
+    mask = mask.resize((modules * 8, modules * 8), Image.NEAREST)
+    qr_img = Image.new('RGB', mask.size, '#1a237e')
+    qr_img.paste('white', mask=mask)
+    return qr_img.resize((QR_SIZE, QR_SIZE))
+
+def verification_url_for(membership_id: str) -> str:
+    return f"https://malamahanadu.org/api/membership/verify/{membership_id}"
+
+def load_card_photo(photo_path: str = None):
+    """Open a member photo cropped to a square and resized to the card's photo frame, or None"""
+    if not photo_path or not os.path.exists(photo_path):
+        return None
+    try:
+        photo = Image.open(photo_path)
+        # Let JPEGs decode at a reduced scale that still covers the frame
+        photo.draft('RGB', (PHOTO_SIZE, PHOTO_SIZE))
+        # Crop to square and resize
+        min_dim = min(photo.size)
+        left = (photo.size[0] - min_dim) // 2
+        top = (photo.size[1] - min_dim) // 2
+        photo = photo.crop((left, top, left + min_dim, top + min_dim))
+        return photo.resize((PHOTO_SIZE, PHOTO_SIZE))
+    except Exception as e:
+        print(f"Error loading photo: {e}")
+        return None
+
+def render_id_card_image(membership_id: str, name: str, village: str, district: str, phone: str, state: str, photo_path: str = None, issued_at: datetime = None, photo: Image.Image = None) -> Image.Image:
+    """Draw the member-specific fields, photo and QR code on a copy of the card template"""
+    issued_at = issued_at or datetime.now()
+    img = get_card_template().copy()
+    draw = ImageDraw.Draw(img)
+    fonts = get_card_fonts()
+    regular_font = fonts["regular"]
+    small_font = fonts["small"]
+    tiny_font = fonts["tiny"]
+
+    # Add photo placeholder or actual photo
+    if photo is None:
+        photo = load_card_photo(photo_path)
+    if photo is not None:
+        img.paste(photo, (PHOTO_X, PHOTO_Y))
     else:
         # Photo placeholder with icon
-        draw.text((photo_x + photo_size//2, photo_y + photo_size//2), "PHOTO", 
+        draw.text((PHOTO_X + PHOTO_SIZE//2, PHOTO_Y + PHOTO_SIZE//2), "PHOTO",
                  font=regular_font, fill='#1a237e', anchor='mm')
-    
+
     # Add member details with better formatting
-    details_x = photo_x + photo_size + 60
-    details_y = photo_y + 10
+    details_x = DETAILS_X
+    details_y = PHOTO_Y + 10
     line_height = 40
-    
+
     # Name with larger font
     draw.text((details_x, details_y), f"Name: {name}", font=regular_font, fill='white')
     details_y += line_height + 10
-    
-    # Membership ID with highlighting
-    draw.text((details_x, details_y), f"Membership ID:", font=small_font, fill='#FFD700')
+
+    # Membership ID with highlighting (label is part of the template)
     details_y += 25
     draw.text((details_x + 20, details_y), f"{membership_id}", font=regular_font, fill='white', anchor='mm')
     details_y += line_height
-    
+
     # Contact information
     draw.text((details_x, details_y), f"Phone: {phone}", font=regular_font, fill='white')
     details_y += line_height
-    
+
     # Location information
     draw.text((details_x, details_y), f"Village: {village}", font=regular_font, fill='white')
     details_y += line_height
-    
+
     draw.text((details_x, details_y), f"District: {district}", font=regular_font, fill='white')
     details_y += line_height
-    
+
     draw.text((details_x, details_y), f"State: {state}", font=regular_font, fill='white')
     details_y += line_height + 10
-    
+
     # Valid from date with styling
-    valid_from = datetime.now().strftime("%d-%m-%Y")
+    valid_from = issued_at.strftime("%d-%m-%Y")
     draw.text((details_x, details_y), f"Valid From: {valid_from}", font=small_font, fill='#FFD700')
-    
-    # Add QR Code with enhanced styling
-    qr_size = 120
-    qr_x = width - qr_size - 60
-    qr_y = height - 180
-    
+
+    # Add QR Code
     try:
         # Create QR code with verification URL
-        verification_url = f"https://malamahanadu.org/api/membership/verify/{membership_id}"
-        qr = qrcode.QRCode(version=1, box_size=8, border=3)
-        qr.add_data(verification_url)
-        qr.make(fit=True)
-        qr_img = qr.make_image(fill_color='white', back_color='#1a237e')
-        qr_img = qr_img.resize((qr_size, qr_size))
-        
-        # Add QR code background
-        draw.rectangle([qr_x - 5, qr_y - 5, qr_x + qr_size + 5, qr_y + qr_size + 5], 
-                       fill='white', outline='#FFD700', width=2)
-        img.paste(qr_img, (qr_x, qr_y))
-        
-        # Add "Scan to Verify" text
-        draw.text((qr_x + qr_size//2, qr_y + qr_size + 15), "Scan to Verify", 
-                 font=tiny_font, fill='#FFD700', anchor='mm')
+        img.paste(make_qr_image(verification_url_for(membership_id)), (QR_X, QR_Y))
     except Exception as e:
         print(f"Error generating QR code: {e}")
-    
-    # Add signature section with better styling
-    signature_y = height - 100
-    signature_width = 200
-    
-    # Signature line with shadow
-    draw.line([52, signature_y + 2, signature_width + 52, signature_y + 2], fill='#666666', width=3)
-    draw.line([50, signature_y, signature_width + 50, signature_y], fill='#FFD700', width=2)
-    draw.text((50 + signature_width//2, signature_y + 15), "Authorized Signature", 
-             font=tiny_font, fill='white', anchor='mm')
-    
+
     # Add issue date and card number
-    issue_date = datetime.now().strftime("%B %d, %Y")
-    draw.text((qr_x + qr_size//2, signature_y + 20), f"Issued: {issue_date}", 
+    issue_date = issued_at.strftime("%B %d, %Y")
+    draw.text((QR_X + QR_SIZE//2, SIGNATURE_Y + 20), f"Issued: {issue_date}",
              font=tiny_font, fill='#FFD700', anchor='mm')
-    
+
     # Add card number at bottom
     card_number = f"CARD-{membership_id[-6:]}"
-    draw.text((width//2, height - 25), card_number, 
+    draw.text((CARD_WIDTH//2, CARD_HEIGHT - 25), card_number,
              font=tiny_font, fill='white', anchor='mm')
-    
-    # Add watermark
-    watermark_text = "MALA MAHANADU"
-    draw.text((width - 80, height - 40), watermark_text, 
-             font=tiny_font, fill='#666666', anchor='mm')
-    
+
+    return img
+
+def render_id_card_pdf(filepath: str, membership_id: str, name: str, village: str, district: str, phone: str, state: str, photo_path: str = None, issued_at: datetime = None, photo: Image.Image = None) -> str:
+    """
+    Draw the card natively in ReportLab: vector shapes, text in the standard
+    Helvetica font and a vector QR code. Only the member photo is embedded,
+    as a JPEG. Layout coordinates are the PNG's pixels, scaled to 4 x 2.5 inches.
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.colors import HexColor, white
+    from reportlab.pdfbase.pdfmetrics import getAscentDescent
+    from reportlab.lib.utils import ImageReader
+
+    issued_at = issued_at or datetime.now()
+    scale = 72 * 4 / CARD_WIDTH
+    c = canvas.Canvas(filepath, pagesize=(CARD_WIDTH * scale, CARD_HEIGHT * scale), pageCompression=1)
+    c.setTitle(f"Mala Mahanadu Membership Card {membership_id}")
+    c.scale(scale, scale)
+
+    navy, gold, grey, red = HexColor('#1a237e'), HexColor('#FFD700'), HexColor('#666666'), HexColor('#d32f2f')
+    sizes = {"title": 52, "subtitle": 36, "regular": 28, "small": 20, "tiny": 16}
+
+    def rect(x0, y0, x1, y1, fill=None, stroke=None, width=0):
+        # PIL boxes are top-left based with the outline drawn inside the box
+        inset = width / 2
+        if fill is not None:
+            c.setFillColor(fill)
+        if stroke is not None:
+            c.setStrokeColor(stroke)
+            c.setLineWidth(width)
+        c.rect(x0 + inset, CARD_HEIGHT - y1 + inset, x1 - x0 - width, y1 - y0 - width,
+               fill=fill is not None, stroke=stroke is not None)
+
+    def text(x, y, value, size, color, anchor='la'):
+        # Match PIL anchors: 'la' puts the ascender at y, 'mm' centres on (x, y)
+        ascent, descent = getAscentDescent("Helvetica", sizes[size])
+        c.setFont("Helvetica", sizes[size])
+        c.setFillColor(color)
+        if anchor == 'mm':
+            c.drawCentredString(x, CARD_HEIGHT - y - (ascent + descent) / 2, value)
+        else:
+            c.drawString(x, CARD_HEIGHT - y - ascent, value)
+
+    def line(x0, y0, x1, y1, color, width):
+        c.setStrokeColor(color)
+        c.setLineWidth(width)
+        c.line(x0, CARD_HEIGHT - y0, x1, CARD_HEIGHT - y1)
+
+    # Background and gradient header
+    rect(0, 0, CARD_WIDTH, CARD_HEIGHT, fill=navy)
+    c.saveState()
+    header = c.beginPath()
+    header.rect(0, CARD_HEIGHT - 150, CARD_WIDTH, 150)
+    c.clipPath(header, stroke=0, fill=0)
+    c.linearGradient(0, CARD_HEIGHT, 0, CARD_HEIGHT - 150,
+                     (HexColor('#f5ab18'), HexColor('#aa7718')), extend=False)
+    c.restoreState()
+
+    # Decorative border
+    rect(8, 8, CARD_WIDTH - 8, CARD_HEIGHT - 8, stroke=gold, width=8)
+
+    # Organization name and tagline
+    text(CARD_WIDTH//2, 40, "MALA MAHANADU", "title", navy, 'mm')
+    text(CARD_WIDTH//2, 90, "OFFICIAL MEMBERSHIP CARD", "subtitle", red, 'mm')
+    text(CARD_WIDTH//2, 130, "Empowering Community, Building Future", "small", navy, 'mm')
+
+    # Photo frame with shadow, then photo or placeholder
+    rect(PHOTO_X + 5, PHOTO_Y + 5, PHOTO_X + PHOTO_SIZE + 5, PHOTO_Y + PHOTO_SIZE + 5, fill=grey)
+    rect(PHOTO_X, PHOTO_Y, PHOTO_X + PHOTO_SIZE, PHOTO_Y + PHOTO_SIZE, fill=white, stroke=gold, width=4)
+    if photo is None:
+        photo = load_card_photo(photo_path)
+    if photo is not None:
+        buffer = BytesIO()
+        photo.convert('RGB').save(buffer, 'JPEG', quality=90)
+        buffer.seek(0)
+        c.drawImage(ImageReader(buffer), PHOTO_X, CARD_HEIGHT - PHOTO_Y - PHOTO_SIZE, PHOTO_SIZE, PHOTO_SIZE)
+    else:
+        text(PHOTO_X + PHOTO_SIZE//2, PHOTO_Y + PHOTO_SIZE//2, "PHOTO", "regular", navy, 'mm')
+
+    # Member details
+    text(DETAILS_X, PHOTO_Y + 10, f"Name: {name}", "regular", white)
+    text(DETAILS_X, PHOTO_Y + 60, "Membership ID:", "small", gold)
+    text(DETAILS_X + 20, PHOTO_Y + 85, membership_id, "regular", white, 'mm')
+    text(DETAILS_X, PHOTO_Y + 125, f"Phone: {phone}", "regular", white)
+    text(DETAILS_X, PHOTO_Y + 165, f"Village: {village}", "regular", white)
+    text(DETAILS_X, PHOTO_Y + 205, f"District: {district}", "regular", white)
+    text(DETAILS_X, PHOTO_Y + 245, f"State: {state}", "regular", white)
+    text(DETAILS_X, PHOTO_Y + 295, f"Valid From: {issued_at.strftime('%d-%m-%Y')}", "small", gold)
+
+    # Vector QR code: navy square with one white rectangle per dark module
+    rect(QR_X - 5, QR_Y - 5, QR_X + QR_SIZE + 5, QR_Y + QR_SIZE + 5, fill=white, stroke=gold, width=2)
+    rect(QR_X, QR_Y, QR_X + QR_SIZE, QR_Y + QR_SIZE, fill=navy)
+    try:
+        matrix = make_qr_matrix(verification_url_for(membership_id))
+        module = QR_SIZE / len(matrix)
+        modules = c.beginPath()
+        for row_index, row in enumerate(matrix):
+            for col_index, cell in enumerate(row):
+                if cell:
+                    modules.rect(QR_X + col_index * module, CARD_HEIGHT - QR_Y - (row_index + 1) * module, module, module)
+        c.setFillColor(white)
+        c.drawPath(modules, stroke=0, fill=1)
+    except Exception as e:
+        print(f"Error generating QR code: {e}")
+    text(QR_X + QR_SIZE//2, QR_Y + QR_SIZE + 15, "Scan to Verify", "tiny", gold, 'mm')
+
+    # Signature block, issue date, card number and watermark
+    line(52, SIGNATURE_Y + 2, SIGNATURE_WIDTH + 52, SIGNATURE_Y + 2, grey, 3)
+    line(50, SIGNATURE_Y, SIGNATURE_WIDTH + 50, SIGNATURE_Y, gold, 2)
+    text(50 + SIGNATURE_WIDTH//2, SIGNATURE_Y + 15, "Authorized Signature", "tiny", white, 'mm')
+    text(QR_X + QR_SIZE//2, SIGNATURE_Y + 20, f"Issued: {issued_at.strftime('%B %d, %Y')}", "tiny", gold, 'mm')
+    text(CARD_WIDTH//2, CARD_HEIGHT - 25, f"CARD-{membership_id[-6:]}", "tiny", white, 'mm')
+    text(CARD_WIDTH - 80, CARD_HEIGHT - 40, "MALA MAHANADU", "tiny", grey, 'mm')
+
+    c.showPage()
+    c.save()
+    return filepath
+
+def generate_id_card(membership_id: str, name: str, village: str, district: str, phone: str, state: str, photo_path: str = None, output_dir: str = IDCARDS_DIR, formats: tuple = ("png", "pdf")) -> str:
+    """
+    Generate professional ID card with enhanced Mala Mahanadu branding.
+    formats selects the files written ("png", "pdf" or both); the path of the
+    PNG is returned, or of the PDF when only a PDF was requested.
+    """
+    # Shared by both renderers so the photo is decoded once
+    issued_at = datetime.now()
+    photo = load_card_photo(photo_path)
+    card_fields = dict(membership_id=membership_id, name=name, village=village, district=district,
+                       phone=phone, state=state, issued_at=issued_at, photo=photo)
+
     # Create ID cards directory if it doesn't exist
-    idcards_dir = "app/static/idcards"
+    idcards_dir = output_dir
     os.makedirs(idcards_dir, exist_ok=True)
-    
-    # Save the ID card with proper format settings
-    filename = f"ID_{membership_id.replace('-', '_')}.png"
-    filepath = os.path.join(idcards_dir, filename)
-    
-    # Ensure image is in RGB mode for maximum compatibility
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
-    
-    # Save with high quality and proper PNG settings
-    img.save(filepath, 'PNG', quality=95, optimize=True, dpi=(300, 300))
-    
-    # Also create PDF version
-    try:
-        from reportlab.lib.pagesizes import landscape, letter
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.utils import ImageReader
-        
-        pdf_filename = f"ID_{membership_id.replace('-', '_')}.pdf"
-        pdf_filepath = os.path.join(idcards_dir, pdf_filename)
-        
-        # Create landscape page size
-        page_size = landscape((width, height))
-        c = canvas.Canvas(pdf_filepath, pagesize=page_size)
-        c.drawImage(ImageReader(filepath), 0, 0, width=width, height=height)
-        c.save()
-        
-    except ImportError:
-        print("ReportLab not installed, skipping PDF generation")
-    
+    filename_stem = f"ID_{membership_id.replace('-', '_')}"
+    filepath = None
+
+    if "png" in formats:
+        img = render_id_card_image(**card_fields)
+
+        # Save the ID card with proper format settings
+        filepath = os.path.join(idcards_dir, f"{filename_stem}.png")
+
+        # Ensure image is in RGB mode for maximum compatibility
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # Save with proper PNG settings
+        img.save(filepath, 'PNG', compress_level=PNG_COMPRESS_LEVEL, dpi=(300, 300))
+
+    if "pdf" in formats:
+        try:
+            pdf_filepath = render_id_card_pdf(os.path.join(idcards_dir, f"{filename_stem}.pdf"), **card_fields)
+            filepath = filepath or pdf_filepath
+        except ImportError:
+            print("ReportLab not installed, skipping PDF generation")
+
     return filepath
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.idempotency_key import IdempotencyKey
+import hashlib
+import json
+import os
+
+# How long a key's response is replayed for
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60)))
+# A request still pending after this long is assumed to have died and its key is reused
+IDEMPOTENCY_LOCK_SECONDS = 120
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+def request_hash(fields: dict) -> str:
+    """Fingerprint of a request's fields, to refuse a key reused for a different request"""
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+def replay_response(record: IdempotencyKey) -> JSONResponse:
+    return JSONResponse(
+        status_code=record.response_status,
+        content=json.loads(record.response_body),
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+def claim_idempotency_key(db: Session, endpoint: str, key: str, fields: dict) -> tuple:
+    """
+    Claim key for this request. Returns (record, None) when the request
+    should run, or (None, response) with the original response when the
+    key has already completed. Raises 409 while the original request is
+    still running and 422 when the key was used for a different request.
+    """
+    if len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+    fingerprint = request_hash(fields)
+    now = datetime.utcnow()
+
+    for _ in range(2):
+        record = IdempotencyKey(
+            endpoint=endpoint, key=key, request_hash=fingerprint, status="pending",
+            locked_at=now, expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+        )
+        db.add(record)
+        try:
+            db.commit()
+            return record, None
+        except IntegrityError:
+            db.rollback()
+
+        existing = db.scalar(
+            select(IdempotencyKey).where(IdempotencyKey.endpoint == endpoint, IdempotencyKey.key == key)
+        )
+        if existing is None:
+            continue
+        abandoned = existing.status == "pending" and existing.locked_at < now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+        if existing.expires_at < now or abandoned:
+            db.delete(existing)
+            db.commit()
+            continue
+        if existing.request_hash != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        if existing.status == "done":
+            return None, replay_response(existing)
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still being processed",
+            headers={"Retry-After": "2"},
+        )
+    raise HTTPException(status_code=409, detail="Could not claim Idempotency-Key")
+
+def complete_idempotency_key(db: Session, record: IdempotencyKey, body: dict, status_code: int = 200) -> None:
+    """Store the response to replay for later requests with the same key"""
+    record.status = "done"
+    record.response_status = status_code
+    record.response_body = json.dumps(body, default=str)
+    db.commit()
+
+def release_idempotency_key(db: Session, record: IdempotencyKey) -> None:
+    """Forget the key so a retry runs the request again, e.g. after a failure worth retrying"""
+    db.rollback()
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == record.id))
+    db.commit()
+
+def purge_expired_idempotency_keys(db: Session) -> int:
+    """Delete keys past their expiry; returns how many were removed"""
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.utcnow()))
+    db.commit()
+    return result.rowcount
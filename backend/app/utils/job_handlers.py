@@ -0,0 +1,72 @@
+from sqlalchemy import select
+from app.database import SessionLocal
+from app.models.member import Member
+from app.utils.idcard_batch import CARD_COLUMNS, stale_card_rows, render_member_card, save_card_urls
+from app.utils.idcard_generator import card_fingerprint
+from app.utils.idcard_cache import member_card_fields, render_card_to_cache, record_card_render
+from app.models.email_campaign import EmailCampaign
+from app.utils.email_outbox import queue_welcome_email, expand_campaign
+from app.utils.job_queue import job_handler
+
+@job_handler("render_id_card")
+def render_id_card_job(payload: dict) -> dict:
+    """Render the ID card for payload['member_id'] and store its URL"""
+    db = SessionLocal()
+    try:
+        member = db.get(Member, payload["member_id"])
+        if member is None:
+            raise ValueError(f"Member {payload['member_id']} not found")
+
+        fields = member_card_fields(member)
+        fingerprint = card_fingerprint(**fields)
+        render_card_to_cache(fields, fingerprint)
+        record_card_render(member, fingerprint)
+        db.commit()
+        return {"id_card_url": member.id_card_url}
+    finally:
+        db.close()
+
+@job_handler("render_id_cards")
+def render_id_cards_job(payload: dict) -> dict:
+    """
+    Render the cards for payload['member_ids'] in one pass and store their
+    URLs with a single commit. Cards that are already up to date are skipped,
+    so a retry after a partial failure only renders the ones that failed.
+    """
+    db = SessionLocal()
+    try:
+        rows = [tuple(row) for row in db.execute(
+            select(*CARD_COLUMNS).where(Member.id.in_(payload["member_ids"])).order_by(Member.id)
+        ).all()]
+        results = [render_member_card(row) for row in stale_card_rows(rows)]
+        rendered = save_card_urls(db, results)
+
+        errors = {member_id: error for member_id, _, _, error in results if error}
+        if errors:
+            raise RuntimeError(f"{len(errors)} cards failed to render: {errors}")
+        return {"rendered": rendered, "up_to_date": len(rows) - len(results)}
+    finally:
+        db.close()
+
+@job_handler("send_welcome_email")
+def send_welcome_email_job(payload: dict) -> dict:
+    """Move a welcome email queued before the outbox existed into the outbox"""
+    db = SessionLocal()
+    try:
+        email = queue_welcome_email(db, payload["email"], payload["name"], payload["membership_id"])
+        db.commit()
+        return {"outbox_id": email.id}
+    finally:
+        db.close()
+
+@job_handler("expand_email_campaign")
+def expand_email_campaign_job(payload: dict) -> dict:
+    """Queue an outbox email for every member a campaign targets"""
+    db = SessionLocal()
+    try:
+        campaign = db.get(EmailCampaign, payload["campaign_id"])
+        if campaign is None:
+            raise ValueError(f"Campaign {payload['campaign_id']} not found")
+        return {"recipients": expand_campaign(db, campaign)}
+    finally:
+        db.close()
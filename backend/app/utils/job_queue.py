@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.job import Job
+import json
+import os
+import socket
+import time
+
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+RETRY_DELAY_SECONDS = int(os.getenv("JOB_RETRY_DELAY_SECONDS", "30"))
+# Running jobs whose worker has been silent this long are handed out again
+STALE_JOB_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "600"))
+# How often an idle worker deletes expired idempotency keys
+IDEMPOTENCY_PURGE_INTERVAL = 15 * 60
+
+# job_type -> handler(payload: dict) -> JSON serialisable result
+JOB_HANDLERS: dict = {}
+
+def job_handler(job_type: str) -> Callable:
+    """Register a function as the handler for a job type"""
+    def decorator(func: Callable) -> Callable:
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+def enqueue_job(db: Session, job_type: str, payload: dict, reference: Optional[str] = None) -> Job:
+    """
+    Add a job to the session. It is committed together with the caller's
+    other changes, so a job is never queued for data that was rolled back.
+    """
+    job = Job(job_type=job_type, reference=reference, payload=json.dumps(payload), status="queued")
+    db.add(job)
+    return job
+
+def claim_next_job(db: Session, worker_id: str) -> Optional[Job]:
+    """Atomically move the oldest runnable job to running and return it"""
+    now = datetime.utcnow()
+    candidates = db.scalars(
+        select(Job.id)
+        .where(
+            or_(
+                (Job.status == "queued") & (or_(Job.run_after.is_(None), Job.run_after <= now)),
+                (Job.status == "running") & (Job.locked_at < now - timedelta(seconds=STALE_JOB_SECONDS)),
+            )
+        )
+        .order_by(Job.id)
+        .limit(5)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+    for job_id in candidates:
+        # The status check makes the claim safe between workers on databases
+        # without SKIP LOCKED (SQLite); only one UPDATE can match the row
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status.in_(["queued", "running"]),
+                   or_(Job.locked_at.is_(None), Job.locked_at < now - timedelta(seconds=STALE_JOB_SECONDS)))
+            .values(status="running", locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.get(Job, job_id)
+    db.commit()
+    return None
+
+def run_job(db: Session, job: Job) -> None:
+    """Run a claimed job and record its outcome, scheduling a retry on failure"""
+    handler = JOB_HANDLERS.get(job.job_type)
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for job type {job.job_type}")
+        result = handler(json.loads(job.payload))
+        job.status = "done"
+        job.result = json.dumps(result)
+        job.error = None
+    except Exception as e:
+        db.rollback()
+        print(f"Job {job.id} ({job.job_type}) failed: {e}")
+        job.error = str(e)
+        if job.attempts >= MAX_ATTEMPTS or handler is None:
+            job.status = "failed"
+        else:
+            job.status = "queued"
+            job.run_after = datetime.utcnow() + timedelta(seconds=RETRY_DELAY_SECONDS * job.attempts)
+    job.locked_by = None
+    job.locked_at = None
+    db.commit()
+
+def run_worker(poll_interval: float = 1.0, worker_id: Optional[str] = None, stop_when_idle: bool = False) -> None:
+    """
+    Process jobs until interrupted, sending outbox emails whenever no job is
+    waiting, purging expired idempotency keys now and then, and sleeping
+    poll_interval seconds when there is nothing to do
+    """
+    # Importing the handlers registers them
+    from app.utils import job_handlers  # noqa: F401
+    from app.utils.email_outbox import deliver_outbox_batch
+    from app.utils.idempotency import purge_expired_idempotency_keys
+
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    print(f"Job worker {worker_id} started")
+    next_purge = 0.0
+    while True:
+        db = SessionLocal()
+        try:
+            job = claim_next_job(db, worker_id)
+            if job is not None:
+                run_job(db, job)
+                continue
+        finally:
+            db.close()
+        if deliver_outbox_batch(worker_id):
+            continue
+        if time.monotonic() >= next_purge:
+            db = SessionLocal()
+            try:
+                purge_expired_idempotency_keys(db)
+            finally:
+                db.close()
+            next_purge = time.monotonic() + IDEMPOTENCY_PURGE_INTERVAL
+        if stop_when_idle:
+            return
+        time.sleep(poll_interval)
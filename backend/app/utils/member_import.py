@@ -0,0 +1,294 @@
+from datetime import date
+from typing import Iterable, Iterator, Optional
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.member import Member
+from app.utils.contact_normalization import normalize_email, normalize_phone
+from app.utils.aadhar import aadhar_blind_index, encrypt_aadhar, mask_aadhar, normalize_aadhar
+from app.utils.idcard_cache import IDCARD_RENDER_MODE
+from app.utils.idcard_batch import enqueue_card_renders
+from app.utils.membership_ids import membership_id_allocator
+import csv
+import io
+import os
+import re
+
+# Rows validated, deduplicated against the database and inserted per transaction
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+
+# Member column -> accepted header spellings (compared lowercased, without spaces or underscores)
+IMPORT_COLUMNS = {
+    "name": ("name", "fullname", "membername"),
+    "father_name": ("fathername", "father", "fatherorhusbandname"),
+    "gender": ("gender",),
+    "dob": ("dob", "dateofbirth"),
+    "caste": ("caste",),
+    "aadhar": ("aadhar", "aadhaar", "aadharnumber", "aadhaarnumber"),
+    "phone": ("phone", "phonenumber", "mobile", "mobilenumber"),
+    "email": ("email", "emailaddress"),
+    "state": ("state",),
+    "district": ("district",),
+    "mandal": ("mandal",),
+    "village": ("village",),
+    "address": ("address", "fulladdress"),
+}
+REQUIRED_COLUMNS = [column for column in IMPORT_COLUMNS if column != "email"]
+# (field, column compared) for the fields no two members may share
+UNIQUE_FIELDS = (("phone", "phone"), ("email", "email"), ("aadhar", "aadhar_hash"))
+
+class ImportFileError(ValueError):
+    """Raised when an import file cannot be read at all"""
+
+def _header_key(header) -> str:
+    return re.sub(r"[\s_\-]", "", str(header or "")).lower()
+
+def map_import_headers(headers: list) -> dict:
+    """Member column -> position in the file's header row"""
+    aliases = {alias: column for column, spellings in IMPORT_COLUMNS.items() for alias in spellings}
+    positions = {}
+    for position, header in enumerate(headers):
+        column = aliases.get(_header_key(header))
+        if column and column not in positions:
+            positions[column] = position
+    missing = [column for column in REQUIRED_COLUMNS if column not in positions]
+    if missing:
+        raise ImportFileError(f"Missing columns: {', '.join(missing)}")
+    return positions
+
+def _iter_csv_rows(path: str) -> Iterator[list]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        yield from csv.reader(f)
+
+def _xlsx_cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-%d")
+    # Phone and Aadhar numbers typed into a spreadsheet come back as numbers
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def _iter_xlsx_rows(path: str) -> Iterator[list]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("XLSX import needs openpyxl (pip install openpyxl); upload a CSV instead")
+    # Read-only mode streams the sheet instead of loading it into memory
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield [_xlsx_cell_text(value) for value in row]
+    finally:
+        workbook.close()
+
+def iter_import_rows(path: str, filename: Optional[str] = None) -> Iterator[tuple]:
+    """(row number, {column: text}) for every data row of a CSV or XLSX file"""
+    extension = os.path.splitext(filename or path)[1].lower()
+    if extension == ".xlsx":
+        rows = _iter_xlsx_rows(path)
+    elif extension in (".csv", ".txt"):
+        rows = _iter_csv_rows(path)
+    else:
+        raise ImportFileError("Upload a .csv or .xlsx file")
+
+    try:
+        positions = map_import_headers(next(rows))
+    except StopIteration:
+        raise ImportFileError("The file is empty")
+    for row_number, values in enumerate(rows, start=2):
+        if not any(str(value).strip() for value in values):
+            continue
+        yield row_number, {
+            column: str(values[position]).strip() if position < len(values) else ""
+            for column, position in positions.items()
+        }
+
+def validate_import_row(raw: dict) -> tuple:
+    """Normalised member fields and the list of problems with one row"""
+    errors = [f"{column} is required" for column in REQUIRED_COLUMNS if not raw.get(column)]
+    fields = {column: raw.get(column, "") for column in IMPORT_COLUMNS}
+
+    fields["aadhar"] = normalize_aadhar(fields["aadhar"])
+    if fields["aadhar"] and not re.fullmatch(r"\d{12}", fields["aadhar"]):
+        errors.append("aadhar must be 12 digits")
+    if fields["phone"]:
+        try:
+            fields["phone"] = normalize_phone(fields["phone"])
+        except ValueError:
+            errors.append("phone is not a valid phone number")
+    fields["email"] = normalize_email(fields["email"])
+    if fields["email"] and not re.fullmatch(r"[^@\s]+@[^@\s]+\.[^@\s]+", fields["email"]):
+        errors.append("email is not a valid email address")
+    return fields, errors
+
+def _existing_contacts(db: Session, rows: list) -> dict:
+    """
+    Which of the rows' phones, emails and Aadhar numbers are already
+    registered, in one query. Aadhar numbers are matched and returned by
+    their blind index (aadhar_hash).
+    """
+    values = {
+        "phone": {row["phone"] for row in rows if row["phone"]},
+        "email": {row["email"] for row in rows if row["email"]},
+        "aadhar_hash": {row["aadhar_hash"] for row in rows},
+    }
+    clauses = [getattr(Member, column).in_(list(found)) for column, found in values.items() if found]
+    existing = {"phone": set(), "email": set(), "aadhar_hash": set()}
+    if clauses:
+        for email, phone, aadhar_hash in db.execute(
+            select(Member.email, Member.phone, Member.aadhar_hash).where(or_(*clauses))
+        ):
+            existing["email"].add(email)
+            existing["phone"].add(phone)
+            existing["aadhar_hash"].add(aadhar_hash)
+    return existing
+
+def _insert_members(db: Session, rows: list) -> list:
+    """Insert member rows in one executemany; returns their ids"""
+    return db.scalars(insert(Member).returning(Member.id), rows).all()
+
+class MemberImport:
+    """
+    Imports members from rows in batches: each batch is validated,
+    deduplicated against earlier rows of the file and the database in one
+    query, given a block of consecutive membership IDs, bulk inserted and
+    has its ID cards queued, then committed.
+    """
+
+    def __init__(self, dry_run: bool = False, batch_size: int = IMPORT_BATCH_SIZE):
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.seen = {column: set() for _, column in UNIQUE_FIELDS}
+        self.total_rows = 0
+        self.valid = 0  # rows that passed validation and the duplicate checks
+        self.imported = 0
+        self.errors = []  # {"row": n, "errors": [...]}
+        self.membership_ids = []  # (first, last) ranges of the IDs given out
+
+    def run(self, rows: Iterable[tuple]) -> dict:
+        batch = []
+        for row_number, raw in rows:
+            self.total_rows += 1
+            batch.append((row_number, raw))
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch)
+                batch = []
+        if batch:
+            self._import_batch(batch)
+        return self.report()
+
+    def report(self) -> dict:
+        return {
+            "dry_run": self.dry_run,
+            "total_rows": self.total_rows,
+            "valid": self.valid,
+            "imported": self.imported,
+            "failed": len(self.errors),
+            "membership_id_ranges": self.membership_ids,
+            "errors": sorted(self.errors, key=lambda rejected: rejected["row"]),
+        }
+
+    def _record_id_range(self, first: str, last: str) -> None:
+        # Consecutive batches usually get adjacent blocks, reported as one range
+        if self.membership_ids:
+            previous_first, previous_last = self.membership_ids[-1]
+            if previous_last[:9] == first[:9] and int(previous_last[9:]) + 1 == int(first[9:]):
+                self.membership_ids[-1] = (previous_first, last)
+                return
+        self.membership_ids.append((first, last))
+
+    def _reject(self, row_number: int, errors: list) -> None:
+        self.errors.append({"row": row_number, "errors": errors})
+
+    def _import_batch(self, batch: list) -> None:
+        valid = []
+        for row_number, raw in batch:
+            fields, errors = validate_import_row(raw)
+            if errors:
+                self._reject(row_number, errors)
+            else:
+                fields["aadhar_hash"] = aadhar_blind_index(fields["aadhar"])
+                valid.append((row_number, fields))
+
+        db = SessionLocal()
+        try:
+            existing = _existing_contacts(db, [fields for _, fields in valid])
+            accepted = []
+            for row_number, fields in valid:
+                errors = []
+                for field, column in UNIQUE_FIELDS:
+                    value = fields[column]
+                    if not value:
+                        continue
+                    shown = mask_aadhar(fields["aadhar"]) if field == "aadhar" else value
+                    if value in existing[column]:
+                        errors.append(f"{field} {shown} is already registered")
+                    elif value in self.seen[column]:
+                        errors.append(f"{field} {shown} appears earlier in the file")
+                if errors:
+                    self._reject(row_number, errors)
+                    continue
+                for _, column in UNIQUE_FIELDS:
+                    if fields[column]:
+                        self.seen[column].add(fields[column])
+                accepted.append((row_number, fields))
+
+            self.valid += len(accepted)
+            if not accepted or self.dry_run:
+                return
+
+            membership_ids = membership_id_allocator.reserve(len(accepted))
+            rows = []
+            for membership_id, (_, fields) in zip(membership_ids, accepted):
+                row = {column: value for column, value in fields.items() if column != "aadhar"}
+                row.update(aadhar_encrypted=encrypt_aadhar(fields["aadhar"]), membership_id=membership_id,
+                           status="pending", photo_url=None)
+                rows.append(row)
+
+            try:
+                member_ids = _insert_members(db, rows)
+                inserted_ids = [(membership_ids[0], membership_ids[-1])]
+            except IntegrityError:
+                # A member registered since the duplicate check; find the conflicting rows one by one
+                db.rollback()
+                member_ids, inserted = self._insert_row_by_row(db, accepted, rows)
+                inserted_ids = [(membership_id, membership_id) for membership_id in inserted]
+
+            # Imported members are pending, so approval mode renders them when they are approved
+            if IDCARD_RENDER_MODE == "eager":
+                enqueue_card_renders(db, member_ids)
+            db.commit()
+            self.imported += len(member_ids)
+            # Only the IDs of rows actually inserted are reported
+            for first, last in inserted_ids:
+                self._record_id_range(first, last)
+        finally:
+            db.close()
+
+    def _insert_row_by_row(self, db: Session, accepted: list, rows: list) -> tuple:
+        """Insert rows one savepoint at a time; returns the member ids and membership IDs inserted"""
+        member_ids, membership_ids = [], []
+        for (row_number, _), row in zip(accepted, rows):
+            try:
+                with db.begin_nested():
+                    member_ids.extend(_insert_members(db, [row]))
+                membership_ids.append(row["membership_id"])
+            except IntegrityError as e:
+                self._reject(row_number, [f"already registered: {e.orig}"])
+        return member_ids, membership_ids
+
+def import_members_file(path: str, filename: Optional[str] = None, dry_run: bool = False) -> dict:
+    """Import members from a CSV or XLSX file and return the report"""
+    return MemberImport(dry_run=dry_run).run(iter_import_rows(path, filename))
+
+def import_errors_csv(report: dict) -> str:
+    """The report's rejected rows as CSV (row, error) for volunteers to correct"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["row", "error"])
+    for rejected in report["errors"]:
+        writer.writerow([rejected["row"], "; ".join(rejected["errors"])])
+    return output.getvalue()
@@ -0,0 +1,195 @@
+from sqlalchemy import Float, column, exists, func, literal, literal_column, or_, select, table, text, union_all
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from app.models.member import Member
+from app.utils.aadhar import aadhar_blind_index, normalize_aadhar
+from app.utils.contact_normalization import DEFAULT_PHONE_COUNTRY_CODE
+import re
+
+# Name and email are searched by word prefix through an FTS5 table on SQLite
+# and by substring through trigram indexes on PostgreSQL. Membership IDs and
+# phone numbers are searched by prefix through their unique indexes.
+SQLITE_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS members_fts USING fts5(
+        name, email, content='members', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS members_fts_insert AFTER INSERT ON members BEGIN
+        INSERT INTO members_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS members_fts_delete AFTER DELETE ON members BEGIN
+        INSERT INTO members_fts(members_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS members_fts_update AFTER UPDATE OF name, email ON members BEGIN
+        INSERT INTO members_fts(members_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+        INSERT INTO members_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END""",
+]
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_members_name_trgm ON members USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_members_email_trgm ON members USING gin (email gin_trgm_ops)",
+]
+SQLITE_SEARCH_DROP_DDL = [
+    "DROP TRIGGER IF EXISTS members_fts_update",
+    "DROP TRIGGER IF EXISTS members_fts_delete",
+    "DROP TRIGGER IF EXISTS members_fts_insert",
+    "DROP TABLE IF EXISTS members_fts",
+]
+POSTGRES_SEARCH_DROP_DDL = [
+    "DROP INDEX IF EXISTS ix_members_email_trgm",
+    "DROP INDEX IF EXISTS ix_members_name_trgm",
+]
+
+# Rank given to exact identifier matches so they sort before any text match
+IDENTIFIER_MATCH_RANK = -1e9
+
+members_fts = table("members_fts", column("rowid"), column("rank"))
+
+def create_member_search_index(connection: Connection) -> str:
+    """
+    Create the search index for the connection's database if it is missing
+    and return the search backend: "fts5", "trigram", or "like" when the
+    database cannot index text search.
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'members_fts'")
+        ).first()
+        try:
+            for statement in SQLITE_SEARCH_DDL:
+                connection.execute(text(statement))
+        except DBAPIError as e:
+            print(f"Member search index unavailable, searching without it: {e}")
+            return "like"
+        if not exists:
+            # Index the members that existed before the table
+            connection.execute(text("INSERT INTO members_fts(members_fts) VALUES ('rebuild')"))
+        return "fts5"
+    if dialect == "postgresql":
+        try:
+            # A savepoint keeps the caller's transaction usable if the extension cannot be created
+            with connection.begin_nested():
+                for statement in POSTGRES_SEARCH_DDL:
+                    connection.execute(text(statement))
+        except DBAPIError as e:
+            print(f"Member search index unavailable, searching without it: {e}")
+            return "like"
+        return "trigram"
+    return "like"
+
+def drop_member_search_index(connection: Connection) -> None:
+    statements = SQLITE_SEARCH_DROP_DDL if connection.dialect.name == "sqlite" else POSTGRES_SEARCH_DROP_DDL
+    if connection.dialect.name in ("sqlite", "postgresql"):
+        for statement in statements:
+            connection.execute(text(statement))
+
+# Set by ensure_member_search_index at startup
+member_search_backend = "like"
+
+def ensure_member_search_index(engine: Engine) -> str:
+    global member_search_backend
+    with engine.begin() as connection:
+        member_search_backend = create_member_search_index(connection)
+    return member_search_backend
+
+def _prefix_range(column_, prefix: str) -> tuple:
+    """column starts with prefix, as a range an ordinary index can serve on any database"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return column_ >= prefix, column_ < upper
+
+def _fts_query(search: str) -> str:
+    """Every word of the search as a quoted FTS5 prefix term, all required"""
+    words = re.findall(r"\w+", search)
+    return " ".join(f'"{word}"*' for word in words)
+
+def _like_pattern(search: str) -> str:
+    """%search% for LIKE with escape "\\", so % and _ in the search match literally"""
+    return "%" + re.sub(r"([\\%_])", r"\\\1", search.strip()) + "%"
+
+def _substring_match(search: str):
+    """Name or email contains the search; not served by an index"""
+    pattern = _like_pattern(search)
+    return or_(*[column_.ilike(pattern, escape="\\") for column_ in (Member.name, Member.email)])
+
+def _identifier_matches(search: str) -> list:
+    """Selects of (id, rank) for members whose membership ID, phone or Aadhar matches the search"""
+    selects = []
+    identifier = search.strip().upper()
+    if identifier:
+        selects.append(
+            select(Member.id, literal(IDENTIFIER_MATCH_RANK, Float).label("rank"))
+            .where(*_prefix_range(Member.membership_id, identifier))
+        )
+
+    digits = re.sub(r"\D", "", search)
+    # Only searches that are essentially a phone number, not names with a digit in them
+    if len(digits) >= 3 and len(digits) >= len(re.sub(r"[\s+\-()]", "", search)):
+        prefixes = {f"+{digits}"}
+        if not search.strip().startswith("+"):
+            prefixes.add(f"+{DEFAULT_PHONE_COUNTRY_CODE}{digits.lstrip('0')}")
+        for prefix in prefixes:
+            selects.append(
+                select(Member.id, literal(IDENTIFIER_MATCH_RANK, Float).label("rank"))
+                .where(*_prefix_range(Member.phone, prefix))
+            )
+
+    aadhar = normalize_aadhar(search)
+    if len(aadhar) == 12 and aadhar.isdigit():
+        selects.append(
+            select(Member.id, literal(IDENTIFIER_MATCH_RANK, Float).label("rank"))
+            .where(Member.aadhar_hash == aadhar_blind_index(aadhar))
+        )
+    return selects
+
+def _text_matches(search: str, backend: str) -> list:
+    """Selects of (id, rank) for members whose name or email matches the search, lower rank first"""
+    if backend == "fts5":
+        fts_query = _fts_query(search)
+        if not fts_query:
+            return []
+        fts_match = literal_column("members_fts").op("MATCH")(fts_query)
+        return [
+            # bm25 rank: more negative is more relevant
+            select(members_fts.c.rowid.label("id"), members_fts.c.rank.label("rank")).where(fts_match),
+            # FTS5 only matches from the start of a word, so when no word
+            # matches fall back to a substring scan ("nadu" in "Mahanadu").
+            # The NOT EXISTS does not depend on the row and is checked once.
+            select(Member.id, literal(0.0, Float).label("rank")).where(
+                ~exists(select(members_fts.c.rowid).where(fts_match)), _substring_match(search)
+            ),
+        ]
+
+    pattern = _like_pattern(search)
+    if backend == "trigram":
+        return [
+            select(Member.id, (-func.similarity(column_, search)).label("rank"))
+            .where(column_.ilike(pattern, escape="\\"))
+            for column_ in (Member.name, Member.email)
+        ]
+    return [select(Member.id, literal(0.0, Float).label("rank")).where(_substring_match(search))]
+
+def member_search_ranks(search: str, backend: str = None):
+    """
+    A subquery of (id, rank) for every member matching the search, each part
+    served by an index. Identifier matches rank first, then text matches by
+    relevance.
+    """
+    selects = _identifier_matches(search) + _text_matches(search, backend or member_search_backend)
+    if not selects:
+        selects = [select(Member.id, literal(0.0, Float).label("rank")).where(literal(False))]
+    matches = union_all(*selects).subquery("search_matches")
+    return (
+        select(matches.c.id, func.min(matches.c.rank).label("rank"))
+        .group_by(matches.c.id)
+        .subquery("search_ranks")
+    )
+
+def member_search_filter(search: str):
+    """A where clause for the search's matches, for queries that keep their own order"""
+    return Member.id.in_(select(member_search_ranks(search).c.id))
+
+def apply_member_search(query, search: str):
+    """Restrict a Member query to the search's matches, best first"""
+    ranks = member_search_ranks(search)
+    return query.join(ranks, ranks.c.id == Member.id).order_by(ranks.c.rank, Member.id.desc())
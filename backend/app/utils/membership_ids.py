@@ -0,0 +1,89 @@
+from datetime import datetime
+from sqlalchemy import Integer, cast, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app.database import engine
+from app.models.member import Member
+from app.models.membership_id_counter import MembershipIdCounter
+import os
+import threading
+
+# Sequence numbers each process reserves at a time; unused numbers in a
+# block are skipped when the process exits, leaving gaps in the sequence
+MEMBERSHIP_ID_BLOCK_SIZE = int(os.getenv("MEMBERSHIP_ID_BLOCK_SIZE", "20"))
+
+def format_membership_id(year: int, sequence: int) -> str:
+    return f"MMN-{year}-{sequence:06d}"
+
+def _highest_existing_sequence(connection, year: int) -> int:
+    """Highest sequence number already issued for a year, from members created before the counter"""
+    prefix = f"MMN-{year}-"
+    # Compared as numbers: past 999999 the IDs get longer and no longer sort as strings
+    sequence = cast(func.substr(Member.membership_id, len(prefix) + 1), Integer)
+    highest = connection.scalar(select(func.max(sequence)).where(Member.membership_id.like(f"{prefix}%")))
+    return highest or 0
+
+def reserve_sequence_block(year: int, count: int) -> range:
+    """
+    Atomically take the next count sequence numbers for a year from its
+    counter row. A single UPDATE ... RETURNING does the increment, so
+    concurrent processes never receive overlapping blocks.
+    """
+    with engine.begin() as connection:
+        for _ in range(2):
+            end = connection.scalar(
+                update(MembershipIdCounter)
+                .where(MembershipIdCounter.year == year)
+                .values(next_value=MembershipIdCounter.next_value + count)
+                .returning(MembershipIdCounter.next_value)
+            )
+            if end is not None:
+                return range(end - count, end)
+            # First allocation of the year: continue after any IDs issued before the counter existed
+            try:
+                with connection.begin_nested():
+                    connection.execute(insert(MembershipIdCounter).values(
+                        year=year, next_value=_highest_existing_sequence(connection, year) + 1
+                    ))
+            except IntegrityError:
+                # Another process created the row first
+                pass
+    raise RuntimeError(f"Could not reserve membership IDs for {year}")
+
+class MembershipIdAllocator:
+    """
+    Hands out MMN-YYYY-NNNNNN membership IDs from a block reserved per
+    process, so most allocations need no database access. Blocks are per
+    year, so numbering restarts at 000001 each January.
+    """
+
+    def __init__(self, block_size: int = MEMBERSHIP_ID_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._year = None
+        self._block = iter(())
+
+    def allocate(self) -> str:
+        """The next membership ID for the current year"""
+        year = datetime.now().year
+        with self._lock:
+            # A forked worker must not hand out its parent's block
+            if self._pid != os.getpid() or self._year != year:
+                self._pid, self._year, self._block = os.getpid(), year, iter(())
+            sequence = next(self._block, None)
+            if sequence is None:
+                self._block = iter(reserve_sequence_block(year, self.block_size))
+                sequence = next(self._block)
+            return format_membership_id(year, sequence)
+
+    def reserve(self, count: int) -> list:
+        """count consecutive membership IDs for the current year, e.g. for a bulk import"""
+        if count <= 0:
+            return []
+        year = datetime.now().year
+        return [format_membership_id(year, sequence) for sequence in reserve_sequence_block(year, count)]
+
+membership_id_allocator = MembershipIdAllocator()
+
+def allocate_membership_id() -> str:
+    return membership_id_allocator.allocate()
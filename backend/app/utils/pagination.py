@@ -0,0 +1,78 @@
+from typing import Optional
+from sqlalchemy import and_, or_, select, tuple_
+import base64
+import json
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that is malformed, from another list, or whose row was deleted"""
+
+def encode_cursor(kind: str, row_id: int) -> str:
+    payload = json.dumps({"k": kind, "id": row_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str, kind: str) -> int:
+    """The id of the row a cursor continues after"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        row_id = payload["id"]
+        cursor_kind = payload["k"]
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor("Invalid cursor")
+    if cursor_kind != kind or not isinstance(row_id, int):
+        raise InvalidCursor("Invalid cursor")
+    return row_id
+
+def _after_anchor(model, keys: list, anchor_id: int):
+    """
+    Rows that sort after the anchor row under keys. The anchor's sort values
+    are read by the database itself, so they compare exactly as stored.
+    Consecutive keys in the same direction are compared as one row value and
+    the first key is bounded on its own, so an index on the keys serves the
+    condition as a range instead of a scan from the first row.
+    """
+    anchor = {
+        column.key: select(column).where(model.id == anchor_id).scalar_subquery()
+        for column, _ in keys
+    }
+    groups = []  # (columns, direction) runs
+    for column, direction in keys:
+        if groups and groups[-1][1] == direction:
+            groups[-1][0].append(column)
+        else:
+            groups.append(([column], direction))
+
+    def beyond(columns, direction):
+        left = columns[0] if len(columns) == 1 else tuple_(*columns)
+        right = anchor[columns[0].key] if len(columns) == 1 else tuple_(*[anchor[c.key] for c in columns])
+        return left > right if direction == "asc" else left < right
+
+    condition = beyond(*groups[-1])
+    for columns, direction in reversed(groups[:-1]):
+        equal = and_(*[column == anchor[column.key] for column in columns])
+        condition = or_(beyond(columns, direction), and_(equal, condition))
+    if len(groups) > 1:
+        first, direction = keys[0]
+        condition = and_(first >= anchor[first.key] if direction == "asc" else first <= anchor[first.key], condition)
+    return condition
+
+def paginate(query, model, keys: list, limit: int, skip: int = 0, cursor: Optional[str] = None) -> tuple:
+    """
+    One page of query ordered by keys, a list of (column, "asc" | "desc")
+    ending with model.id so the order is total. With a cursor the page
+    continues after the cursor's row (keyset pagination, the same cost on
+    every page); otherwise skip rows are skipped. Returns (rows, next_cursor),
+    next_cursor being None on the last page.
+    """
+    kind = model.__tablename__
+    query = query.order_by(*[column.asc() if direction == "asc" else column.desc() for column, direction in keys])
+    if cursor:
+        anchor_id = decode_cursor(cursor, kind)
+        query = query.filter(_after_anchor(model, keys, anchor_id))
+    else:
+        query = query.offset(skip)
+
+    rows = query.limit(limit + 1).all()
+    if cursor and not rows and query.session.query(model.id).filter(model.id == anchor_id).first() is None:
+        raise InvalidCursor("The cursor's row no longer exists; start again from the first page")
+    next_cursor = encode_cursor(kind, rows[limit - 1].id) if len(rows) > limit and limit > 0 else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,109 @@
+from typing import Optional, Union
+from PIL import Image, ImageOps, UnidentifiedImageError
+import io
+import os
+
+PHOTOS_DIR = "app/static/photos"
+
+# Uploads above this many pixels are rejected before they are decoded
+MAX_PHOTO_PIXELS = int(os.getenv("MAX_PHOTO_PIXELS", str(40_000_000)))
+# Uploads larger than this are refused while they are being received
+MAX_PHOTO_BYTES = int(os.getenv("MAX_PHOTO_BYTES", str(10 * 1024 * 1024)))
+# Longest side of the stored full-size photo
+PHOTO_MAX_SIDE = 1600
+
+# variant -> (square size, extension); the card variant matches the card's photo frame
+PHOTO_VARIANTS = {
+    "card": (220, "jpg"),
+    "sm": (96, "webp"),
+    "md": (320, "webp"),
+}
+
+class PhotoRejected(ValueError):
+    """Raised when an upload is not a usable photo"""
+
+def photo_variant_name(filename: str, variant: str) -> str:
+    """photo_001.jpg -> photo_001_sm.webp"""
+    stem = os.path.splitext(filename)[0]
+    return f"{stem}_{variant}.{PHOTO_VARIANTS[variant][1]}"
+
+def photo_variant_url(photo_url: Optional[str], variant: str) -> Optional[str]:
+    """
+    URL of a derived variant of a stored photo, falling back to the photo
+    itself for photos uploaded before variants were generated
+    """
+    if not photo_url or not photo_url.startswith("/static/photos/"):
+        return photo_url
+    filename = photo_variant_name(os.path.basename(photo_url), variant)
+    if not os.path.exists(os.path.join(PHOTOS_DIR, filename)):
+        return photo_url
+    return f"/static/photos/{filename}"
+
+def _square(img: Image.Image, size: int) -> Image.Image:
+    """Centre-crop to a square and resize"""
+    return ImageOps.fit(img, (size, size), method=Image.LANCZOS)
+
+def _save_variants(img: Image.Image, filename: str, photos_dir: str, variants) -> None:
+    for variant in variants:
+        size, extension = PHOTO_VARIANTS[variant]
+        variant_path = os.path.join(photos_dir, photo_variant_name(filename, variant))
+        if extension == "webp":
+            _square(img, size).save(variant_path, "WEBP", quality=80, method=4)
+        else:
+            _square(img, size).save(variant_path, "JPEG", quality=90)
+
+def process_member_photo(source: Union[bytes, str], stem: str, photos_dir: str = PHOTOS_DIR) -> str:
+    """
+    Decode an uploaded photo (its bytes or the path it was saved to) once,
+    apply its EXIF orientation and store a normalised JPEG plus the card,
+    small and medium variants. Blocking; call it from a worker thread.
+    Returns the stored photo's URL.
+    """
+    try:
+        with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as src:
+            # Only the header has been read so far, so the size check is cheap
+            if src.width * src.height > MAX_PHOTO_PIXELS:
+                raise PhotoRejected("Photo resolution is too large")
+            # JPEGs can decode straight to a reduced scale
+            src.draft("RGB", (PHOTO_MAX_SIDE, PHOTO_MAX_SIDE))
+            img = ImageOps.exif_transpose(src).convert("RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise PhotoRejected(f"Invalid photo: {e}")
+
+    img.thumbnail((PHOTO_MAX_SIDE, PHOTO_MAX_SIDE), Image.LANCZOS)
+
+    os.makedirs(photos_dir, exist_ok=True)
+    filename = f"{stem}.jpg"
+    img.save(os.path.join(photos_dir, filename), "JPEG", quality=85, optimize=True)
+
+    _save_variants(img, filename, photos_dir, PHOTO_VARIANTS)
+    return f"/static/photos/{filename}"
+
+def delete_member_photo(photo_url: Optional[str], photos_dir: str = PHOTOS_DIR) -> None:
+    """Remove a photo stored by process_member_photo and its variants"""
+    if not photo_url or not photo_url.startswith("/static/photos/"):
+        return
+    filename = os.path.basename(photo_url)
+    for name in [filename] + [photo_variant_name(filename, variant) for variant in PHOTO_VARIANTS]:
+        try:
+            os.remove(os.path.join(photos_dir, name))
+        except FileNotFoundError:
+            pass
+
+def generate_photo_variants(photo_path: str) -> bool:
+    """Create missing variants for an already stored photo; returns whether any were written"""
+    filename = os.path.basename(photo_path)
+    photos_dir = os.path.dirname(photo_path)
+    missing = [variant for variant in PHOTO_VARIANTS
+               if not os.path.exists(os.path.join(photos_dir, photo_variant_name(filename, variant)))]
+    if not missing:
+        return False
+
+    with Image.open(photo_path) as img:
+        if img.width * img.height > MAX_PHOTO_PIXELS:
+            raise PhotoRejected("Photo resolution is too large")
+        img.draft("RGB", (PHOTO_MAX_SIDE, PHOTO_MAX_SIDE))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+
+    _save_variants(img, filename, photos_dir, missing)
+    return True
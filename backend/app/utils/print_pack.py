@@ -0,0 +1,251 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional
+from app.database import SessionLocal
+from app.utils.idcard_batch import card_member_filters, iter_card_batches, iter_fresh_cards
+from app.utils.idcard_cache import cached_card_path, card_file_stem
+from app.utils.streaming import ChunkBuffer
+from PIL import Image
+import io
+import multiprocessing
+import os
+import struct
+import threading
+import time
+import zipfile
+import zlib
+
+# A4 sheet with ten CR80 (85.6 x 54 mm) cards in two columns of five
+MM = 72 / 25.4
+A4_WIDTH, A4_HEIGHT = 210 * MM, 297 * MM
+SHEET_CARD_WIDTH, SHEET_CARD_HEIGHT = 85.6 * MM, 53.98 * MM
+SHEET_COLUMNS, SHEET_ROWS = 2, 5
+SHEET_GUTTER_X, SHEET_GUTTER_Y = 10 * MM, 4 * MM
+CROP_MARK_OFFSET, CROP_MARK_LENGTH = 0.7 * MM, 1.5 * MM
+CARDS_PER_SHEET = SHEET_COLUMNS * SHEET_ROWS
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# Render processes shared by every print pack the API server streams
+PRINT_PACK_WORKERS = int(os.getenv("PRINT_PACK_WORKERS", "2"))
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+def shared_render_pool() -> ProcessPoolExecutor:
+    """
+    The process-wide pool of PRINT_PACK_WORKERS render processes, started on
+    first use, so concurrent packs queue for the same workers instead of
+    each starting a pool the size of the machine
+    """
+    global _render_pool
+    with _render_pool_lock:
+        # A pool whose worker died (e.g. killed for memory) refuses new work; start a fresh one
+        if _render_pool is None or _render_pool._broken:
+            # Spawned workers are safe to start from the API server's threads
+            _render_pool = ProcessPoolExecutor(max_workers=PRINT_PACK_WORKERS,
+                                               mp_context=multiprocessing.get_context("spawn"))
+        return _render_pool
+
+def shutdown_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(cancel_futures=True)
+            _render_pool = None
+
+def iter_pack_members(district: Optional[str] = None, mandal: Optional[str] = None, status: Optional[str] = None,
+                      state: Optional[str] = None, batch_size: int = 200) -> Iterator[list]:
+    """
+    Keyset batches of CARD_COLUMNS rows. Each batch uses a short-lived
+    session so no connection is held while the pack is being streamed.
+    """
+    filters = card_member_filters(district=district, state=state, mandal=mandal, status=status)
+    last_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            batch = next(iter_card_batches(db, batch_size=batch_size, after_id=last_id, filters=filters), None)
+        finally:
+            db.close()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1][0]
+
+def _card_png_xobject(png_path: str) -> tuple:
+    """
+    Return (width, height, stream dictionary, data) for a PDF image XObject.
+    An 8-bit RGB non-interlaced PNG is embedded as-is: its IDAT stream is
+    already Flate data with PNG predictors, which PDF can decode directly.
+    """
+    with open(png_path, "rb") as f:
+        data = f.read()
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", data[16:29])
+        if bit_depth == 8 and color_type == 2 and interlace == 0:
+            idat = bytearray()
+            offset = 8
+            while offset < len(data):
+                length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+                if chunk_type == b"IDAT":
+                    idat += data[offset + 8:offset + 8 + length]
+                offset += length + 12
+            params = f"/DecodeParms << /Predictor 15 /Colors 3 /BitsPerComponent 8 /Columns {width} >>"
+            return width, height, params, bytes(idat)
+    # Anything else is decoded and recompressed without predictors
+    img = Image.open(io.BytesIO(data)).convert("RGB")
+    return img.width, img.height, "", zlib.compress(img.tobytes(), 6)
+
+class _StreamingPdfWriter:
+    """
+    Minimal PDF writer that emits objects as soon as they are complete, so
+    a pack of any size is produced with one sheet of state in memory.
+    Object 1 is the catalog and object 2 the page tree, written at the end.
+    """
+
+    def __init__(self):
+        self.offsets = {}
+        self.position = 0
+        self.next_object = 3
+        self.pages = []
+
+    def _emit(self, data: bytes) -> bytes:
+        self.position += len(data)
+        return data
+
+    def header(self) -> bytes:
+        return self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def reserve(self) -> int:
+        number = self.next_object
+        self.next_object += 1
+        return number
+
+    def object(self, number: int, body: bytes) -> bytes:
+        self.offsets[number] = self.position
+        return self._emit(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def stream(self, number: int, dictionary: str, data: bytes) -> bytes:
+        body = f"<< {dictionary} /Length {len(data)} >>\nstream\n".encode() + data + b"\nendstream"
+        return self.object(number, body)
+
+    def trailer(self) -> bytes:
+        kids = " ".join(f"{number} 0 R" for number in self.pages)
+        out = self.object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>".encode())
+        out += self.object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref_offset = self.position
+        count = self.next_object
+        xref = [f"xref\n0 {count}\n", "0000000000 65535 f \n"]
+        xref += [f"{self.offsets[number]:010d} 00000 n \n" for number in range(1, count)]
+        xref.append(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n")
+        return out + self._emit("".join(xref).encode())
+
+def _sheet_slot(index: int) -> tuple:
+    """Bottom-left corner in points of the index-th card on a sheet"""
+    column, row = index % SHEET_COLUMNS, index // SHEET_COLUMNS
+    block_width = SHEET_COLUMNS * SHEET_CARD_WIDTH + (SHEET_COLUMNS - 1) * SHEET_GUTTER_X
+    block_height = SHEET_ROWS * SHEET_CARD_HEIGHT + (SHEET_ROWS - 1) * SHEET_GUTTER_Y
+    left = (A4_WIDTH - block_width) / 2 + column * (SHEET_CARD_WIDTH + SHEET_GUTTER_X)
+    top = A4_HEIGHT - (A4_HEIGHT - block_height) / 2 - row * (SHEET_CARD_HEIGHT + SHEET_GUTTER_Y)
+    return left, top - SHEET_CARD_HEIGHT
+
+def _crop_marks(x: float, y: float) -> str:
+    """Hairline marks just outside each corner of the card at (x, y)"""
+    ops = []
+    for corner_x, direction_x in ((x, -1), (x + SHEET_CARD_WIDTH, 1)):
+        for corner_y, direction_y in ((y, -1), (y + SHEET_CARD_HEIGHT, 1)):
+            start_x = corner_x + direction_x * CROP_MARK_OFFSET
+            start_y = corner_y + direction_y * CROP_MARK_OFFSET
+            ops.append(f"{start_x:.2f} {corner_y:.2f} m {start_x + direction_x * CROP_MARK_LENGTH:.2f} {corner_y:.2f} l S")
+            ops.append(f"{corner_x:.2f} {start_y:.2f} m {corner_x:.2f} {start_y + direction_y * CROP_MARK_LENGTH:.2f} l S")
+    return "\n".join(ops)
+
+def stream_card_sheets(png_paths: Iterable[str]) -> Iterator[bytes]:
+    """Impose card PNGs ten to an A4 page with crop marks, yielding the PDF as it is built"""
+    writer = _StreamingPdfWriter()
+    yield writer.header()
+
+    def finish_sheet(images):
+        content = ["0 G 0.25 w"]
+        for index, number in enumerate(images):
+            x, y = _sheet_slot(index)
+            content.append(f"q {SHEET_CARD_WIDTH:.2f} 0 0 {SHEET_CARD_HEIGHT:.2f} {x:.2f} {y:.2f} cm /Im{index} Do Q")
+            content.append(_crop_marks(x, y))
+        content_number, page_number = writer.reserve(), writer.reserve()
+        resources = " ".join(f"/Im{index} {number} 0 R" for index, number in enumerate(images))
+        out = writer.stream(content_number, "", "\n".join(content).encode())
+        out += writer.object(page_number, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {A4_WIDTH:.2f} {A4_HEIGHT:.2f}] "
+            f"/Resources << /XObject << {resources} >> >> /Contents {content_number} 0 R >>"
+        ).encode())
+        writer.pages.append(page_number)
+        return out
+
+    images = []
+    for png_path in png_paths:
+        width, height, params, data = _card_png_xobject(png_path)
+        number = writer.reserve()
+        yield writer.stream(number, (
+            f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /FlateDecode {params}"
+        ), data)
+        images.append(number)
+        if len(images) == CARDS_PER_SHEET:
+            yield finish_sheet(images)
+            images = []
+    if images or not writer.pages:
+        yield finish_sheet(images)
+    yield writer.trailer()
+
+def stream_card_zip(files: Iterable[tuple]) -> Iterator[bytes]:
+    """Stream a ZIP of (archive name, path) pairs, one read chunk at a time"""
+    sink = ChunkBuffer()
+    # Cards are already compressed, so entries are stored as-is
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for archive_name, path in files:
+            info = zipfile.ZipInfo(archive_name, date_time=time.localtime(os.path.getmtime(path))[:6])
+            with archive.open(info, "w", force_zip64=True) as entry, open(path, "rb") as f:
+                while True:
+                    chunk = f.read(READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    entry.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+def stream_print_pack(layout: str = "sheets", card_format: str = "png", district: Optional[str] = None,
+                      mandal: Optional[str] = None, status: Optional[str] = None, state: Optional[str] = None,
+                      workers: Optional[int] = None, errors: Optional[list] = None,
+                      pool: Optional[Executor] = None) -> Iterator[bytes]:
+    """
+    Stream a print pack for the members matching the filters.
+    layout "sheets" yields an imposed A4 PDF of card PNGs; layout "zip" yields
+    a ZIP of per-member files in card_format ("png", "pdf" or "both").
+    Members whose card cannot be rendered are skipped and listed in errors.
+    Cards are rendered in pool (of workers processes) when given, otherwise
+    in a pool of workers processes started for this pack.
+    """
+    formats = ("png",) if layout == "sheets" else (("png", "pdf") if card_format == "both" else (card_format,))
+    batches = iter_pack_members(district=district, mandal=mandal, status=status, state=state)
+    # Spawned workers are safe to start from the API server's threads
+    cards = iter_fresh_cards(batches, formats=formats, workers=workers,
+                             mp_context=multiprocessing.get_context("spawn"), pool=pool)
+
+    def fresh_paths():
+        for row, fingerprint, error in cards:
+            if error:
+                print(f"Skipping {row[1]} in print pack: {error}")
+                if errors is not None:
+                    errors.append({"membership_id": row[1], "error": error})
+                continue
+            for extension in formats:
+                yield row[1], extension, cached_card_path(row[1], fingerprint, extension)
+
+    if layout == "sheets":
+        yield from stream_card_sheets(path for _, _, path in fresh_paths())
+    else:
+        yield from stream_card_zip(
+            (f"{card_file_stem(membership_id)}.{extension}", path)
+            for membership_id, extension, path in fresh_paths()
+        )
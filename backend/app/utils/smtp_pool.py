@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from typing import Optional
+import asyncio
+import smtplib
+import ssl
+import threading
+import time
+
+# The server refused this message; the session itself is still usable
+MESSAGE_ERRORS = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+# Anything else (SMTPException is an OSError) means the connection is gone
+CONNECTION_ERRORS = (OSError,)
+
+class SMTPConnectionPool:
+    """
+    A small pool of authenticated SMTP connections.
+
+    smtplib is blocking, so every send runs on the pool's own threads and the
+    async send_message() never blocks the event loop. Connections stay open
+    between messages, so a send only pays for the TLS handshake and login
+    when no idle connection is available. A connection the server has
+    dropped is replaced and the message retried once.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 starttls: bool = True, size: int = 2, idle_timeout: float = 60.0, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle = []  # (connection, last used) pairs, most recently used last
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        # Threads are only started on the first send
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="smtp")
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.ehlo()
+            if self.starttls:
+                connection.starttls(context=ssl.create_default_context())
+                connection.ehlo()
+            if self.username:
+                connection.login(self.username, self.password)
+        except Exception:
+            self._discard(connection)
+            raise
+        return connection
+
+    @staticmethod
+    def _discard(connection: smtplib.SMTP) -> None:
+        try:
+            connection.quit()
+        except Exception:
+            connection.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        fresh, stale = None, []
+        with self._lock:
+            while self._idle and fresh is None:
+                connection, last_used = self._idle.pop()
+                # Servers drop idle sessions; don't gamble on a stale one
+                if time.monotonic() - last_used < self.idle_timeout:
+                    fresh = connection
+                else:
+                    stale.append(connection)
+        for connection in stale:
+            self._discard(connection)
+        return fresh or self._connect()
+
+    def _checkin(self, connection: smtplib.SMTP) -> None:
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+
+    def send_message_sync(self, msg: Message) -> None:
+        """Send msg on a pooled connection, blocking the calling thread"""
+        with self._slots:
+            for attempt in (1, 2):
+                # Other idle connections have likely been dropped too, so retry on a new one
+                connection = self._checkout() if attempt == 1 else self._connect()
+                try:
+                    connection.send_message(msg)
+                except MESSAGE_ERRORS:
+                    # Reset the session and keep it for the next message
+                    try:
+                        connection.rset()
+                        self._checkin(connection)
+                    except CONNECTION_ERRORS:
+                        self._discard(connection)
+                    raise
+                except CONNECTION_ERRORS:
+                    self._discard(connection)
+                    if attempt == 2:
+                        raise
+                    continue
+                self._checkin(connection)
+                return
+
+    async def send_message(self, msg: Message) -> None:
+        """Send msg without blocking the event loop"""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.send_message_sync, msg)
+
+    def close(self) -> None:
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._discard(connection)
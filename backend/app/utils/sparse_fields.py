@@ -0,0 +1,65 @@
+from operator import itemgetter
+from typing import Callable, Optional
+from fastapi.responses import JSONResponse
+from sqlalchemy import Date, DateTime
+
+def _isoformat_getter(get: Callable) -> Callable:
+    def get_isoformat(row):
+        value = get(row)
+        return value.isoformat() if value is not None else None
+    return get_isoformat
+
+class SparseFields:
+    """
+    The fields a list endpoint can return and the columns each is read from,
+    so a `fields=` request selects only those columns and serialises the
+    rows straight from the result tuples instead of loading ORM objects.
+    """
+
+    def __init__(self, model, response_model, derived: Optional[dict] = None, exclude: tuple = ()):
+        self.model = model
+        self.allowed = [name for name in response_model.model_fields if name not in exclude]
+        # field -> (columns it is computed from, function(row) -> value)
+        self.derived = derived or {}
+
+    def parse(self, fields: Optional[str]) -> Optional[list]:
+        """The requested field names in order, or None when fields was not given"""
+        if fields is None:
+            return None
+        names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in names if name not in self.allowed]
+        if not names or unknown:
+            raise ValueError(
+                f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(self.allowed)}"
+                if unknown else "fields must name at least one field"
+            )
+        return names
+
+    def columns(self, names: list) -> list:
+        """Columns to select for names; id is always included for pagination"""
+        sources = ["id"]
+        for name in names:
+            sources.extend(self.derived[name][0] if name in self.derived else [name])
+        return [getattr(self.model, source) for source in dict.fromkeys(sources)]
+
+    def serialize(self, rows: list, names: list) -> list:
+        """Rows selected with columns(names) as dicts of JSON values"""
+        positions = {column.key: position for position, column in enumerate(self.columns(names))}
+        getters = []
+        for name in names:
+            if name in self.derived:
+                getters.append((name, self.derived[name][1]))
+                continue
+            # Plain columns are read from the tuple by position; only dates need converting
+            get = itemgetter(positions[name])
+            if isinstance(getattr(self.model, name).type, (Date, DateTime)):
+                get = _isoformat_getter(get)
+            getters.append((name, get))
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+def sparse_json_response(rows: list, next_cursor: Optional[str] = None) -> JSONResponse:
+    """Serialised rows as the response, carrying the pagination cursor header"""
+    response = JSONResponse(rows)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
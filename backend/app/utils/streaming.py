@@ -0,0 +1,22 @@
+import io
+
+class ChunkBuffer(io.RawIOBase):
+    """
+    Write-only, unseekable sink that a writer such as zipfile writes into and
+    a streaming response drains chunk by chunk
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
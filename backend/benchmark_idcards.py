@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ID card pipeline stage by stage.
+
+N synthetic members are run through each stage (font load, static template
+layer, photo decode and resize, QR code, composition, PNG encode with and
+without optimize, PDF and the full generate_id_card) with and without a
+photo. Every stage runs in a fresh process so its peak RSS is measured in
+isolation. PNG compression levels are compared by size and encode time.
+
+Results can be written as JSON and compared against an earlier run:
+
+    python benchmark_idcards.py -n 50 --json bench.json
+    python benchmark_idcards.py -n 50 --baseline bench.json
+"""
+
+import sys
+import os
+import argparse
+import io
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import PIL
+from PIL import Image
+from app.utils.idcard_generator import (
+    CARD_TEMPLATE_VERSION,
+    generate_id_card,
+    get_card_fonts,
+    get_card_template,
+    load_card_photo,
+    make_qr_image,
+    render_id_card_image,
+    render_id_card_pdf,
+    verification_url_for,
+)
+from app.utils.photo_processing import PHOTO_VARIANTS, photo_variant_name, process_member_photo
+
+DISTRICTS = ["Hyderabad", "Nellore", "Guntur", "Krishna", "East Godavari", "Visakhapatnam"]
+VILLAGES = ["Ameerpet", "Kandukur", "Tenali", "Gudivada", "Rajahmundry Rural", "Bheemunipatnam"]
+FIRST_NAMES = ["Ravi", "Lakshmi", "Venkateswarlu", "Sita", "Chennaiah", "Anjaneyulu", "Padma"]
+LAST_NAMES = ["Kumar", "Devi", "Burgula", "Dodla", "Ramaiah", "Naidu"]
+
+# Stages that only make sense when the member has a photo
+PHOTO_STAGES = {"photo_original", "photo_card_variant"}
+STAGES = [
+    "fonts", "template", "photo_original", "photo_card_variant", "qr",
+    "compose", "png_encode", "png_encode_optimize", "pdf", "full_card",
+]
+
+def synthetic_member(i: int) -> dict:
+    """Deterministic card fields for the i-th synthetic member"""
+    rng = random.Random(i)
+    return {
+        "membership_id": f"MMN-2025-{i:06d}",
+        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "village": rng.choice(VILLAGES),
+        "district": rng.choice(DISTRICTS),
+        "phone": f"9{rng.randrange(10 ** 9):09d}",
+        "state": rng.choice(["Andhra Pradesh", "Telangana"]),
+    }
+
+def make_synthetic_photo(output_dir: str) -> str:
+    """A 12 MP phone-camera-sized JPEG with noise so it compresses like a real photo"""
+    width, height = 4032, 3024
+    noise = Image.effect_noise((width // 4, height // 4), 64).resize((width, height))
+    gradient = Image.linear_gradient("L").resize((width, height))
+    img = Image.merge("RGB", (noise, gradient, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+    photo_path = os.path.join(output_dir, "synthetic_photo.jpg")
+    img.save(photo_path, "JPEG", quality=90)
+    return photo_path
+
+def make_card_variant(photo_path: str, output_dir: str) -> str:
+    """Run a photo through upload processing and return its card-size variant"""
+    process_member_photo(photo_path, "benchmark", photos_dir=output_dir)
+    return os.path.join(output_dir, photo_variant_name("benchmark.jpg", "card"))
+
+def _proc_status_mb(field: str):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's RSS high-water mark (Linux) so the peak covers only what follows"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb() -> float:
+    peak = _proc_status_mb("VmHWM")
+    if peak is not None:
+        return peak
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS, and survives exec,
+    # so without /proc it also counts the parent's peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_stage(stage: str, count: int, photo_path: str, card_photo_path: str, output_dir: str) -> dict:
+    """Time count runs of one stage; runs in a fresh child process"""
+    members = [synthetic_member(i) for i in range(count)]
+    issued_at = datetime.now()
+
+    # Inputs for the stage are prepared before the baseline RSS is taken
+    setup = {}
+    if stage not in ("fonts", "template"):
+        get_card_template()
+    if stage in ("compose", "png_encode", "png_encode_optimize", "pdf"):
+        setup["photo"] = load_card_photo(card_photo_path)
+    if stage in ("png_encode", "png_encode_optimize"):
+        setup["images"] = [render_id_card_image(**m, issued_at=issued_at, photo=setup["photo"]) for m in members]
+
+    def step(i, member):
+        if stage == "fonts":
+            get_card_fonts.cache_clear()
+            get_card_fonts()
+        elif stage == "template":
+            get_card_template.cache_clear()
+            get_card_template()
+        elif stage == "photo_original":
+            load_card_photo(photo_path)
+        elif stage == "photo_card_variant":
+            load_card_photo(card_photo_path)
+        elif stage == "qr":
+            make_qr_image(verification_url_for(member["membership_id"]))
+        elif stage == "compose":
+            render_id_card_image(**member, issued_at=issued_at, photo=setup["photo"])
+        elif stage in ("png_encode", "png_encode_optimize"):
+            setup["images"][i].save(io.BytesIO(), "PNG", optimize=stage == "png_encode_optimize", dpi=(300, 300))
+        elif stage == "pdf":
+            render_id_card_pdf(os.path.join(output_dir, "card.pdf"), **member, issued_at=issued_at, photo=setup["photo"])
+        elif stage == "full_card":
+            generate_id_card(**member, photo_path=photo_path, output_dir=output_dir)
+
+    baseline_rss = _proc_status_mb("VmRSS") if _reset_peak_rss() else _peak_rss_mb()
+    timings = []
+    for i, member in enumerate(members):
+        start = time.perf_counter()
+        step(i, member)
+        timings.append((time.perf_counter() - start) * 1000)
+    peak_rss = _peak_rss_mb()
+
+    timings.sort()
+    return {
+        "runs": count,
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "min_ms": round(timings[0], 3),
+        "peak_rss_mb": round(peak_rss, 1),
+        "rss_growth_mb": round(peak_rss - baseline_rss, 1),
+    }
+
+def png_compression_sweep(card_photo_path: str, repeats: int = 5) -> list:
+    """Encoded size and time of one composed card at every zlib level, plus optimize"""
+    img = render_id_card_image(**synthetic_member(0), photo=load_card_photo(card_photo_path))
+    settings = [{"compress_level": level} for level in range(10)] + [{"optimize": True}]
+    results = []
+    for options in settings:
+        timings = []
+        for _ in range(repeats):
+            buffer = io.BytesIO()
+            start = time.perf_counter()
+            img.save(buffer, "PNG", **options)
+            timings.append((time.perf_counter() - start) * 1000)
+        label = "optimize" if "optimize" in options else f"level {options['compress_level']}"
+        results.append({"setting": label, "bytes": buffer.tell(), "median_ms": round(statistics.median(timings), 3)})
+    return results
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """Stages whose median time or peak RSS grew by more than tolerance over the baseline"""
+    regressions = []
+    for scenario, stages in results["scenarios"].items():
+        for stage, current in stages.items():
+            previous = baseline.get("scenarios", {}).get(scenario, {}).get(stage)
+            if not previous:
+                continue
+            for metric in ("median_ms", "peak_rss_mb"):
+                if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                    regressions.append(f"{scenario}/{stage} {metric}: {previous[metric]} -> {current[metric]}")
+    return regressions
+
+def benchmark_idcards(count: int, photo_path: str = None):
+    """Run every stage with and without a photo and return the results"""
+    with tempfile.TemporaryDirectory() as output_dir:
+        photo_path = photo_path or make_synthetic_photo(output_dir)
+        card_photo_path = make_card_variant(photo_path, output_dir)
+        with Image.open(photo_path) as img:
+            photo_size = img.size
+
+        scenarios = {}
+        spawn = multiprocessing.get_context("spawn")
+        for scenario, with_photo in (("with_photo", True), ("no_photo", False)):
+            scenarios[scenario] = {}
+            for stage in STAGES:
+                if stage in PHOTO_STAGES and not with_photo:
+                    continue
+                # A fresh process per stage so peak RSS reflects that stage alone
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                    scenarios[scenario][stage] = pool.submit(
+                        run_stage, stage, count,
+                        photo_path if with_photo else None,
+                        card_photo_path if with_photo else None,
+                        output_dir,
+                    ).result()
+
+        png_levels = png_compression_sweep(card_photo_path)
+
+    return {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "cpu_count": os.cpu_count(),
+        "card_template_version": CARD_TEMPLATE_VERSION,
+        "count": count,
+        "photo_size": list(photo_size),
+        "card_photo_size": PHOTO_VARIANTS["card"][0],
+        "scenarios": scenarios,
+        "png_compression": png_levels,
+    }
+
+def print_results(results: dict) -> None:
+    print(f"ID card benchmark: {results['count']} members, photo {results['photo_size'][0]}x{results['photo_size'][1]}")
+    for scenario, stages in results["scenarios"].items():
+        print(f"\n{scenario}")
+        print(f"  {'stage':<20} {'median ms':>10} {'p95 ms':>10} {'peak RSS MB':>12} {'RSS growth':>11}")
+        for stage, r in stages.items():
+            print(f"  {stage:<20} {r['median_ms']:>10.2f} {r['p95_ms']:>10.2f} "
+                  f"{r['peak_rss_mb']:>12.1f} {r['rss_growth_mb']:>11.1f}")
+    print("\nPNG compression (one card with photo)")
+    for r in results["png_compression"]:
+        print(f"  {r['setting']:<10} {r['bytes'] / 1024:>8.1f} KB {r['median_ms']:>9.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ID card pipeline stage by stage")
+    parser.add_argument("-n", "--count", type=int, default=50, help="synthetic members per stage")
+    parser.add_argument("--photo", help="photo to use instead of a synthetic 12 MP JPEG")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown or memory growth over the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = benchmark_idcards(args.count, args.photo)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regressions over {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\n✓ No regressions over {args.baseline}")
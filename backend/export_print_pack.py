@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Script to export a print pack of member ID cards.
+
+The pack is written as it is produced: either imposed A4 PDF sheets with
+crop marks or a ZIP of per-member card files. Fresh cards are reused from
+the card cache and missing ones rendered in a process pool.
+"""
+
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.print_pack import stream_print_pack
+
+def export_print_pack(output, layout="sheets", card_format="png", district=None, mandal=None, status=None,
+                      state=None, workers=None):
+    """Write a print pack for the members matching the filters to output"""
+    errors = []
+    written = 0
+    started = time.perf_counter()
+
+    with open(output, "wb") as f:
+        for chunk in stream_print_pack(layout=layout, card_format=card_format, district=district, mandal=mandal,
+                                       status=status, state=state, workers=workers, errors=errors):
+            f.write(chunk)
+            written += len(chunk)
+
+    elapsed = time.perf_counter() - started
+    print(f"✓ Print pack written to {output}: {written / 1024 / 1024:.1f} MB in {elapsed:.1f}s")
+    if errors:
+        print(f"✗ {len(errors)} members skipped because their card failed to render")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a print pack of member ID cards")
+    parser.add_argument("output", help="file to write (.pdf for sheets, .zip for zip)")
+    parser.add_argument("--layout", choices=["sheets", "zip"], default="sheets",
+                        help="A4 sheets with 10 cards per page, or a ZIP of card files")
+    parser.add_argument("--card-format", choices=["png", "pdf", "both"], default="png",
+                        help="card files included in a ZIP pack")
+    parser.add_argument("--district", help="only members in this district")
+    parser.add_argument("--mandal", help="only members in this mandal")
+    parser.add_argument("--status", help="only members with this status (e.g. approved)")
+    parser.add_argument("--state", help="only members in this state")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: all cores)")
+    args = parser.parse_args()
+
+    export_print_pack(
+        args.output,
+        layout=args.layout,
+        card_format=args.card_format,
+        district=args.district,
+        mandal=args.mandal,
+        status=args.status,
+        state=args.state,
+        workers=args.workers,
+    )
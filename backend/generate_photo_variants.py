@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Script to create the card, small and medium variants for member photos
+uploaded before photos were processed at upload time.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database import engine
+from app.models.member import Member
+from app.utils.photo_processing import PHOTOS_DIR, generate_photo_variants
+
+def generate_all_photo_variants():
+    """Generate missing photo variants for every member with a stored photo"""
+    db = Session(engine)
+
+    try:
+        photo_urls = db.scalars(
+            select(Member.photo_url).where(Member.photo_url.like("/static/photos/%")).order_by(Member.id)
+        ).all()
+        print(f"Found {len(photo_urls)} members with photos")
+
+        created = skipped = failed = 0
+        for photo_url in photo_urls:
+            photo_path = os.path.join(PHOTOS_DIR, os.path.basename(photo_url))
+            if not os.path.exists(photo_path):
+                print(f"✗ Photo file missing: {photo_path}")
+                failed += 1
+                continue
+            try:
+                if generate_photo_variants(photo_path):
+                    created += 1
+                    print(f"✓ Variants created for {photo_url}")
+                else:
+                    skipped += 1
+            except Exception as e:
+                failed += 1
+                print(f"✗ Error processing {photo_url}: {e}")
+
+        print(f"\n✓ Photo variants completed: {created} created, {skipped} already present, {failed} failed")
+        print("Cards for these members will be re-rendered from the card variant on next download")
+
+    except Exception as e:
+        print(f"Database error: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    generate_all_photo_variants()
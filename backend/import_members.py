@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Script to import members collected offline from a CSV or XLSX file.
+
+The first row must be a header naming the columns (name, father_name,
+gender, dob, caste, aadhar, phone, email, state, district, mandal, village,
+address). Rows that fail validation or duplicate an existing member are
+skipped and reported:
+
+    python import_members.py registrations.csv --errors rejected.csv
+    python import_members.py registrations.xlsx --dry-run
+"""
+
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.member_import import ImportFileError, import_errors_csv, import_members_file
+
+def import_members(path: str, dry_run: bool = False, errors_path: str = None):
+    """Import a file of members and print a summary"""
+    start = time.perf_counter()
+    try:
+        report = import_members_file(path, dry_run=dry_run)
+    except ImportFileError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    if dry_run:
+        print(f"✓ {report['valid']} of {report['total_rows']} rows valid in {elapsed:.1f}s (dry run, nothing imported)")
+    else:
+        print(f"✓ {report['imported']} of {report['total_rows']} rows imported in {elapsed:.1f}s")
+    for first, last in report["membership_id_ranges"]:
+        print(f"  {first} .. {last}")
+
+    if report["failed"]:
+        print(f"✗ {report['failed']} rows rejected")
+        for rejected in report["errors"][:20]:
+            print(f"  row {rejected['row']}: {'; '.join(rejected['errors'])}")
+        if report["failed"] > 20:
+            print(f"  ... and {report['failed'] - 20} more")
+        if errors_path:
+            with open(errors_path, "w", newline="") as f:
+                f.write(import_errors_csv(report))
+            print(f"✓ Rejected rows written to {errors_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import members from a CSV or XLSX file")
+    parser.add_argument("path", help="CSV or XLSX file with a header row")
+    parser.add_argument("--dry-run", action="store_true", help="validate and check for duplicates without importing")
+    parser.add_argument("--errors", help="write rejected rows and their problems to this CSV file")
+    args = parser.parse_args()
+
+    import_members(args.path, args.dry_run, args.errors)
@@ -1,67 +1,132 @@
 #!/usr/bin/env python3
 """
-Script to regenerate ID cards for all existing members with new QR code format
+Script to regenerate ID cards for existing members.
+
+Members are streamed in id order, rendered in a process pool and their
+id_card_url updates committed once per batch. Cards whose content is
+unchanged since the last render are reused from the card cache. Progress is
+checkpointed after every batch so an interrupted run resumes where it stopped.
+
+With --stale only members whose card is missing, was rendered from an older
+template or whose card fields or photo changed since the last render are
+re-rendered, so after a layout change (bump CARD_TEMPLATE_VERSION) or a crash
+a run only pays for the cards that actually need it.
 """
 
 import sys
 import os
+import argparse
+import json
+import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from app.database import engine, get_db
+from app.database import engine
 from app.models.member import Member
-from app.utils.idcard_generator import generate_id_card
+from app.utils.idcard_batch import card_member_filters, iter_card_batches, render_card_batches, save_card_urls, stale_card_rows
+from app.utils.idcard_generator import CARD_TEMPLATE_VERSION
 from datetime import datetime
 
-def regenerate_all_idcards():
-    """Regenerate ID cards for all members"""
+DEFAULT_CHECKPOINT = ".regenerate_idcards.checkpoint.json"
+
+def load_checkpoint(path: str, run_filters: dict) -> int:
+    """Return the last committed member id for a run with the same filters"""
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("filters") != run_filters:
+        print(f"Ignoring checkpoint {path}: it was written for different filters")
+        return 0
+    return checkpoint.get("last_id", 0)
+
+def save_checkpoint(path: str, run_filters: dict, last_id: int) -> None:
+    """Atomically record the last committed member id"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"filters": run_filters, "last_id": last_id, "updated_at": datetime.now().isoformat()}, f)
+    os.replace(tmp_path, path)
+
+def regenerate_all_idcards(district=None, state=None, since=None, batch_size=200, workers=None,
+                           checkpoint_path=DEFAULT_CHECKPOINT, restart=False, force=False, stale=False):
+    """Regenerate ID cards for all members matching the filters, or only the stale ones"""
+    run_filters = {"district": district, "state": state, "since": since.isoformat() if since else None, "stale": stale}
+    filters = card_member_filters(district=district, state=state, since=since)
+    after_id = 0 if restart else load_checkpoint(checkpoint_path, run_filters)
+
     db = Session(engine)
-    
+
     try:
-        # Get all members
-        members = db.query(Member).all()
-        print(f"Found {len(members)} members")
-        
-        for member in members:
-            print(f"Processing member: {member.name} ({member.membership_id})")
-            
-            try:
-                # Get photo path if available
-                photo_path = None
-                if member.photo_url:
-                    if member.photo_url.startswith("/static/photos/"):
-                        photo_path = member.photo_url.replace("/static/", "app/static/")
-                    else:
-                        photo_path = member.photo_url
-                
-                # Generate new ID card with QR code
-                id_card_path = generate_id_card(
-                    membership_id=member.membership_id,
-                    name=member.name,
-                    village=member.village,
-                    district=member.district,
-                    phone=member.phone,
-                    state=member.state,
-                    photo_path=photo_path
-                )
-                
-                # Update member with new ID card URL
-                member.id_card_url = f"/static/idcards/{os.path.basename(id_card_path)}?t={datetime.now().timestamp()}"
-                db.commit()
-                
-                print(f"✓ Successfully regenerated ID card for {member.name}")
-                
-            except Exception as e:
-                print(f"✗ Error regenerating ID card for {member.name}: {e}")
-                continue
-        
-        print(f"\n✓ ID card regeneration completed for {len(members)} members")
-        
+        remaining = db.scalar(select(func.count()).select_from(Member).where(Member.id > after_id, *filters))
+        if after_id:
+            print(f"Resuming after member id {after_id}")
+        print(f"Found {remaining} members to process with {workers or os.cpu_count()} workers")
+        if stale:
+            outdated = db.scalar(select(func.count()).select_from(Member).where(
+                Member.id > after_id, *filters,
+                (Member.card_template_version != CARD_TEMPLATE_VERSION) | Member.card_template_version.is_(None)
+            ))
+            print(f"{outdated} of them have no card for template version {CARD_TEMPLATE_VERSION}; "
+                  f"the rest are checked for changed fields")
+
+        rendered = failed = 0
+        started = time.perf_counter()
+
+        batches = iter_card_batches(db, batch_size=batch_size, after_id=after_id, filters=filters)
+        if stale:
+            batches = (rows for rows in map(stale_card_rows, batches) if rows)
+        for batch, results in render_card_batches(batches, workers=workers, force=force):
+            for member_id, id_card_url, fingerprint, error in results:
+                if error:
+                    failed += 1
+                    print(f"✗ Error regenerating ID card for member {member_id}: {error}")
+
+            rendered += save_card_urls(db, results)
+            save_checkpoint(checkpoint_path, run_filters, batch[-1][0])
+
+            elapsed = time.perf_counter() - started
+            print(f"✓ {rendered + failed} rendered up to member id {batch[-1][0]}, {rendered / elapsed:.1f} cards/s")
+
+        elapsed = time.perf_counter() - started
+        print(f"\n✓ ID card regeneration completed: {rendered} rendered, {failed} failed "
+              f"in {elapsed:.1f}s ({rendered / elapsed if elapsed else 0:.1f} cards/s)")
+
+        # A finished run needs no checkpoint; the next run starts from scratch
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
     except Exception as e:
         print(f"Database error: {e}")
         db.rollback()
+        # The checkpoint is kept, so rerunning resumes after the last committed batch
+        sys.exit(1)
     finally:
         db.close()
 
 if __name__ == "__main__":
-    regenerate_all_idcards()
+    parser = argparse.ArgumentParser(description="Regenerate member ID cards")
+    parser.add_argument("--district", help="only members in this district")
+    parser.add_argument("--state", help="only members in this state")
+    parser.add_argument("--since", type=datetime.fromisoformat,
+                        help="only members registered on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--batch-size", type=int, default=200, help="members fetched and committed per batch")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: all cores)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="progress file used to resume")
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint and start over")
+    parser.add_argument("--force", action="store_true", help="re-render cards even if an up-to-date one is cached")
+    parser.add_argument("--stale", action="store_true",
+                        help="only members whose card is missing, on an older template or whose details changed")
+    args = parser.parse_args()
+
+    regenerate_all_idcards(
+        district=args.district,
+        state=args.state,
+        since=args.since,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        restart=args.restart,
+        force=args.force,
+        stale=args.stale,
+    )
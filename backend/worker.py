@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Background job worker: renders ID cards and sends emails queued by the API.
+
+Run one or more processes next to the API server:
+    python worker.py --processes 2
+"""
+
+import sys
+import os
+import argparse
+from multiprocessing import Process
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.job_queue import run_worker
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--processes", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds to wait when the queue is empty")
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        run_worker(poll_interval=args.poll_interval)
+    else:
+        workers = [Process(target=run_worker, kwargs={"poll_interval": args.poll_interval})
+                   for _ in range(args.processes)]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()